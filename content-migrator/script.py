@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Magento to Shopify CMS Content Migration Script
+
+This script migrates Magento CMS pages to Shopify pages by streaming the
+cms_page export and writing Matrixify page import files.
+
+Magento page content is full of directives:
+
+- {{block id="..."}} and {{widget type="Magento\\Cms\\Block\\Widget\\Block" block_id="..."}}
+  are replaced by the content of the static block (cms_block export). Blocks
+  are indexed once up front and each block is expanded at most once
+  (memoized), including the blocks nested inside it
+- {{widget type="Magento\\Cms\\Block\\Widget\\Page\\Link" page_id="..."}} becomes a link
+  to the migrated page; other widgets have no Shopify equivalent and are removed
+- {{store url="..."}} and {{media url="..."}} become absolute URLs
+
+Internal .html links are then rewritten to Shopify URLs with the same handle
+resolution as the PLP content migration: /about-us.html -> /pages/about-us,
+/designers/tacori.html -> /collections/tacori. When the PLP migration's
+url_rewrite index is present, category links resolve through it and product
+links (/tacori-ring.html) go to /products/<url_key>. Output is split into
+shopify-pages-001.csv, -002.csv, ...
+"""
+
+import os
+import re
+import csv
+import sys
+import html
+import logging
+from urllib.parse import urlparse
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# csv fields hold whole pages of HTML
+csv.field_size_limit(2 ** 31 - 1)
+
+PAGE_FIELDNAMES = [
+    'Handle', 'Command', 'Title', 'Body HTML', 'Published', 'Template Suffix',
+    'Metafield: title_tag [string]', 'Metafield: description_tag [string]'
+]
+
+# Magento system pages with no Shopify counterpart
+SKIPPED_PAGES = {'no-route', 'enable-cookies'}
+
+DIRECTIVE_PATTERN = re.compile(r'\{\{(\w+)(.*?)\}\}', re.DOTALL)
+ATTRIBUTE_PATTERN = re.compile(r'(\w+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\']+))')
+LINK_PATTERN = re.compile(r'(\b(?:href|src)\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+MAX_BLOCK_DEPTH = 10
+
+# The url_rewrite index and its reader live with the PLP content migration
+PLP_MIGRATOR_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plp-content-migrator'))
+
+
+class ContentMigrationScript:
+    def __init__(self, pages_file, blocks_file, output_prefix, base_url='https://jrdunn.com',
+                 media_url='https://jrdunn.com/media', max_rows_per_file=5000, url_index_file=None):
+        self.pages_file = pages_file
+        self.blocks_file = blocks_file
+        self.output_prefix = output_prefix
+        self.base_url = base_url.rstrip('/')
+        self.media_url = media_url.rstrip('/')
+        self.max_rows_per_file = max_rows_per_file
+        self.url_index_file = url_index_file
+        self.url_index = None  # open during write_pages
+        host = urlparse(self.base_url).netloc.lower()
+        host = host[4:] if host.startswith('www.') else host
+        self.internal_hosts = {host, 'www.' + host}
+
+        # Precomputed indexes
+        self.blocks = {}  # block_id and identifier -> raw content
+        self.page_identifiers = {}  # page_id -> identifier
+        self.page_handles = set()
+
+        # Memoized rendering
+        self.block_cache = {}  # block key -> expanded content
+        self.html_cache = {}  # raw page content -> Body HTML
+        self.missing_blocks = set()
+        self.removed_widgets = {}  # widget type -> count
+        self.output_files = []
+
+        # Statistics
+        self.stats = {
+            'blocks_loaded': 0,
+            'pages_loaded': 0,
+            'pages_skipped': 0,
+            'duplicate_handles': 0,
+            'pages_written': 0,
+            'directives_expanded': 0,
+            'block_cache_hits': 0,
+            'block_cache_misses': 0,
+            'html_cache_hits': 0,
+            'html_cache_misses': 0,
+            'links_rewritten': 0,
+            'collection_links_from_url_index': 0,
+            'product_links': 0
+        }
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        # Remove BOM, quotes, and whitespace
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def iter_rows(self, filename):
+        """Stream cleaned rows from a Magento table export."""
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+            for values in reader:
+                yield dict(zip(fieldnames, values))
+
+    def extract_handle_from_url(self, url):
+        """Extract handle from URL (e.g., from 'https://jrdunn.com/diamonds-engagement-rings/tacori.html' get 'tacori')."""
+        if not url:
+            return None
+
+        try:
+            parsed = urlparse(url)
+            path = parsed.path.strip('/')
+
+            # Split path into segments and get the last one
+            segments = [seg for seg in path.split('/') if seg]
+            if not segments:
+                return None
+
+            handle = segments[-1]
+            # Remove .html extension
+            handle = re.sub(r'\.html$', '', handle)
+
+            return handle
+        except Exception as e:
+            logger.warning(f"Error parsing URL {url}: {e}")
+            return None
+
+    def page_handle(self, identifier):
+        """Shopify handle of a CMS page: its identifier without .html, slashes as hyphens."""
+        return re.sub(r'\.html$', '', identifier.strip().strip('/')).replace('/', '-').lower()
+
+    def load_block_index(self):
+        """Index every active static block by ID and identifier."""
+        logger.info(f"Indexing static blocks from {self.blocks_file}...")
+
+        try:
+            for row in self.iter_rows(self.blocks_file):
+                if row.get('is_active', '1') == '0':
+                    continue
+                content = row.get('content', '')
+                for key in (row.get('block_id', ''), row.get('identifier', '')):
+                    key = key.strip()
+                    if key:
+                        self.blocks[key] = content
+                self.stats['blocks_loaded'] += 1
+
+            logger.info(f"Indexed {self.stats['blocks_loaded']} static blocks")
+
+        except Exception as e:
+            logger.error(f"Error loading static blocks: {e}")
+            raise
+
+    def load_page_index(self):
+        """Collect page IDs and handles so page links can be resolved before pages are migrated."""
+        for row in self.iter_rows(self.pages_file):
+            identifier = row.get('identifier', '').strip()
+            if identifier:
+                self.page_identifiers[row.get('page_id', '').strip()] = identifier
+                self.page_handles.add(self.page_handle(identifier))
+        logger.info(f"Indexed {len(self.page_handles)} page handles")
+
+    def parse_attributes(self, text):
+        """Parse directive attributes (id="x" type='y' z=w)."""
+        attributes = {}
+        for match in ATTRIBUTE_PATTERN.finditer(html.unescape(text)):
+            name, double_quoted, single_quoted, bare = match.groups()
+            attributes[name] = next(value for value in (double_quoted, single_quoted, bare) if value is not None)
+        return attributes
+
+    def expand_block(self, block_key, stack):
+        """Return a block's content with its own directives expanded (memoized)."""
+        expanded = self.block_cache.get(block_key)
+        if expanded is not None:
+            self.stats['block_cache_hits'] += 1
+            return expanded
+
+        if block_key not in self.blocks:
+            if block_key not in self.missing_blocks:
+                logger.warning(f"Static block not found: {block_key}")
+                self.missing_blocks.add(block_key)
+            return ''
+        if block_key in stack or len(stack) >= MAX_BLOCK_DEPTH:
+            logger.warning(f"Block {block_key} includes itself ({' -> '.join(stack + (block_key,))}); left empty")
+            return ''
+
+        self.stats['block_cache_misses'] += 1
+        expanded = self.expand_directives(self.blocks[block_key], stack + (block_key,))
+        self.block_cache[block_key] = expanded
+        return expanded
+
+    def expand_directive(self, name, attributes, stack):
+        """Replacement markup for one {{directive}}."""
+        if name == 'block':
+            return self.expand_block(attributes.get('id') or attributes.get('block_id', ''), stack)
+
+        if name == 'widget':
+            widget_type = attributes.get('type', '').replace('\\\\', '\\')
+            if widget_type.endswith('Cms\\Block\\Widget\\Block'):
+                return self.expand_block(attributes.get('block_id', ''), stack)
+            if widget_type.endswith('Cms\\Block\\Widget\\Page\\Link'):
+                identifier = self.page_identifiers.get(attributes.get('page_id', ''))
+                if identifier:
+                    text = attributes.get('anchor_text') or attributes.get('title') or identifier
+                    return f'<a href="/pages/{self.page_handle(identifier)}">{html.escape(text)}</a>'
+            self.removed_widgets[widget_type or 'unknown'] = self.removed_widgets.get(widget_type or 'unknown', 0) + 1
+            return ''
+
+        if name == 'store':
+            path = attributes.get('url') or attributes.get('direct_url') or ''
+            return f"{self.base_url}/{path.lstrip('/')}"
+
+        if name == 'media':
+            return f"{self.media_url}/{attributes.get('url', '').lstrip('/')}"
+
+        # {{config}}, {{customVar}}, {{trans}} ... have no static equivalent
+        self.removed_widgets[name] = self.removed_widgets.get(name, 0) + 1
+        return ''
+
+    def expand_directives(self, content, stack=()):
+        """Replace every {{directive}} in a piece of content."""
+        def replace(match):
+            self.stats['directives_expanded'] += 1
+            return self.expand_directive(match.group(1), self.parse_attributes(match.group(2)), stack)
+        return DIRECTIVE_PATTERN.sub(replace, content)
+
+    def open_url_index(self):
+        """Open the PLP migration's url_rewrite index with its shared reader."""
+        if PLP_MIGRATOR_DIR not in sys.path:
+            sys.path.insert(0, PLP_MIGRATOR_DIR)
+        from url_rewrite_index import UrlRewriteIndex
+
+        logger.info(f"Resolving internal links through url_rewrite index {self.url_index_file}")
+        url_index = UrlRewriteIndex(self.url_index_file)
+        if not url_index.has_products:
+            logger.warning("The url_rewrite index has no product rewrites; rebuild it to send product links to /products/")
+        return url_index
+
+    def resolve_link_target(self, path):
+        """Shopify path for an internal Magento .html path, or None if it has no handle."""
+        handle = self.extract_handle_from_url(path)
+        if not handle:
+            return None
+        page_handle = self.page_handle(path)
+        if page_handle in self.page_handles:
+            return f"/pages/{page_handle}"
+        if handle in self.page_handles:
+            return f"/pages/{handle}"
+
+        if self.url_index:
+            collection_handle = self.url_index.resolve_url(path)
+            if collection_handle:
+                self.stats['collection_links_from_url_index'] += 1
+                return f"/collections/{collection_handle}"
+            product_handle = self.url_index.resolve_product_url(path)
+            if product_handle:
+                self.stats['product_links'] += 1
+                return f"/products/{product_handle}"
+        return f"/collections/{handle}"
+
+    def rewrite_url(self, url):
+        """Map an internal Magento .html URL to its Shopify URL; other URLs are unchanged."""
+        parsed = urlparse(html.unescape(url))
+        if parsed.netloc and parsed.netloc.lower() not in self.internal_hosts:
+            return url
+        if parsed.scheme not in ('', 'http', 'https') or not parsed.path.endswith('.html'):
+            return url
+
+        target = self.resolve_link_target(parsed.path)
+        if not target:
+            return url
+        if parsed.query:
+            target += f"?{parsed.query}"
+        if parsed.fragment:
+            target += f"#{parsed.fragment}"
+        self.stats['links_rewritten'] += 1
+        return target
+
+    def rewrite_links(self, content):
+        """Rewrite internal href/src URLs in expanded HTML."""
+        def replace(match):
+            return f"{match.group(1)}{match.group(2)}{self.rewrite_url(match.group(3))}{match.group(2)}"
+        return LINK_PATTERN.sub(replace, content)
+
+    def create_html_content(self, content):
+        """Expand directives and rewrite links in a page body (memoized by content)."""
+        body_html = self.html_cache.get(content)
+        if body_html is None:
+            self.stats['html_cache_misses'] += 1
+            body_html = self.rewrite_links(self.expand_directives(content)).strip()
+            self.html_cache[content] = body_html
+        else:
+            self.stats['html_cache_hits'] += 1
+        return body_html
+
+    def iter_pages(self):
+        """Stream CMS pages as Matrixify page rows."""
+        seen_handles = set()
+        for row in self.iter_rows(self.pages_file):
+            self.stats['pages_loaded'] += 1
+            handle = self.page_handle(row.get('identifier', ''))
+            if not handle or handle in SKIPPED_PAGES:
+                self.stats['pages_skipped'] += 1
+                continue
+            # Store-view copies of a page share its identifier; the first one wins
+            if handle in seen_handles:
+                self.stats['duplicate_handles'] += 1
+                continue
+            seen_handles.add(handle)
+
+            yield {
+                'Handle': handle,
+                'Command': 'MERGE',
+                'Title': row.get('title', '').strip(),
+                'Body HTML': self.create_html_content(row.get('content', '')),
+                'Published': 'FALSE' if row.get('is_active', '1') == '0' else 'TRUE',
+                'Template Suffix': '',
+                'Metafield: title_tag [string]': row.get('meta_title', '').strip(),
+                'Metafield: description_tag [string]': row.get('meta_description', '').strip()
+            }
+
+    def part_file_name(self, part_number):
+        """Build the output file name for a part."""
+        return f"{self.output_prefix}-{part_number:03d}.csv"
+
+    def write_pages(self):
+        """Write the migrated pages into size-bounded part files."""
+        logger.info("Writing page import files...")
+
+        file = None
+        writer = None
+        rows_in_part = 0
+        try:
+            for page in self.iter_pages():
+                if writer is None or rows_in_part >= self.max_rows_per_file:
+                    if file:
+                        file.close()
+                    file_name = self.part_file_name(len(self.output_files) + 1)
+                    file = open(file_name, 'w', newline='', encoding='utf-8')
+                    writer = csv.DictWriter(file, fieldnames=PAGE_FIELDNAMES)
+                    writer.writeheader()
+                    self.output_files.append(file_name)
+                    rows_in_part = 0
+
+                writer.writerow(page)
+                rows_in_part += 1
+                self.stats['pages_written'] += 1
+        finally:
+            if file:
+                file.close()
+
+        logger.info(f"Wrote {self.stats['pages_written']} pages to {len(self.output_files)} file(s)")
+
+    def print_statistics(self):
+        """Print detailed statistics about the migration."""
+        logger.info("=" * 50)
+        logger.info("CONTENT MIGRATION STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"Static blocks indexed: {self.stats['blocks_loaded']}")
+        logger.info(f"CMS pages loaded: {self.stats['pages_loaded']}")
+        logger.info(f"Pages skipped (system pages): {self.stats['pages_skipped']}")
+        logger.info(f"Store view duplicates skipped: {self.stats['duplicate_handles']}")
+        logger.info(f"Pages written: {self.stats['pages_written']}")
+        logger.info(f"Directives expanded: {self.stats['directives_expanded']}")
+        block_lookups = self.stats['block_cache_hits'] + self.stats['block_cache_misses']
+        if block_lookups:
+            logger.info(f"Block cache: {self.stats['block_cache_hits']} hits / {block_lookups} expansions "
+                        f"({self.stats['block_cache_hits'] / block_lookups * 100:.1f}% hit rate)")
+        html_renders = self.stats['html_cache_hits'] + self.stats['html_cache_misses']
+        if html_renders:
+            logger.info(f"Body HTML cache: {self.stats['html_cache_hits']} hits / {html_renders} renders")
+        logger.info(f"Internal links rewritten: {self.stats['links_rewritten']}")
+        if self.url_index_file:
+            logger.info(f"Collection links resolved via url_rewrite index: {self.stats['collection_links_from_url_index']}")
+            logger.info(f"Product links: {self.stats['product_links']}")
+        if self.missing_blocks:
+            logger.info(f"Missing static blocks: {', '.join(sorted(self.missing_blocks))}")
+        for widget_type, count in sorted(self.removed_widgets.items(), key=lambda item: -item[1]):
+            logger.info(f"  • removed {widget_type}: {count}")
+        for file_name in self.output_files:
+            logger.info(f"  • {file_name}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete migration process."""
+        logger.info("Starting CMS content migration from Magento to Shopify...")
+
+        try:
+            self.load_block_index()
+            self.load_page_index()
+
+            if self.url_index_file:
+                self.url_index = self.open_url_index()
+            try:
+                self.write_pages()
+            finally:
+                if self.url_index:
+                    self.url_index.close()
+                    self.url_index = None
+            self.print_statistics()
+
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the migration script."""
+    # File paths
+    pages_file = 'magento-cms-pages.csv'
+    blocks_file = 'magento-cms-blocks.csv'
+    output_prefix = 'shopify-pages'
+    url_index_file = os.path.join(PLP_MIGRATOR_DIR, 'url-rewrite-index.sqlite')
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Migrate Magento CMS pages and static blocks into Matrixify page files')
+    parser.add_argument('--pages', default=pages_file, help='Magento cms_page export CSV')
+    parser.add_argument('--blocks', default=blocks_file, help='Magento cms_block export CSV')
+    parser.add_argument('--output-prefix', default=output_prefix, help='Prefix for the page part files')
+    parser.add_argument('--max-rows', type=int, default=5000, help='Maximum pages per part file')
+    parser.add_argument('--base-url', default='https://jrdunn.com', help='Magento store URL (for {{store url}} and internal links)')
+    parser.add_argument('--media-url', default='https://jrdunn.com/media', help='Magento media URL (for {{media url}})')
+    parser.add_argument('--url-index', default=url_index_file,
+                        help='url_rewrite index from plp-content-migrator/url_rewrite_index.py (used when it exists)')
+
+    args = parser.parse_args()
+
+    # Check if input files exist
+    missing_files = [filename for filename in [args.pages, args.blocks] if not os.path.exists(filename)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    url_index_file = args.url_index if os.path.exists(args.url_index) else None
+    if not url_index_file:
+        logger.info(f"No url_rewrite index at {args.url_index}; unknown .html links go to /collections/<last segment>")
+
+    # Run migration
+    migration = ContentMigrationScript(
+        args.pages,
+        args.blocks,
+        args.output_prefix,
+        base_url=args.base_url,
+        media_url=args.media_url,
+        max_rows_per_file=args.max_rows,
+        url_index_file=url_index_file
+    )
+    migration.run()
+
+
+if __name__ == "__main__":
+    main()
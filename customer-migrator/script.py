@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Magento to Shopify Customer Migration Script
+
+This script migrates Magento customer accounts and their addresses to Shopify
+Matrixify customer import files, following the same load -> patch -> write
+approach as the PLP content migration (plp-content-migrator/script.py).
+
+Customer exports are too large to hold in memory, so the two files are joined
+with an external sort-merge:
+
+1. each export is read in runs of --run-size rows; every run is sorted by
+   customer ID and written to a temporary file
+2. the sorted runs of both files are merged back in customer ID order and
+   joined in a single pass, one customer and its addresses at a time
+3. addresses are normalized and deduplicated in chunks across a process pool
+4. customers are written to shopify-customers-001.csv, -002.csv, ... in
+   chunks of --max-customers, never splitting one customer across files
+
+Customers are joined on entity_id / parent_id when the exports have them (CSV
+dumps of the customer_entity and customer_address_entity tables), and on
+email + website for the standard System > Data Transfer > Export files.
+"""
+
+import os
+import re
+import csv
+import sys
+import heapq
+import shutil
+import logging
+import tempfile
+import itertools
+from collections import deque
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CUSTOMER_FIELDNAMES = [
+    'Email', 'Command', 'First Name', 'Last Name', 'Accepts Email Marketing', 'Tags', 'Note', 'Top Row',
+    'Address Command', 'Address First Name', 'Address Last Name', 'Address Company', 'Address Line 1', 'Address Line 2',
+    'Address City', 'Address Province Code', 'Address Country Code', 'Address Zip', 'Address Phone', 'Address Is Default'
+]
+
+# Join columns: (customer file, address file), in order of preference
+JOIN_KEYS = [
+    (('entity_id',), ('parent_id',)),
+    (('email', '_website'), ('_email', '_website')),
+]
+
+PROVINCE_CODES = {
+    'US': {
+        'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA', 'colorado': 'CO',
+        'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC', 'florida': 'FL', 'georgia': 'GA',
+        'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS',
+        'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA',
+        'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT',
+        'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM',
+        'new york': 'NY', 'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK',
+        'oregon': 'OR', 'pennsylvania': 'PA', 'puerto rico': 'PR', 'rhode island': 'RI', 'south carolina': 'SC',
+        'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+        'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY'
+    },
+    'CA': {
+        'alberta': 'AB', 'british columbia': 'BC', 'manitoba': 'MB', 'new brunswick': 'NB',
+        'newfoundland and labrador': 'NL', 'nova scotia': 'NS', 'ontario': 'ON', 'prince edward island': 'PE',
+        'quebec': 'QC', 'saskatchewan': 'SK', 'northwest territories': 'NT', 'nunavut': 'NU', 'yukon': 'YT'
+    }
+}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+CHUNK_SIZE = 2000
+
+
+def collapse(value):
+    """Trim and collapse runs of whitespace."""
+    return WHITESPACE_PATTERN.sub(' ', value or '').strip()
+
+
+def normalize_phone(value, country_code):
+    """Keep digits (and a leading +); US/CA numbers become +1XXXXXXXXXX."""
+    digits = re.sub(r'\D', '', value or '')
+    if not digits:
+        return ''
+    if value.strip().startswith('+'):
+        return '+' + digits
+    if country_code in ('US', 'CA'):
+        if len(digits) == 10:
+            return '+1' + digits
+        if len(digits) == 11 and digits.startswith('1'):
+            return '+' + digits
+    return digits
+
+
+def normalize_zip(value, country_code):
+    """Upper-case postcodes; format US ZIP+4 and Canadian postal codes."""
+    value = collapse(value).upper()
+    if country_code == 'US':
+        digits = re.sub(r'\D', '', value)
+        if len(digits) == 9:
+            return f"{digits[:5]}-{digits[5:]}"
+        if len(digits) == 5:
+            return digits
+    if country_code == 'CA':
+        compact = value.replace(' ', '')
+        if len(compact) == 6:
+            return f"{compact[:3]} {compact[3:]}"
+    return value
+
+
+def normalize_address(row):
+    """Map one Magento address row to normalized Shopify address fields."""
+    country_code = collapse(row.get('country_id', '')).upper()
+    region = collapse(row.get('region', ''))
+    province_code = PROVINCE_CODES.get(country_code, {}).get(region.lower(), region.upper() if len(region) == 2 else region)
+    street = [collapse(line) for line in (row.get('street', '') or '').splitlines() if collapse(line)]
+    return {
+        'Address Command': 'MERGE',
+        'Address First Name': collapse(row.get('firstname', '')),
+        'Address Last Name': collapse(row.get('lastname', '')),
+        'Address Company': collapse(row.get('company', '')),
+        'Address Line 1': street[0] if street else '',
+        'Address Line 2': ', '.join(street[1:]),
+        'Address City': collapse(row.get('city', '')),
+        'Address Province Code': province_code,
+        'Address Country Code': country_code,
+        'Address Zip': normalize_zip(row.get('postcode', ''), country_code),
+        'Address Phone': normalize_phone(row.get('telephone', ''), country_code)
+    }
+
+
+def address_key(address):
+    """Case-insensitive identity of an address, used to drop duplicates."""
+    return tuple(address[column].lower() for column in (
+        'Address Line 1', 'Address Line 2', 'Address City', 'Address Province Code',
+        'Address Country Code', 'Address Zip'))
+
+
+def is_default_address(customer, row):
+    """True when Magento marks the address as the default billing or shipping address."""
+    if row.get('_address_default_billing_') == '1' or row.get('_address_default_shipping_') == '1':
+        return True
+    address_id = row.get('entity_id') or row.get('_entity_id')
+    return bool(address_id) and address_id in (customer.get('default_billing'), customer.get('default_shipping'))
+
+
+def transform_customer(customer, addresses):
+    """Shopify rows for one customer; returns (rows, duplicate addresses removed)."""
+    email = customer.get('email', '').lower()
+    tags = []
+    if customer.get('group_id'):
+        tags.append(f"magento-group-{customer['group_id']}")
+    if customer.get('created_in'):
+        tags.append(customer['created_in'])
+    top = {
+        'Email': email,
+        'Command': 'MERGE',
+        'First Name': collapse(customer.get('firstname', '')),
+        'Last Name': collapse(customer.get('lastname', '')),
+        'Accepts Email Marketing': 'yes' if customer.get('is_subscribed') == '1' else 'no',
+        'Tags': ', '.join(tags),
+        'Note': f"Magento customer {customer['entity_id']}" if customer.get('entity_id') else '',
+        'Top Row': 'TRUE'
+    }
+
+    rows = []
+    seen = {}  # address key -> row index
+    duplicates = 0
+    for row in addresses:
+        address = normalize_address(row)
+        address['Address Is Default'] = 'TRUE' if is_default_address(customer, row) else 'FALSE'
+        key = address_key(address)
+        if key in seen:
+            duplicates += 1
+            if address['Address Is Default'] == 'TRUE':
+                rows[seen[key]]['Address Is Default'] = 'TRUE'
+            continue
+        seen[key] = len(rows)
+        rows.append(address)
+
+    # Shopify allows one default address; keep the first
+    defaults = [address for address in rows if address['Address Is Default'] == 'TRUE']
+    for address in defaults[1:]:
+        address['Address Is Default'] = 'FALSE'
+    if rows and not defaults:
+        rows[0]['Address Is Default'] = 'TRUE'
+
+    if not rows:
+        return [top], duplicates
+    rows[0] = {**top, **rows[0]}
+    for address in rows[1:]:
+        address.update({'Email': email, 'Command': 'MERGE'})
+    return rows, duplicates
+
+
+def transform_chunk(chunk):
+    """Transform a chunk of (customer, addresses) pairs; returns (rows per customer, duplicates removed)."""
+    results = []
+    duplicates = 0
+    for customer, addresses in chunk:
+        rows, removed = transform_customer(customer, addresses)
+        results.append(rows)
+        duplicates += removed
+    return results, duplicates
+
+
+class CustomerMigrationScript:
+    def __init__(self, customers_file, addresses_file, output_prefix, max_customers_per_file=50000,
+                 run_size=100000, max_workers=None, chunk_size=CHUNK_SIZE, work_dir=None):
+        self.customers_file = customers_file
+        self.addresses_file = addresses_file
+        self.output_prefix = output_prefix
+        self.max_customers_per_file = max_customers_per_file
+        self.run_size = run_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.work_dir = work_dir
+        self.temp_dir = None
+        self.output_files = []
+
+        # Statistics
+        self.stats = {
+            'customers_loaded': 0,
+            'addresses_loaded': 0,
+            'sorted_runs': 0,
+            'customers_skipped': 0,
+            'orphan_addresses': 0,
+            'duplicate_addresses': 0,
+            'customers_written': 0,
+            'rows_written': 0
+        }
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        # Remove BOM, quotes, and whitespace
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def read_header(self, filename):
+        """Return the cleaned field names of a CSV file."""
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            return [self.clean_field_name(field) for field in next(csv.reader(file), [])]
+
+    def choose_join_key(self):
+        """Pick the join columns both exports have."""
+        customer_columns = self.read_header(self.customers_file)
+        address_columns = self.read_header(self.addresses_file)
+        for customer_key, address_key_columns in JOIN_KEYS:
+            if all(column in customer_columns for column in customer_key) and \
+                    all(column in address_columns for column in address_key_columns):
+                logger.info(f"Joining customers on {customer_key} = addresses {address_key_columns}")
+                return customer_key, address_key_columns
+        raise ValueError(f"No common customer ID columns in {self.customers_file} and {self.addresses_file}")
+
+    def sort_runs(self, filename, key_columns, label):
+        """Split a CSV into sorted runs on disk; returns (field names, run files, rows read)."""
+        logger.info(f"Sorting {filename} by {', '.join(key_columns)} in runs of {self.run_size:,} rows...")
+        runs = []
+        rows_read = 0
+
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+            key_indexes = [fieldnames.index(column) for column in key_columns]
+            width = len(fieldnames)
+
+            while True:
+                run = []
+                for values in itertools.islice(reader, self.run_size):
+                    values = [value.strip() for value in values[:width]]
+                    values += [''] * (width - len(values))
+                    # Emails are compared case-insensitively
+                    key = '\t'.join(values[index].lower() for index in key_indexes)
+                    run.append([key] + values)
+                if not run:
+                    break
+                rows_read += len(run)
+                run.sort(key=itemgetter(0))
+
+                run_file = os.path.join(self.temp_dir, f"{label}-{len(runs):04d}.csv")
+                with open(run_file, 'w', newline='', encoding='utf-8') as output:
+                    csv.writer(output).writerows(run)
+                runs.append(run_file)
+
+        self.stats['sorted_runs'] += len(runs)
+        logger.info(f"Wrote {len(runs)} sorted runs for {rows_read:,} rows")
+        return fieldnames, runs, rows_read
+
+    def iter_sorted(self, fieldnames, runs):
+        """Merge sorted runs back into one stream of (key, row) in key order."""
+        files = [open(run_file, 'r', encoding='utf-8', newline='') for run_file in runs]
+        try:
+            for values in heapq.merge(*(csv.reader(file) for file in files), key=itemgetter(0)):
+                yield values[0], dict(zip(fieldnames, values[1:]))
+        finally:
+            for file in files:
+                file.close()
+
+    def iter_joined(self):
+        """Merge-join customers with their addresses, one customer at a time."""
+        customer_key, address_key_columns = self.choose_join_key()
+        customer_fields, customer_runs, self.stats['customers_loaded'] = self.sort_runs(
+            self.customers_file, customer_key, 'customers')
+        address_fields, address_runs, self.stats['addresses_loaded'] = self.sort_runs(
+            self.addresses_file, address_key_columns, 'addresses')
+
+        addresses = itertools.groupby(self.iter_sorted(address_fields, address_runs), key=itemgetter(0))
+        address_group = next(addresses, None)
+
+        for key, customer in self.iter_sorted(customer_fields, customer_runs):
+            # Addresses whose customer sorts earlier have no customer row
+            while address_group is not None and address_group[0] < key:
+                self.stats['orphan_addresses'] += sum(1 for _ in address_group[1])
+                address_group = next(addresses, None)
+
+            customer_addresses = []
+            if address_group is not None and address_group[0] == key:
+                customer_addresses = [row for _, row in address_group[1]]
+                address_group = next(addresses, None)
+
+            if '@' not in customer.get('email', ''):
+                self.stats['customers_skipped'] += 1
+                continue
+            yield customer, customer_addresses
+
+        while address_group is not None:
+            self.stats['orphan_addresses'] += sum(1 for _ in address_group[1])
+            address_group = next(addresses, None)
+
+    def iter_chunks(self):
+        """Group joined customers into chunks for the worker pool."""
+        joined = self.iter_joined()
+        while True:
+            chunk = list(itertools.islice(joined, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def iter_customers(self):
+        """Normalize addresses chunk by chunk, keeping only a bounded number of chunks in flight."""
+        if self.max_workers == 1:
+            for chunk in self.iter_chunks():
+                results, duplicates = transform_chunk(chunk)
+                self.stats['duplicate_addresses'] += duplicates
+                yield from results
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            in_flight = deque()
+            for chunk in self.iter_chunks():
+                in_flight.append(pool.submit(transform_chunk, chunk))
+                if len(in_flight) >= self.max_workers * 2:
+                    results, duplicates = in_flight.popleft().result()
+                    self.stats['duplicate_addresses'] += duplicates
+                    yield from results
+            while in_flight:
+                results, duplicates = in_flight.popleft().result()
+                self.stats['duplicate_addresses'] += duplicates
+                yield from results
+
+    def part_file_name(self, part_number):
+        """Build the output file name for a part."""
+        return f"{self.output_prefix}-{part_number:03d}.csv"
+
+    def write_customers(self):
+        """Write the customers into part files of at most max_customers_per_file customers."""
+        logger.info(f"Transforming customers with {self.max_workers} worker(s)...")
+
+        file = None
+        writer = None
+        customers_in_part = 0
+        try:
+            for rows in self.iter_customers():
+                if writer is None or customers_in_part >= self.max_customers_per_file:
+                    if file:
+                        file.close()
+                    file_name = self.part_file_name(len(self.output_files) + 1)
+                    file = open(file_name, 'w', newline='', encoding='utf-8')
+                    writer = csv.DictWriter(file, fieldnames=CUSTOMER_FIELDNAMES)
+                    writer.writeheader()
+                    self.output_files.append(file_name)
+                    customers_in_part = 0
+
+                writer.writerows(rows)
+                customers_in_part += 1
+                self.stats['customers_written'] += 1
+                self.stats['rows_written'] += len(rows)
+        finally:
+            if file:
+                file.close()
+
+        logger.info(f"Wrote {self.stats['customers_written']} customers to {len(self.output_files)} file(s)")
+
+    def print_statistics(self):
+        """Print detailed statistics about the migration."""
+        logger.info("=" * 50)
+        logger.info("CUSTOMER MIGRATION STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"Customers loaded: {self.stats['customers_loaded']}")
+        logger.info(f"Addresses loaded: {self.stats['addresses_loaded']}")
+        logger.info(f"Sorted runs: {self.stats['sorted_runs']}")
+        logger.info(f"Customers skipped (no valid email): {self.stats['customers_skipped']}")
+        logger.info(f"Addresses without a customer: {self.stats['orphan_addresses']}")
+        logger.info(f"Duplicate addresses removed: {self.stats['duplicate_addresses']}")
+        logger.info(f"Customers written: {self.stats['customers_written']} ({self.stats['rows_written']} rows)")
+        for file_name in self.output_files:
+            logger.info(f"  • {file_name}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete migration process."""
+        logger.info("Starting customer migration from Magento to Shopify...")
+
+        self.temp_dir = tempfile.mkdtemp(prefix='customer-runs-', dir=self.work_dir)
+        try:
+            self.write_customers()
+            self.print_statistics()
+
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Migration failed: {e}")
+            raise
+        finally:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def main():
+    """Main function to run the migration script."""
+    # File paths
+    customers_file = 'magento-customers-export.csv'
+    addresses_file = 'magento-customer-addresses-export.csv'
+    output_prefix = 'shopify-customers'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Migrate Magento customers and addresses into Matrixify customer files')
+    parser.add_argument('--customers', default=customers_file, help='Magento customers export CSV')
+    parser.add_argument('--addresses', default=addresses_file, help='Magento customer addresses export CSV')
+    parser.add_argument('--output-prefix', default=output_prefix, help='Prefix for the customer part files')
+    parser.add_argument('--max-customers', type=int, default=50000, help='Maximum customers per part file')
+    parser.add_argument('--run-size', type=int, default=100000, help='Rows sorted in memory at a time')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count, 1 = no pool)')
+    parser.add_argument('--work-dir', help='Directory for the temporary sorted runs (default: system temp)')
+
+    args = parser.parse_args()
+
+    # Check if input files exist
+    missing_files = [filename for filename in [args.customers, args.addresses] if not os.path.exists(filename)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    # Run migration
+    migration = CustomerMigrationScript(
+        args.customers,
+        args.addresses,
+        args.output_prefix,
+        max_customers_per_file=args.max_customers,
+        run_size=args.run_size,
+        max_workers=args.workers,
+        work_dir=args.work_dir
+    )
+    migration.run()
+
+
+if __name__ == "__main__":
+    main()
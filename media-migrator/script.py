@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Magento to Shopify Media Migration Script
+
+This script migrates the images and files referenced by the generated
+Matrixify files (collections, products, pages) to Shopify:
+
+1. every Magento media URL in the input CSVs is collected (src/href in Body
+   HTML, Image Src and other URL columns)
+2. the files are downloaded concurrently: an asyncio queue feeds a fixed pool
+   of --connections workers, each streaming one file at a time
+3. each file is stored once under its SHA-256 (media-store/<sha256>.<ext>, with
+   the extension of the first URL seen), so the same bytes under several URLs
+   or extensions are kept and uploaded once
+4. media-manifest.csv records every finished download; an interrupted run is
+   resumed by skipping finished URLs and continuing partial files with HTTP
+   Range requests
+5. with --cdn-url, references in the input CSVs are rewritten to the uploaded
+   files (<name>-cdn.csv next to each input)
+
+Upload the media-store folder to Shopify (Content > Files) and pass the CDN
+folder URL of the uploaded files as --cdn-url.
+"""
+
+import os
+import re
+import csv
+import sys
+import html
+import asyncio
+import hashlib
+import logging
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+from concurrent.futures import ThreadPoolExecutor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# csv fields hold whole Body HTML documents
+csv.field_size_limit(2 ** 31 - 1)
+
+MEDIA_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.avif', '.ico',
+    '.pdf', '.mp4', '.webm', '.mov', '.mp3', '.zip'
+}
+URL_PATTERN = re.compile(r'https?://[^\s"\'<>()]+')
+MANIFEST_FIELDNAMES = ['URL', 'SHA256', 'File', 'Bytes']
+CHUNK_BYTES = 256 * 1024
+USER_AGENT = 'jrdunn-media-migrator/1.0'
+
+
+def media_extension(url):
+    """Return the media file extension of a URL, or '' when it isn't a media file."""
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return extension if extension in MEDIA_EXTENSIONS else ''
+
+
+def fetch_to_file(url, part_file, timeout):
+    """Stream one URL into a partial file, resuming it when the server supports ranges.
+
+    Returns (sha256 hex digest, file size). Runs in a worker thread.
+    """
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    headers = {'User-Agent': USER_AGENT}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+
+    with urlopen(Request(html.unescape(url), headers=headers), timeout=timeout) as response:
+        hasher = hashlib.sha256()
+        if offset and response.status == 206:
+            # Continue the partial file; its bytes are part of the hash
+            with open(part_file, 'rb') as existing:
+                for chunk in iter(lambda: existing.read(CHUNK_BYTES), b''):
+                    hasher.update(chunk)
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+
+        size = offset
+        with open(part_file, mode) as file:
+            for chunk in iter(lambda: response.read(CHUNK_BYTES), b''):
+                hasher.update(chunk)
+                file.write(chunk)
+                size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+class MediaMigrationScript:
+    def __init__(self, input_files, store_dir='media-store', manifest_file='media-manifest.csv', cdn_url=None,
+                 source_hosts=('jrdunn.com', 'www.jrdunn.com'), max_connections=16, output_suffix='-cdn',
+                 timeout=30, retries=3):
+        self.input_files = input_files
+        self.store_dir = store_dir
+        self.partial_dir = os.path.join(store_dir, '.partial')
+        self.manifest_file = manifest_file
+        self.cdn_url = cdn_url.rstrip('/') if cdn_url else None
+        self.source_hosts = {host.lower() for host in source_hosts}
+        self.max_connections = max_connections
+        self.output_suffix = output_suffix
+        self.timeout = timeout
+        self.retries = retries
+
+        self.urls = {}  # media URL -> None, in first-seen order
+        self.manifest = {}  # URL -> stored file name
+        self.stored_files = {}  # SHA-256 -> stored file name
+        self.failures = {}  # URL -> last error
+        self.output_files = []
+
+        # Statistics
+        self.stats = {
+            'files_scanned': 0,
+            'urls_found': 0,
+            'urls_already_downloaded': 0,
+            'downloaded': 0,
+            'duplicate_content': 0,
+            'failed': 0,
+            'bytes_downloaded': 0,
+            'references_rewritten': 0
+        }
+
+    def is_media_url(self, url):
+        """True for media files hosted on the Magento store."""
+        return urlparse(url).netloc.lower() in self.source_hosts and bool(media_extension(url))
+
+    def iter_cells(self, filename):
+        """Stream every cell of a CSV file."""
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            for values in csv.reader(file):
+                yield from values
+
+    def collect_urls(self):
+        """Find every media URL referenced by the input files."""
+        logger.info(f"Scanning {len(self.input_files)} file(s) for media URLs...")
+
+        try:
+            for filename in self.input_files:
+                for cell in self.iter_cells(filename):
+                    if 'http' not in cell:
+                        continue
+                    for url in URL_PATTERN.findall(cell):
+                        if url not in self.urls and self.is_media_url(url):
+                            self.urls[url] = None
+                self.stats['files_scanned'] += 1
+
+            self.stats['urls_found'] = len(self.urls)
+            logger.info(f"Found {len(self.urls)} distinct media URLs")
+
+        except Exception as e:
+            logger.error(f"Error scanning input files: {e}")
+            raise
+
+    def load_manifest(self):
+        """Load the downloads finished by earlier runs."""
+        if not os.path.exists(self.manifest_file):
+            return
+        with open(self.manifest_file, 'r', encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                if os.path.exists(os.path.join(self.store_dir, row['File'])):
+                    self.manifest[row['URL']] = row['File']
+                    self.stored_files.setdefault(row['SHA256'], row['File'])
+        logger.info(f"Resuming: {len(self.manifest)} URLs already downloaded")
+
+    def part_file_name(self, url):
+        """Partial download file of a URL (stable across runs, so it can be resumed)."""
+        return os.path.join(self.partial_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.part')
+
+    def store_file(self, url, part_file, digest):
+        """Move a finished download into the content-addressed store; returns its file name."""
+        file_name = self.stored_files.get(digest)
+        if file_name and os.path.exists(os.path.join(self.store_dir, file_name)):
+            # Same bytes already stored from another URL, whatever its extension
+            os.remove(part_file)
+            self.stats['duplicate_content'] += 1
+            return file_name
+
+        file_name = digest + media_extension(url)
+        os.replace(part_file, os.path.join(self.store_dir, file_name))
+        self.stored_files[digest] = file_name
+        return file_name
+
+    async def download_worker(self, queue, executor, manifest_writer, manifest):
+        """Download URLs from the queue one at a time until it is empty."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            part_file = self.part_file_name(url)
+            for attempt in range(1, self.retries + 1):
+                try:
+                    digest, size = await loop.run_in_executor(executor, fetch_to_file, url, part_file, self.timeout)
+                    file_name = self.store_file(url, part_file, digest)
+                    self.manifest[url] = file_name
+                    manifest_writer.writerow({'URL': url, 'SHA256': digest, 'File': file_name, 'Bytes': size})
+                    manifest.flush()
+                    self.stats['downloaded'] += 1
+                    self.stats['bytes_downloaded'] += size
+                    self.failures.pop(url, None)
+                    break
+                except Exception as e:
+                    self.failures[url] = str(e)
+                    if attempt < self.retries:
+                        await asyncio.sleep(attempt)
+            else:
+                self.stats['failed'] += 1
+                logger.warning(f"Failed to download {url}: {self.failures[url]}")
+
+            done = self.stats['downloaded'] + self.stats['failed']
+            if done % 500 == 0:
+                logger.info(f"Downloaded {done:,} files ({self.stats['bytes_downloaded'] / 1024 / 1024:,.1f} MB)")
+
+    async def download_all(self, urls):
+        """Download URLs with a fixed pool of concurrent workers."""
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+
+        write_header = not os.path.exists(self.manifest_file)
+        with open(self.manifest_file, 'a', newline='', encoding='utf-8') as manifest, \
+                ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            manifest_writer = csv.DictWriter(manifest, fieldnames=MANIFEST_FIELDNAMES)
+            if write_header:
+                manifest_writer.writeheader()
+            workers = [self.download_worker(queue, executor, manifest_writer, manifest)
+                       for _ in range(min(self.max_connections, len(urls)))]
+            await asyncio.gather(*workers)
+
+    def download_media(self):
+        """Download every media URL that earlier runs haven't finished."""
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self.load_manifest()
+
+        pending = [url for url in self.urls if url not in self.manifest]
+        self.stats['urls_already_downloaded'] = len(self.urls) - len(pending)
+        if not pending:
+            logger.info("All media already downloaded")
+            return
+
+        logger.info(f"Downloading {len(pending)} files with {self.max_connections} connections...")
+        asyncio.run(self.download_all(pending))
+
+    def output_file_name(self, filename):
+        """Build the rewritten file name for an input file."""
+        root, extension = os.path.splitext(filename)
+        return f"{root}{self.output_suffix}{extension}"
+
+    def rewrite_references(self):
+        """Point every downloaded media URL in the input files at the CDN."""
+        def replace(match):
+            file_name = self.manifest.get(match.group(0))
+            if not file_name:
+                return match.group(0)
+            self.stats['references_rewritten'] += 1
+            return f"{self.cdn_url}/{file_name}"
+
+        for filename in self.input_files:
+            output_file = self.output_file_name(filename)
+            logger.info(f"Rewriting media references: {filename} -> {output_file}")
+            with open(filename, 'r', encoding='utf-8', newline='') as source, \
+                    open(output_file, 'w', newline='', encoding='utf-8') as target:
+                writer = csv.writer(target)
+                for values in csv.reader(source):
+                    writer.writerow([URL_PATTERN.sub(replace, value) if 'http' in value else value
+                                     for value in values])
+            self.output_files.append(output_file)
+
+    def print_statistics(self):
+        """Print detailed statistics about the migration."""
+        logger.info("=" * 50)
+        logger.info("MEDIA MIGRATION STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"Files scanned: {self.stats['files_scanned']}")
+        logger.info(f"Media URLs found: {self.stats['urls_found']}")
+        logger.info(f"Already downloaded (resumed): {self.stats['urls_already_downloaded']}")
+        logger.info(f"Downloaded: {self.stats['downloaded']} ({self.stats['bytes_downloaded'] / 1024 / 1024:,.1f} MB)")
+        logger.info(f"Duplicate content stored once: {self.stats['duplicate_content']}")
+        logger.info(f"Failed: {self.stats['failed']}")
+        for url, error in list(self.failures.items())[:10]:
+            logger.info(f"  • {url}: {error}")
+        if self.cdn_url:
+            logger.info(f"References rewritten: {self.stats['references_rewritten']}")
+            for file_name in self.output_files:
+                logger.info(f"  • {file_name}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete migration process."""
+        logger.info("Starting media migration from Magento to Shopify...")
+
+        try:
+            self.collect_urls()
+            self.download_media()
+            if self.cdn_url:
+                self.rewrite_references()
+            self.print_statistics()
+
+            if self.failures:
+                logger.warning("Some downloads failed; run the script again to retry them")
+            logger.info("Media migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Media migration failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the migration script."""
+    # File paths
+    default_inputs = ['../plp-content-migrator/shopify-categories-updated.csv']
+    store_dir = 'media-store'
+    manifest_file = 'media-manifest.csv'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Download, deduplicate and re-point Magento media for Shopify')
+    parser.add_argument('inputs', nargs='*', default=default_inputs, help='Matrixify CSV files to scan and rewrite')
+    parser.add_argument('--store', default=store_dir, help='Content-addressed media folder')
+    parser.add_argument('--manifest', default=manifest_file, help='Download manifest (used to resume)')
+    parser.add_argument('--cdn-url', help='Shopify Files CDN folder URL; rewrites references when given')
+    parser.add_argument('--source-host', action='append', help='Host whose media is migrated (repeatable; default jrdunn.com)')
+    parser.add_argument('--connections', type=int, default=16, help='Concurrent downloads')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a stalled download is retried')
+
+    args = parser.parse_args()
+
+    # Check if input files exist
+    missing_files = [filename for filename in args.inputs if not os.path.exists(filename)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    # Run migration
+    migration = MediaMigrationScript(
+        args.inputs,
+        store_dir=args.store,
+        manifest_file=args.manifest,
+        cdn_url=args.cdn_url,
+        source_hosts=args.source_host or ['jrdunn.com', 'www.jrdunn.com'],
+        max_connections=args.connections,
+        timeout=args.timeout
+    )
+    migration.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ This script analyzes the PLP content migration results, showing:
 2. What collections were not updated (and why)
 3. URLs for all updated collections
 4. Detailed coverage analysis
+
+The analysis is a stream of change records fed to report sinks (report_sinks.py):
+the console shows aggregates and the first --top records of each status, while
+the full detail goes to text, CSV, JSON-lines or HTML report files. The export
+and the updated file are streamed side by side in export order; only the PLP
+content is held in memory.
 """
 
 import csv
@@ -15,10 +21,18 @@ import logging
 from urllib.parse import urlparse
 import re
 
+from report_sinks import SummarySink, PagedTextSink, CSVSink, JSONLinesSink, HTMLTableSink, write_report
+from validate_results import iter_collection_pairs
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Change record statuses
+UPDATED, NOT_UPDATED, UNMATCHED_PLP = 'updated', 'not_updated', 'unmatched_plp'
+
+REPORT_FIELDNAMES = ['Status', 'Handle', 'Title', 'URL', 'Changes', 'Has PLP Content', 'PLP URL', 'PLP Title']
+
 class EnhancedMigrationAnalyzer:
     def __init__(self, plp_content_file, original_shopify_file, updated_shopify_file, base_url):
         self.plp_content_file = plp_content_file
@@ -28,13 +42,11 @@ class EnhancedMigrationAnalyzer:
         
         # Data storage
         self.plp_content_map = {}  # handle -> content data
-        self.original_shopify_data = {}  # handle -> original data
-        self.updated_shopify_data = {}  # handle -> updated data
-        
-        # Analysis results
-        self.updated_collections = []
-        self.not_updated_collections = []
-        self.missing_plp_content = []
+        # Cleaned Shopify rows already in memory; None streams them from the files
+        self.original_shopify_rows = None
+        self.updated_shopify_rows = None
+        self.total_shopify = 0
+        self.matched_plp_handles = set()  # PLP handles with a Shopify collection
         
     def extract_handle_from_url(self, url):
         """Extract handle from URL (same logic as migration script)."""
@@ -74,134 +86,185 @@ class EnhancedMigrationAnalyzer:
             with open(self.plp_content_file, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 
+                rows = []
                 for row in reader:
                     # Clean up the data
                     cleaned_row = {}
                     for key, value in row.items():
                         clean_key = self.clean_field_name(key)
                         cleaned_row[clean_key] = value.strip() if value else ""
-                    
-                    url = cleaned_row.get('URL', '')
-                    handle = self.extract_handle_from_url(url)
-                    
-                    if handle:
-                        self.plp_content_map[handle] = {
-                            'url': url,
-                            'title': cleaned_row.get('Title', ''),
-                            'subheading': cleaned_row.get('Sub-heading', ''),
-                            'description': cleaned_row.get('Description', ''),
-                            'content_under_listing': cleaned_row.get('Content under product listing', '')
-                        }
+                    rows.append(cleaned_row)
                 
-                logger.info(f"Loaded {len(self.plp_content_map)} PLP content entries")
+                self.index_plp_rows(rows)
                 
         except Exception as e:
             logger.error(f"Error loading PLP content: {e}")
             raise
     
-    def load_shopify_data(self, filename, data_dict):
-        """Load Shopify data from CSV file."""
-        logger.info(f"Loading Shopify data from {filename}...")
+    def index_plp_rows(self, rows):
+        """Create the handle mapping from cleaned PLP rows."""
+        for cleaned_row in rows:
+            url = cleaned_row.get('URL', '')
+            handle = self.extract_handle_from_url(url)
+            
+            if handle:
+                self.plp_content_map[handle] = {
+                    'url': url,
+                    'title': cleaned_row.get('Title', ''),
+                    'subheading': cleaned_row.get('Sub-heading', ''),
+                    'description': cleaned_row.get('Description', ''),
+                    'content_under_listing': cleaned_row.get('Content under product listing', '')
+                }
         
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
-                    # Clean up the row data
-                    cleaned_row = {}
-                    for key, value in row.items():
-                        clean_key = self.clean_field_name(key)
-                        cleaned_row[clean_key] = value.strip() if value else ""
-                    
-                    handle = cleaned_row.get('Handle', '')
-                    if handle and handle != 'Handle':
-                        data_dict[handle] = cleaned_row
-                
-                logger.info(f"Loaded {len(data_dict)} entries from {filename}")
-                
-        except Exception as e:
-            logger.error(f"Error loading {filename}: {e}")
-            raise
+        logger.info(f"Loaded {len(self.plp_content_map)} PLP content entries")
+    
+    def iter_shopify_rows(self, filename):
+        """Stream the cleaned rows of a Shopify CSV file."""
+        logger.info(f"Reading Shopify data from {filename}...")
+        
+        with open(filename, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+            for values in reader:
+                yield dict(zip(fieldnames, (value.strip() for value in values)))
+    
+    def iter_collections(self):
+        """Yield (handle, original top row, updated top row or None) per collection in export order.
+        
+        Both files are streamed side by side, so only one collection of each is in memory.
+        """
+        original_rows = self.original_shopify_rows
+        if original_rows is None:
+            original_rows = self.iter_shopify_rows(self.original_shopify_file)
+        updated_rows = self.updated_shopify_rows
+        if updated_rows is None:
+            updated_rows = self.iter_shopify_rows(self.updated_shopify_file)
+        
+        for original_row, updated_row in iter_collection_pairs(original_rows, updated_rows):
+            handle = original_row.get('Handle', '')
+            if handle and handle != 'Handle':
+                yield handle, original_row, updated_row
+    
+    def compare_collection(self, original_row, updated_row):
+        """Return the list of key field changes for one collection."""
+        updated_fields = []
+        
+        # Check Title changes
+        original_title = original_row.get('Title', '')
+        updated_title = updated_row.get('Title', '')
+        if original_title != updated_title and updated_title:
+            updated_fields.append(f"Title: '{original_title}' → '{updated_title}'")
+        
+        # Check Body HTML changes
+        original_html = original_row.get('Body HTML', '')
+        updated_html = updated_row.get('Body HTML', '')
+        if original_html != updated_html and updated_html:
+            updated_fields.append("Body HTML: Updated with new content")
+        
+        # Check subheading metafield changes
+        original_subheading = original_row.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
+        updated_subheading = updated_row.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
+        if original_subheading != updated_subheading and updated_subheading:
+            updated_fields.append(f"Subheading: '{original_subheading}' → '{updated_subheading}'")
+        
+        return updated_fields
+    
+    def collection_record(self, status, handle, updated_row, changes):
+        """Build one change record for a Shopify collection."""
+        plp_content = self.plp_content_map.get(handle, {})
+        return {
+            'status': status,
+            'handle': handle,
+            'title': updated_row.get('Title', '') or handle,
+            'url': f"{self.base_url}/collections/{handle}",
+            'changes': changes,
+            'has_plp_content': handle in self.plp_content_map,
+            'plp_url': plp_content.get('url', ''),
+            'plp_title': plp_content.get('title', '')
+        }
     
-    def analyze_updates(self):
-        """Analyze what collections were actually updated."""
+    def iter_change_records(self):
+        """Yield change records: updated collections, then not updated, then unmatched PLP content."""
         logger.info("Analyzing collection updates...")
         
-        for handle, updated_row in self.updated_shopify_data.items():
-            original_row = self.original_shopify_data.get(handle)
-            
-            if not original_row:
-                continue
-            
-            # Check if any key fields were updated
-            updated_fields = []
-            
-            # Check Title changes
-            original_title = original_row.get('Title', '')
-            updated_title = updated_row.get('Title', '')
-            if original_title != updated_title and updated_title:
-                updated_fields.append(f"Title: '{original_title}' → '{updated_title}'")
-            
-            # Check Body HTML changes
-            original_html = original_row.get('Body HTML', '')
-            updated_html = updated_row.get('Body HTML', '')
-            if original_html != updated_html and updated_html:
-                updated_fields.append("Body HTML: Updated with new content")
-            
-            # Check subheading metafield changes
-            original_subheading = original_row.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
-            updated_subheading = updated_row.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
-            if original_subheading != updated_subheading and updated_subheading:
-                updated_fields.append(f"Subheading: '{original_subheading}' → '{updated_subheading}'")
-            
-            # Determine if this collection was updated
-            if updated_fields:
-                # This collection was updated
-                collection_info = {
-                    'handle': handle,
-                    'title': updated_title or handle,
-                    'url': f"{self.base_url}/collections/{handle}",
-                    'changes': updated_fields,
-                    'has_plp_content': handle in self.plp_content_map,
-                    'plp_content': self.plp_content_map.get(handle, {})
-                }
-                self.updated_collections.append(collection_info)
-            else:
-                # This collection was not updated
-                collection_info = {
+        # One streaming pass per status keeps the updated records ahead of the rest
+        self.total_shopify = 0
+        self.matched_plp_handles = set()
+        for wanted in (UPDATED, NOT_UPDATED):
+            for handle, original_row, updated_row in self.iter_collections():
+                if wanted == UPDATED:
+                    self.total_shopify += 1
+                    if handle in self.plp_content_map:
+                        self.matched_plp_handles.add(handle)
+                if updated_row is None:
+                    continue
+                changes = self.compare_collection(original_row, updated_row)
+                if bool(changes) == (wanted == UPDATED):
+                    yield self.collection_record(wanted, handle, updated_row, changes)
+        
+        # PLP content that didn't match any Shopify collection
+        for handle, plp_content in self.plp_content_map.items():
+            if handle not in self.matched_plp_handles:
+                yield {
+                    'status': UNMATCHED_PLP,
                     'handle': handle,
-                    'title': updated_title or handle,
-                    'url': f"{self.base_url}/collections/{handle}",
-                    'has_plp_content': handle in self.plp_content_map,
-                    'plp_content': self.plp_content_map.get(handle, {})
+                    'title': plp_content.get('title', '') or handle,
+                    'url': '',
+                    'changes': [],
+                    'has_plp_content': True,
+                    'plp_url': plp_content.get('url', ''),
+                    'plp_title': plp_content.get('title', '')
                 }
-                self.not_updated_collections.append(collection_info)
-        
-        # Find PLP content that didn't match any Shopify collection
-        plp_handles = set(self.plp_content_map.keys())
-        shopify_handles = set(self.original_shopify_data.keys())
-        unmatched_plp = plp_handles - shopify_handles
-        
-        for handle in unmatched_plp:
-            self.missing_plp_content.append({
-                'handle': handle,
-                'plp_content': self.plp_content_map[handle]
-            })
     
-    def print_analysis(self):
-        """Print comprehensive analysis results."""
+    def format_text_record(self, record):
+        """Format one record as lines for the paged text report."""
+        if record['status'] == UNMATCHED_PLP:
+            return [
+                f"[{record['status']}] Handle: {record['handle']}",
+                f"       PLP URL: {record['plp_url'] or 'N/A'}",
+                f"       PLP Title: {record['plp_title'] or 'N/A'}"
+            ]
+        lines = [
+            f"[{record['status']}] {record['title']}",
+            f"       Handle: {record['handle']}",
+            f"       URL: {record['url']}"
+        ]
+        if record['changes']:
+            lines.append("       Changes:")
+            lines.extend(f"         • {change}" for change in record['changes'])
+        elif record['has_plp_content']:
+            lines.append("       Status: Has PLP content but no changes detected")
+        else:
+            lines.append("       Status: No matching PLP content found")
+        return lines
+    
+    def format_row(self, record):
+        """Flatten one record for the CSV and HTML reports."""
+        return {
+            'Status': record['status'],
+            'Handle': record['handle'],
+            'Title': record['title'],
+            'URL': record['url'],
+            'Changes': '; '.join(record['changes']),
+            'Has PLP Content': 'Yes' if record['has_plp_content'] else 'No',
+            'PLP URL': record['plp_url'],
+            'PLP Title': record['plp_title']
+        }
+    
+    def print_analysis(self, summary):
+        """Print aggregate statistics and the top records of each status."""
         print("=" * 80)
         print("ENHANCED MIGRATION ANALYSIS")
         print("=" * 80)
         print()
         
         # Overall statistics
-        total_shopify = len(self.original_shopify_data)
+        total_shopify = self.total_shopify
         total_plp = len(self.plp_content_map)
-        updated_count = len(self.updated_collections)
-        not_updated_count = len(self.not_updated_collections)
-        missing_plp_count = len(self.missing_plp_content)
+        updated_count = summary.count(UPDATED)
+        not_updated_count = summary.count(NOT_UPDATED)
+        missing_plp_count = summary.count(UNMATCHED_PLP)
+        top_n = summary.top_n
         
         print("📊 OVERALL STATISTICS:")
         print(f"   • Total Shopify collections: {total_shopify}")
@@ -209,13 +272,13 @@ class EnhancedMigrationAnalyzer:
         print(f"   • Collections updated: {updated_count}")
         print(f"   • Collections not updated: {not_updated_count}")
         print(f"   • PLP content without matching collections: {missing_plp_count}")
-        print(f"   • Update success rate: {(updated_count/total_shopify*100):.1f}%")
+        print(f"   • Update success rate: {(updated_count/total_shopify*100):.1f}%" if total_shopify else "   • Update success rate: N/A")
         print()
         
-        # Updated collections
-        print("✅ UPDATED COLLECTIONS:")
+        # Updated collections (sample)
+        print(f"✅ UPDATED COLLECTIONS (Sample of {top_n}):")
         print("-" * 40)
-        for i, collection in enumerate(self.updated_collections, 1):
+        for i, collection in enumerate(summary.sample(UPDATED), 1):
             print(f"{i:2d}. {collection['title']}")
             print(f"     Handle: {collection['handle']}")
             print(f"     URL: {collection['url']}")
@@ -224,11 +287,14 @@ class EnhancedMigrationAnalyzer:
                 print(f"       • {change}")
             print()
         
+        if updated_count > top_n:
+            print(f"   ... and {updated_count - top_n} more collections updated")
+            print()
+        
         # Not updated collections (sample)
-        print("❌ COLLECTIONS NOT UPDATED (Sample of 10):")
+        print(f"❌ COLLECTIONS NOT UPDATED (Sample of {top_n}):")
         print("-" * 40)
-        sample_not_updated = self.not_updated_collections[:10]
-        for i, collection in enumerate(sample_not_updated, 1):
+        for i, collection in enumerate(summary.sample(NOT_UPDATED), 1):
             print(f"{i:2d}. {collection['title']}")
             print(f"     Handle: {collection['handle']}")
             print(f"     URL: {collection['url']}")
@@ -238,23 +304,22 @@ class EnhancedMigrationAnalyzer:
                 print(f"     Status: No matching PLP content found")
             print()
         
-        if len(self.not_updated_collections) > 10:
-            print(f"   ... and {len(self.not_updated_collections) - 10} more collections not updated")
+        if not_updated_count > top_n:
+            print(f"   ... and {not_updated_count - top_n} more collections not updated")
         print()
         
         # Missing PLP content (sample)
-        if self.missing_plp_content:
-            print("⚠️  PLP CONTENT WITHOUT MATCHING COLLECTIONS (Sample of 10):")
+        if missing_plp_count:
+            print(f"⚠️  PLP CONTENT WITHOUT MATCHING COLLECTIONS (Sample of {top_n}):")
             print("-" * 40)
-            sample_missing = self.missing_plp_content[:10]
-            for i, item in enumerate(sample_missing, 1):
+            for i, item in enumerate(summary.sample(UNMATCHED_PLP), 1):
                 print(f"{i:2d}. Handle: {item['handle']}")
-                print(f"     PLP URL: {item['plp_content'].get('url', 'N/A')}")
-                print(f"     PLP Title: {item['plp_content'].get('title', 'N/A')}")
+                print(f"     PLP URL: {item['plp_url'] or 'N/A'}")
+                print(f"     PLP Title: {item['plp_title'] or 'N/A'}")
                 print()
             
-            if len(self.missing_plp_content) > 10:
-                print(f"   ... and {len(self.missing_plp_content) - 10} more PLP entries without matches")
+            if missing_plp_count > top_n:
+                print(f"   ... and {missing_plp_count - top_n} more PLP entries without matches")
             print()
         
         # Analysis summary
@@ -274,85 +339,39 @@ class EnhancedMigrationAnalyzer:
         
         print("=" * 80)
     
-    def save_detailed_report(self, output_file):
-        """Save detailed report to file."""
-        logger.info(f"Saving detailed report to {output_file}...")
+    def build_sinks(self, text_file=None, csv_file=None, jsonl_file=None, html_file=None, top_n=10):
+        """Create the summary sink plus any requested report file sinks."""
+        summary = SummarySink(top_n)
+        sinks = [summary]
+        if text_file:
+            sinks.append(PagedTextSink(text_file, self.format_text_record, "ENHANCED MIGRATION ANALYSIS REPORT"))
+        if csv_file:
+            sinks.append(CSVSink(csv_file, REPORT_FIELDNAMES, self.format_row))
+        if jsonl_file:
+            sinks.append(JSONLinesSink(jsonl_file))
+        if html_file:
+            sinks.append(HTMLTableSink(html_file, REPORT_FIELDNAMES, self.format_row, "Migration Coverage Analysis"))
+        return summary, sinks
+    
+    def analyze(self, text_file=None, csv_file=None, jsonl_file=None, html_file=None, top_n=10):
+        """Analyze the loaded data and write the reports."""
+        # Stream the analysis into the console summary and report files
+        summary, sinks = self.build_sinks(text_file, csv_file, jsonl_file, html_file, top_n)
+        write_report(self.iter_change_records(), sinks)
         
-        try:
-            with open(output_file, 'w', encoding='utf-8') as file:
-                file.write("ENHANCED MIGRATION ANALYSIS REPORT\n")
-                file.write("=" * 80 + "\n\n")
-                
-                # Statistics
-                total_shopify = len(self.original_shopify_data)
-                total_plp = len(self.plp_content_map)
-                updated_count = len(self.updated_collections)
-                
-                file.write(f"Total Shopify collections: {total_shopify}\n")
-                file.write(f"Total PLP content entries: {total_plp}\n")
-                file.write(f"Collections updated: {updated_count}\n")
-                file.write(f"Update success rate: {(updated_count/total_shopify*100):.1f}%\n\n")
-                
-                # Updated collections
-                file.write("UPDATED COLLECTIONS:\n")
-                file.write("-" * 40 + "\n")
-                for i, collection in enumerate(self.updated_collections, 1):
-                    file.write(f"{i:2d}. {collection['title']}\n")
-                    file.write(f"     Handle: {collection['handle']}\n")
-                    file.write(f"     URL: {collection['url']}\n")
-                    file.write(f"     Changes:\n")
-                    for change in collection['changes']:
-                        file.write(f"       • {change}\n")
-                    file.write("\n")
-                
-                # Not updated collections
-                file.write("COLLECTIONS NOT UPDATED:\n")
-                file.write("-" * 40 + "\n")
-                for i, collection in enumerate(self.not_updated_collections, 1):
-                    file.write(f"{i:2d}. {collection['title']}\n")
-                    file.write(f"     Handle: {collection['handle']}\n")
-                    file.write(f"     URL: {collection['url']}\n")
-                    if collection['has_plp_content']:
-                        file.write(f"     Status: Has PLP content but no changes detected\n")
-                    else:
-                        file.write(f"     Status: No matching PLP content found\n")
-                    file.write("\n")
-                
-                # Missing PLP content
-                if self.missing_plp_content:
-                    file.write("PLP CONTENT WITHOUT MATCHING COLLECTIONS:\n")
-                    file.write("-" * 40 + "\n")
-                    for i, item in enumerate(self.missing_plp_content, 1):
-                        file.write(f"{i:2d}. Handle: {item['handle']}\n")
-                        file.write(f"     PLP URL: {item['plp_content'].get('url', 'N/A')}\n")
-                        file.write(f"     PLP Title: {item['plp_content'].get('title', 'N/A')}\n")
-                        file.write("\n")
-                
-            logger.info(f"Successfully saved detailed report to {output_file}")
-            
-        except Exception as e:
-            logger.error(f"Error saving report: {e}")
-            raise
+        # Print analysis
+        self.print_analysis(summary)
+        return summary
     
-    def run(self, save_report=False):
+    def run(self, text_file=None, csv_file=None, jsonl_file=None, html_file=None, top_n=10):
         """Run the complete enhanced analysis."""
         logger.info("Starting enhanced migration analysis...")
         
         try:
             # Load all data
             self.load_plp_content()
-            self.load_shopify_data(self.original_shopify_file, self.original_shopify_data)
-            self.load_shopify_data(self.updated_shopify_file, self.updated_shopify_data)
             
-            # Analyze updates
-            self.analyze_updates()
-            
-            # Print analysis
-            self.print_analysis()
-            
-            # Save report if requested
-            if save_report:
-                self.save_detailed_report('enhanced_migration_report.txt')
+            self.analyze(text_file, csv_file, jsonl_file, html_file, top_n)
             
             logger.info("Enhanced migration analysis completed successfully!")
             
@@ -367,6 +386,7 @@ def main():
     original_shopify_file = 'shopify-categories-export.csv'
     updated_shopify_file = 'shopify-categories-updated.csv'
     base_url = 'https://zj2y7h-80.myshopify.com'
+    report_file = 'enhanced_migration_report.txt'
     
     # Check if input files exist
     import os
@@ -382,7 +402,12 @@ def main():
     # Parse command line arguments
     import argparse
     parser = argparse.ArgumentParser(description='Enhanced migration coverage and update analysis')
-    parser.add_argument('--save-report', action='store_true', help='Save detailed report to file')
+    parser.add_argument('--save-report', action='store_true', help=f'Save detailed text report to {report_file}')
+    parser.add_argument('--base-url', default=base_url, help='Store base URL (e.g. https://your-store.myshopify.com)')
+    parser.add_argument('--top', type=int, default=10, help='Records of each status to show on the console')
+    parser.add_argument('--csv', help='Save every record to a CSV file')
+    parser.add_argument('--jsonl', help='Save every record to a JSON-lines file')
+    parser.add_argument('--html', help='Save every record to a paged HTML report')
     
     args = parser.parse_args()
     
@@ -391,9 +416,15 @@ def main():
         plp_content_file, 
         original_shopify_file, 
         updated_shopify_file, 
-        base_url
+        args.base_url
+    )
+    analyzer.run(
+        text_file=report_file if args.save_report else None,
+        csv_file=args.csv,
+        jsonl_file=args.jsonl,
+        html_file=args.html,
+        top_n=args.top
     )
-    analyzer.run(save_report=args.save_report)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Pre-import Shopify Constraint Checker
+
+Checks shopify-categories-updated.csv against the limits that make a Matrixify
+import fail, before uploading it:
+
+- handles that are missing, longer than 255 characters or not URL-safe
+- titles longer than 255 characters
+- single_line_text_field metafields containing newlines or over-length values
+- SEO title/description metafields longer than Shopify shows
+- malformed Body HTML (html_checker.py: unbalanced or stray tags, disallowed elements);
+  Body HTML unchanged from the export is existing store content, so it only warns
+- the same handle used by more than one collection
+
+Rules are compiled once against the CSV header, rows are checked in chunks
+across a process pool, and every problem is written to an error CSV with its
+spreadsheet row number (the header is row 1). Exits with status 1 when any
+error is found.
+"""
+
+import os
+import re
+import csv
+import sys
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import html_checker
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ERROR, WARNING = 'error', 'warning'
+
+# Shopify limits checked before import
+HANDLE_MAX_LENGTH = 255
+TITLE_MAX_LENGTH = 255
+SINGLE_LINE_MAX_LENGTH = 5000
+SEO_TITLE_MAX_LENGTH = 70
+SEO_DESCRIPTION_MAX_LENGTH = 320
+
+HANDLE_PATTERN = re.compile(r'^[a-z0-9]+(-[a-z0-9]+)*$')
+METAFIELD_PATTERN = re.compile(r'^Metafield: (\S+) \[(\w+)\]$')
+
+ERROR_FIELDNAMES = ['Row', 'ID', 'Handle', 'Column', 'Rule', 'Severity', 'Message', 'Value']
+CHUNK_SIZE = 2000
+
+# Per-worker compiled rules, set once by init_worker
+worker_rules = []
+
+
+def check_handle(value):
+    if not value:
+        return ERROR, "handle is empty"
+    if len(value) > HANDLE_MAX_LENGTH:
+        return ERROR, f"handle is {len(value)} characters (max {HANDLE_MAX_LENGTH})"
+    if not HANDLE_PATTERN.match(value):
+        return WARNING, "handle has characters other than lowercase letters, digits and single hyphens"
+    return None
+
+
+def check_max_length(max_length, severity=ERROR):
+    def check(value):
+        if len(value) > max_length:
+            return severity, f"{len(value)} characters (max {max_length})"
+        return None
+    return check
+
+
+def check_single_line(value):
+    if '\n' in value or '\r' in value:
+        return ERROR, "single_line_text_field contains a newline"
+    if len(value) > SINGLE_LINE_MAX_LENGTH:
+        return ERROR, f"{len(value)} characters (max {SINGLE_LINE_MAX_LENGTH})"
+    return None
+
+
+def check_body_html(allowed_tags):
+    def check(value):
+        problems = html_checker.check_body_html(value, allowed_tags)
+        if not problems:
+            return None
+        # Report the first error (or warning) and how many more the HTML checker found
+        severity, message = next((problem for problem in problems if problem[0] == ERROR), problems[0])
+        more = f" (+{len(problems) - 1} more, see html_checker.py)" if len(problems) > 1 else ""
+        return severity, f"Body HTML: {message}{more}"
+    return check
+
+
+def compile_rules(header, allowed_tags):
+    """Resolve every rule to a column index once.
+
+    Returns the cleaned column names and a list of
+    (index, column, rule name, check, check empty values, first row of a collection only).
+    """
+    columns = [column.replace('\ufeff', '').strip().strip('"').strip("'") for column in header]
+    rules = []
+    for index, column in enumerate(columns):
+        if column == 'Handle':
+            rules.append((index, column, 'handle', check_handle, True, True))
+        elif column == 'Title':
+            rules.append((index, column, 'title_length', check_max_length(TITLE_MAX_LENGTH), False, False))
+        elif column == 'Body HTML':
+            rules.append((index, column, 'body_html', check_body_html(allowed_tags), False, False))
+        elif column == 'Metafield: title_tag [string]':
+            rules.append((index, column, 'seo_title_length', check_max_length(SEO_TITLE_MAX_LENGTH, WARNING), False, False))
+        elif column == 'Metafield: description_tag [string]':
+            rules.append((index, column, 'seo_description_length',
+                          check_max_length(SEO_DESCRIPTION_MAX_LENGTH, WARNING), False, False))
+        else:
+            match = METAFIELD_PATTERN.match(column)
+            if match and match.group(2) == 'single_line_text_field':
+                rules.append((index, column, 'single_line', check_single_line, False, False))
+    return columns, rules
+
+
+def init_worker(header, allowed_tags):
+    """Compile the rules once per worker process."""
+    worker_rules[:] = compile_rules(header, allowed_tags)[1]
+
+
+def check_rows(chunk, rules=None):
+    """Check a chunk of (row number, id, handle, values, first row, Body HTML unchanged) tuples; returns error rows."""
+    rules = rules or worker_rules
+    errors = []
+    for row_number, category_id, handle, values, first_row, html_unchanged in chunk:
+        for index, column, rule_name, check, check_empty, first_row_only in rules:
+            if first_row_only and not first_row:
+                continue
+            value = values[index] if index < len(values) else ''
+            if not value and not check_empty:
+                continue
+            result = check(value)
+            if result:
+                severity, message = result
+                if rule_name == 'body_html' and html_unchanged:
+                    severity, message = WARNING, f"{message} (unchanged from export)"
+                errors.append({
+                    'Row': row_number,
+                    'ID': category_id,
+                    'Handle': handle,
+                    'Column': column,
+                    'Rule': rule_name,
+                    'Severity': severity,
+                    'Message': message,
+                    'Value': value[:100] + "..." if len(value) > 100 else value
+                })
+    return errors
+
+
+class ImportConstraintChecker:
+    def __init__(self, csv_file, error_file, max_workers=None, chunk_size=CHUNK_SIZE, layouts_file=None,
+                 export_file=None):
+        self.csv_file = csv_file
+        self.error_file = error_file
+        self.export_file = export_file
+        self.allowed_tags = html_checker.allowed_tags_for(layouts_file)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.duplicate_errors = []
+
+        # Statistics
+        self.stats = {
+            'rows_checked': 0,
+            'errors': 0,
+            'warnings': 0,
+            'duplicate_handles': 0
+        }
+        self.rule_counts = {}
+
+    def iter_chunks(self, reader, columns):
+        """Yield row chunks while checking handle uniqueness across the whole file."""
+        id_index = columns.index('ID') if 'ID' in columns else None
+        handle_index = columns.index('Handle') if 'Handle' in columns else None
+        html_index = columns.index('Body HTML') if 'Body HTML' in columns else None
+        handle_owners = {}  # handle -> (collection ID, row number)
+        previous_key = None
+        baseline = html_checker.open_export_baseline(self.export_file) if html_index is not None else None
+
+        try:
+            chunk = []
+            for row_number, values in enumerate(reader, 2):
+                category_id = values[id_index] if id_index is not None and id_index < len(values) else ''
+                handle = values[handle_index] if handle_index is not None and handle_index < len(values) else ''
+                markup = values[html_index] if html_index is not None and html_index < len(values) else ''
+                html_unchanged = baseline.is_unchanged(category_id, handle, markup) if baseline else False
+
+                # Rows of a multi-row collection repeat its ID and handle consecutively
+                key = (category_id, handle)
+                first_row = key != previous_key
+                if handle and first_row:
+                    owner = handle_owners.get(handle)
+                    if owner is None:
+                        handle_owners[handle] = (category_id, row_number)
+                    else:
+                        self.duplicate_errors.append({
+                            'Row': row_number,
+                            'ID': category_id,
+                            'Handle': handle,
+                            'Column': 'Handle',
+                            'Rule': 'duplicate_handle',
+                            'Severity': ERROR,
+                            'Message': f"handle already used by collection {owner[0] or '(no ID)'} on row {owner[1]}",
+                            'Value': handle
+                        })
+                previous_key = key
+
+                chunk.append((row_number, category_id, handle, values, first_row, html_unchanged))
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            if baseline:
+                baseline.close()
+
+    def iter_errors(self):
+        """Check every row, keeping only a bounded number of chunks in flight."""
+        with open(self.csv_file, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            columns, rules = compile_rules(header, self.allowed_tags)
+            logger.info(f"Compiled {len(rules)} rules for {len(columns)} columns")
+            chunks = self.iter_chunks(reader, columns)
+
+            if self.max_workers == 1:
+                for chunk in chunks:
+                    self.stats['rows_checked'] += len(chunk)
+                    yield from check_rows(chunk, rules)
+                return
+
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                     initargs=(header, self.allowed_tags)) as pool:
+                in_flight = deque()
+                max_in_flight = self.max_workers * 2
+                for chunk in chunks:
+                    self.stats['rows_checked'] += len(chunk)
+                    in_flight.append(pool.submit(check_rows, chunk))
+                    if len(in_flight) >= max_in_flight:
+                        yield from in_flight.popleft().result()
+                while in_flight:
+                    yield from in_flight.popleft().result()
+
+    def record(self, error):
+        """Count one error row."""
+        self.stats['errors' if error['Severity'] == ERROR else 'warnings'] += 1
+        self.rule_counts[error['Rule']] = self.rule_counts.get(error['Rule'], 0) + 1
+
+    def check(self):
+        """Run every rule and stream the results to the error file."""
+        logger.info(f"Checking {self.csv_file} against Shopify import constraints...")
+
+        try:
+            with open(self.error_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=ERROR_FIELDNAMES)
+                writer.writeheader()
+                for error in self.iter_errors():
+                    self.record(error)
+                    writer.writerow(error)
+
+                # Duplicates are only known once the whole file has been read
+                self.stats['duplicate_handles'] = len(self.duplicate_errors)
+                for error in self.duplicate_errors:
+                    self.record(error)
+                    writer.writerow(error)
+
+            logger.info(f"Saved {self.stats['errors'] + self.stats['warnings']} findings to {self.error_file}")
+
+        except Exception as e:
+            logger.error(f"Error checking constraints: {e}")
+            raise
+
+    def print_summary(self):
+        """Print the constraint check summary."""
+        print("=" * 80)
+        print("SHOPIFY IMPORT CONSTRAINT CHECK")
+        print("=" * 80)
+        print(f"Rows checked: {self.stats['rows_checked']:,}")
+        print(f"Errors: {self.stats['errors']:,}")
+        print(f"Warnings: {self.stats['warnings']:,}")
+        for rule_name, count in sorted(self.rule_counts.items(), key=lambda item: -item[1]):
+            print(f"   • {rule_name}: {count:,}")
+        print()
+        if self.stats['errors']:
+            print(f"❌ Fix the errors in {self.error_file} before importing")
+        else:
+            print("✅ No blocking problems found; safe to import")
+        print("=" * 80)
+
+    def run(self):
+        """Run the complete constraint check; returns True when there are no errors."""
+        self.check()
+        self.print_summary()
+        return self.stats['errors'] == 0
+
+
+def main():
+    """Main function to run the import constraint checker."""
+    # File paths
+    csv_file = 'shopify-categories-updated.csv'
+    error_file = 'import-constraint-errors.csv'
+    layouts_file = 'body-html-layouts.json'
+    export_file = 'shopify-categories-export.csv'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Check the migration output against Shopify import constraints')
+    parser.add_argument('--input', default=csv_file, help='Matrixify CSV to check')
+    parser.add_argument('--errors', default=error_file, help='Error CSV to write')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count, 1 = no pool)')
+    parser.add_argument('--export', default=export_file, help='Export the output came from; unchanged Body HTML only warns')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        logger.error(f"CSV file not found: {args.input}")
+        logger.error("Please run the migration script first.")
+        sys.exit(1)
+
+    checker = ImportConstraintChecker(args.input, args.errors, args.workers, layouts_file=layouts_file,
+                                      export_file=args.export)
+    try:
+        passed = checker.run()
+    except Exception:
+        sys.exit(1)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Compact In-Memory Rows for the PLP Content Migration
+
+A Matrixify export row used to be a dict of 30+ cleaned column names, and
+every row was copied again before patching. Here every row read from one file
+shares a single RowSchema (column name -> index), and a row holds only a
+tuple of its values. Patching is copy-on-write: copy() shares the value tuple
+and only the columns that are actually set are recorded, so unpatched rows
+are never duplicated. Repeated cell values ('MERGE', 'TRUE', the ID and
+handle on every row of a group, ...) are stored once per schema.
+
+CategoryRow is a Mapping, so existing code keeps using row.get(),
+row['Handle'], row.keys() and csv.DictWriter unchanged. Its only writes,
+row['Title'] = ... and assign(), go to the copy-on-write overrides.
+
+PLPContent replaces the per-handle dict in the content map with a named tuple.
+"""
+
+from collections import namedtuple
+from collections.abc import Mapping
+
+# Columns with more distinct values than this stop being shared (IDs, titles, ...)
+SHARED_VALUES_LIMIT = 256
+
+# One content map entry per PLP handle
+PLPContent = namedtuple('PLPContent', ['title', 'subheading', 'description', 'content_under_listing', 'layout', 'values'])
+
+
+class RowSchema:
+    """Column names of one CSV file, shared by every row read from it."""
+    __slots__ = ('columns', 'index', 'source_indices', 'width', 'padding', 'added_columns', 'target_positions',
+                 'shared_values', 'previous_values')
+
+    def __init__(self, fieldnames, extra_columns=(), target_columns=()):
+        # Duplicate header names collapse to one column holding the last value, as with csv.DictReader
+        positions = {}
+        for position, column in enumerate(fieldnames):
+            positions[column] = position
+        columns = list(dict.fromkeys(fieldnames))
+        self.source_indices = None if len(columns) == len(fieldnames) else [positions[column] for column in columns]
+        self.width = len(fieldnames)
+        self.padding = ('',) * len(extra_columns)
+        self.added_columns = tuple(extra_columns)  # not in the file; blank unless patched
+        self.columns = tuple(columns) + tuple(extra_columns)
+        self.index = {column: position for position, column in enumerate(self.columns)}
+        # Field mapping target number -> column position, resolved once per file
+        self.target_positions = tuple(self.index[column] for column in target_columns)
+        self.shared_values = [{} for _ in columns]  # per column: value -> shared copy, None once too varied
+        self.previous_values = None
+
+    def make_row(self, values):
+        """Build a row from raw CSV values (stripped; short rows padded, long rows truncated)."""
+        if len(values) != self.width:
+            values = (values + [''] * self.width)[:self.width]
+        if self.source_indices is not None:
+            values = [values[position] for position in self.source_indices]
+        values = self.share_values([value.strip() for value in values])
+        self.previous_values = values
+        return CategoryRow(self, tuple(values) + self.padding)
+
+    def share_values(self, values):
+        """Replace repeated cell values with one shared string object."""
+        previous_values = self.previous_values
+        shared_values = self.shared_values
+        for position, value in enumerate(values):
+            if not value:
+                continue
+            # Rows of one collection group repeat the ID, handle, ...
+            if previous_values is not None and previous_values[position] == value:
+                values[position] = previous_values[position]
+                continue
+            shared = shared_values[position]
+            if shared is not None:
+                values[position] = shared.setdefault(value, value)
+                if len(shared) > SHARED_VALUES_LIMIT:
+                    shared_values[position] = None
+        return values
+
+
+class CategoryRow(Mapping):
+    """One export row: shared schema + value tuple (Mapping reads), with copy-on-write overrides for writes."""
+    __slots__ = ('schema', 'values', 'overrides')
+
+    def __init__(self, schema, values, overrides=None):
+        self.schema = schema
+        self.values = values
+        self.overrides = overrides  # column index -> value, only for columns set after copy()
+
+    def __getitem__(self, column):
+        position = self.schema.index[column]
+        if self.overrides and position in self.overrides:
+            return self.overrides[position]
+        return self.values[position]
+
+    def get(self, column, default=None):
+        position = self.schema.index.get(column)
+        if position is None:
+            return default
+        if self.overrides and position in self.overrides:
+            return self.overrides[position]
+        return self.values[position]
+
+    def __setitem__(self, column, value):
+        position = self.schema.index.get(column)
+        if position is None:
+            raise KeyError(f"Column '{column}' is not in the export; add it to the schema")
+        if self.overrides is None:
+            self.overrides = {}
+        self.overrides[position] = value
+
+    def __iter__(self):
+        return iter(self.schema.columns)
+
+    def __len__(self):
+        return len(self.schema.columns)
+
+    def __repr__(self):
+        return f"CategoryRow({dict(self)!r})"
+
+    def assign(self, positions, assignments):
+        """Set (target number, value) assignments, with target numbers resolved through positions."""
+        if self.overrides is None:
+            self.overrides = {}
+        overrides = self.overrides
+        for target, value in assignments:
+            overrides[positions[target]] = value
+
+    def copy(self):
+        """Cheap copy sharing the value tuple; later assignments only touch the copy."""
+        return CategoryRow(self.schema, self.values, dict(self.overrides) if self.overrides else None)
+
+    def as_list(self):
+        """Values in schema column order, with overrides applied (for csv.writer)."""
+        if not self.overrides:
+            return self.values
+        values = list(self.values)
+        for position, value in self.overrides.items():
+            values[position] = value
+        return values
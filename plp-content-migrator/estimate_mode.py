@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Estimate Mode for the PLP Content Migration
+
+Predicts what a full run will cost before it is started in a maintenance
+window. A sample of collection groups is taken from the Shopify export and a
+sample of rows from the PLP content file. The real matching, Body HTML
+rendering and CSV writing then run on that sample, and the results are scaled
+to the whole file. It reports runtime, peak memory, output size, collection
+match rate and no-match count, each with a 95% confidence interval. The
+collection match rate is the share of export collections that get PLP content;
+it is not the migration's "Match rate" (matched PLP handles ÷ PLP handles).
+
+Started with `python3 script.py --estimate`.
+
+Files up to `scan_limit` bytes are read once and reservoir-sampled, so their
+row and collection counts are exact. Larger files are sampled at random byte
+offsets instead: each probe finds the nearest record boundary and reads the
+whole collection group around the offset. Every file is then probed in a few megabytes, so a
+multi-GB export is estimated in seconds. Totals are ratio estimates scaled by
+file size in bytes.
+"""
+
+import io
+import os
+import csv
+import math
+import time
+import random
+import logging
+import tracemalloc
+
+from compact_rows import RowSchema
+
+logger = logging.getLogger(__name__)
+
+Z_95 = 1.96
+PROBE_WINDOW = 16 * 1024  # bytes read on each side of a probe; doubled until the group is complete
+MAX_PROBE_WINDOW = 4 * 1024 * 1024
+
+
+class ByteCountingLines:
+    """Decode lines of a binary stream for csv.reader while counting the bytes consumed."""
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.bytes_read = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.lines)
+        self.bytes_read += len(line)
+        return line.decode('utf-8', errors='replace')
+
+
+class SampledFile:
+    """Sampled record groups of one CSV file and what is known about the whole file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file_bytes = os.path.getsize(path)
+        self.header = []
+        self.groups = []  # raw bytes of every sampled group
+        self.full_scan = False
+        self.total_groups = None  # exact when the whole file was scanned
+        self.total_rows = None
+        self.header_bytes = 0
+
+    @property
+    def data_bytes(self):
+        """Bytes after the header line."""
+        return self.file_bytes - self.header_bytes
+
+    @property
+    def sizes(self):
+        return [len(raw) for raw in self.groups]
+
+
+class MigrationEstimator:
+    def __init__(self, migration, sample_size=2000, scan_limit=16 * 1024 * 1024, seed=None):
+        self.migration = migration
+        self.sample_size = sample_size
+        self.scan_limit = scan_limit
+        self.random = random.Random(seed)
+
+        self.plp = None
+        self.export = None
+        self.estimates = {}  # name -> (estimate, low, high)
+        self.sample_stats = {}
+
+        # The migration logs every mapped and updated handle; keep the sample run quiet
+        self.migration_logger = logging.getLogger(type(migration).__module__)
+
+    def group_key_function(self, header, columns):
+        """Return a function mapping a record to its group key (None: every record is its own group)."""
+        indexes = [header.index(column) for column in columns if column in header]
+        if not indexes:
+            return None
+        return lambda values: tuple(values[index] if index < len(values) else '' for index in indexes)
+
+    def record_validator(self, header, key_column, pattern_check):
+        """Return a check that a parsed record looks like a real row, used to find record boundaries."""
+        width = len(header)
+        index = header.index(key_column) if key_column in header else None
+
+        def is_record(values):
+            if len(values) != width:
+                return False
+            return index is None or pattern_check(values[index].strip())
+        return is_record
+
+    def read_header(self, sampled):
+        """Read and clean the header line."""
+        with open(sampled.path, 'rb') as file:
+            header_line = file.readline()
+        sampled.header_bytes = len(header_line)
+        raw_header = next(csv.reader([header_line.decode('utf-8', errors='replace')]), [])
+        sampled.header = [self.migration.clean_field_name(field) for field in raw_header]
+
+    def scan_sample(self, sampled, group_key):
+        """Read the whole file once and reservoir-sample its groups (Algorithm R)."""
+        sampled.full_scan = True
+        total_groups = 0
+        total_rows = 0
+        reservoir = []  # (start, size) of the sampled groups
+
+        def finish_group(start, size):
+            nonlocal total_groups
+            total_groups += 1
+            if len(reservoir) < self.sample_size:
+                reservoir.append((start, size))
+            else:
+                slot = self.random.randrange(total_groups)
+                if slot < self.sample_size:
+                    reservoir[slot] = (start, size)
+
+        with open(sampled.path, 'rb') as file:
+            lines = ByteCountingLines(file)
+            reader = csv.reader(lines)
+            next(reader, None)
+            group_start = lines.bytes_read
+            record_end = group_start
+            current_key = None
+            for values in reader:
+                key = group_key(values) if group_key else None
+                if total_rows and (group_key is None or key != current_key):
+                    finish_group(group_start, record_end - group_start)
+                    group_start = record_end
+                total_rows += 1
+                current_key = key
+                record_end = lines.bytes_read
+            if total_rows:
+                finish_group(group_start, record_end - group_start)
+
+            # Only the sampled groups are kept as bytes
+            for start, size in sorted(reservoir):
+                file.seek(start)
+                sampled.groups.append(file.read(size))
+
+        sampled.total_groups = total_groups
+        sampled.total_rows = total_rows
+
+    def read_group_at(self, file, offset, sampled, group_key, is_record):
+        """Return the raw bytes of the group whose bytes contain an offset, or None."""
+        window = PROBE_WINDOW
+        while window <= MAX_PROBE_WINDOW:
+            window_start = max(sampled.header_bytes, offset - window)
+            file.seek(window_start)
+            chunk = file.read(offset + window - window_start)
+            at_end = window_start + len(chunk) >= sampled.file_bytes
+            lines = chunk.splitlines(keepends=True)
+            if not at_end and lines:
+                lines.pop()  # possibly cut off
+
+            # Unless the window starts right after the header, its first line is probably partial
+            at_start = window_start == sampled.header_bytes
+            first_line = 0 if at_start else 1
+            position = window_start + sum(len(line) for line in lines[:first_line])
+            for line_number in range(first_line, len(lines)):
+                if position > offset:
+                    break  # no record boundary before the offset in this window
+                group = self.group_at(lines[line_number:], position, offset, group_key, is_record,
+                                      at_start and line_number == 0, at_end)
+                if group is False:
+                    break
+                if group is not None:
+                    start, size = group
+                    return chunk[start - window_start:start - window_start + size]
+                position += len(lines[line_number])
+            if at_start and at_end:
+                return None
+            window *= 2
+        return None
+
+    def group_at(self, lines, position, offset, group_key, is_record, complete_start, at_end):
+        """Parse from a candidate line at `position` and return (start, size) of the group containing `offset`.
+
+        Returns None if the line is not a record boundary and False if the window
+        does not hold the whole group.
+        """
+        counting = ByteCountingLines(lines)
+        reader = csv.reader(counting)
+        group_rows = 0
+        current_key = None
+        group_start = record_start = position
+        first_group = True
+        try:
+            for record_number, values in enumerate(reader):
+                if not is_record(values):
+                    return None
+                key = group_key(values) if group_key else record_number
+                if group_rows and key != current_key:
+                    if record_start > offset:
+                        # The group that just ended covers the offset
+                        if first_group and not complete_start:
+                            return False
+                        return group_start, record_start - group_start
+                    first_group = False
+                    group_start = record_start
+                    group_rows = 0
+                group_rows += 1
+                current_key = key
+                record_start = position + counting.bytes_read
+        except csv.Error:
+            return None
+        if at_end and group_rows and group_start <= offset < record_start:
+            if first_group and not complete_start:
+                return False
+            return group_start, record_start - group_start
+        return None if at_end else False
+
+    def probe_sample(self, sampled, group_key, is_record):
+        """Sample groups at random byte offsets without reading the whole file.
+
+        A group is hit with probability proportional to its size in bytes, which
+        ratio_estimate() corrects for.
+        """
+        with open(sampled.path, 'rb') as file:
+            for _ in range(self.sample_size):
+                offset = self.random.randrange(sampled.header_bytes, sampled.file_bytes)
+                raw = self.read_group_at(file, offset, sampled, group_key, is_record)
+                if raw is not None:
+                    sampled.groups.append(raw)
+
+    def sample_file(self, path, group_columns, key_column, pattern_check):
+        """Sample one CSV file, scanning it fully when it is small."""
+        sampled = SampledFile(path)
+        self.read_header(sampled)
+        group_key = self.group_key_function(sampled.header, group_columns)
+        if sampled.file_bytes <= self.scan_limit:
+            self.scan_sample(sampled, group_key)
+        else:
+            is_record = self.record_validator(sampled.header, key_column, pattern_check)
+            self.probe_sample(sampled, group_key, is_record)
+        logger.info(f"Sampled {len(sampled.groups)} groups from {path} "
+                    f"({'full scan' if sampled.full_scan else 'byte-offset probes'})")
+        return sampled
+
+    def ratio_estimate(self, sampled, values):
+        """Scale a per-group sample quantity to the whole file; returns (estimate, low, high)."""
+        sizes = sampled.sizes
+        sample_count = len(values)
+        if not sample_count or not sum(sizes):
+            return 0.0, 0.0, 0.0
+
+        if sampled.full_scan:
+            # Uniform sample: ratio estimator with the finite population correction
+            ratio = sum(values) / sum(sizes)
+            estimate = ratio * sampled.data_bytes
+            if sample_count < 2:
+                return estimate, estimate, estimate
+            residual_variance = sum((value - ratio * size) ** 2 for value, size in zip(values, sizes)) / (sample_count - 1)
+            standard_error = (sampled.data_bytes * math.sqrt(residual_variance / sample_count)
+                              / (sum(sizes) / sample_count))
+            standard_error *= math.sqrt(max(0.0, 1 - sample_count / sampled.total_groups))
+        else:
+            # Size-proportional sample: Hansen-Hurwitz estimator
+            per_byte = [value / size for value, size in zip(values, sizes)]
+            estimate = sampled.data_bytes * sum(per_byte) / sample_count
+            if sample_count < 2:
+                return estimate, estimate, estimate
+            mean = sum(per_byte) / sample_count
+            variance = sum((value - mean) ** 2 for value in per_byte) / (sample_count - 1)
+            standard_error = sampled.data_bytes * math.sqrt(variance / sample_count)
+        return estimate, max(0.0, estimate - Z_95 * standard_error), estimate + Z_95 * standard_error
+
+    def count_estimate(self, sampled, exact, values):
+        """Use the exact count of a fully scanned file, otherwise a ratio estimate."""
+        if sampled.full_scan:
+            return exact, exact, exact
+        return self.ratio_estimate(sampled, values)
+
+    def reset_migration(self):
+        """Start from empty content and caches, as a fresh run would."""
+        migration = self.migration
+        migration.content_map = {}
+        migration.interned_text = {}
+        migration.html_cache = {}
+        migration.patch_cache = {}
+        migration.renderer.pipeline.inline_cache = {}
+        migration.renderer.pipeline.block_cache = {}
+
+    def parse_group(self, raw):
+        """Parse the records of one sampled group."""
+        return csv.reader(ByteCountingLines(raw.splitlines(keepends=True)))
+
+    def measure(self, measure_memory):
+        """Run the real mapping, patching and writing on the sample.
+
+        Returns per-group lists for both files. Timing and memory are measured
+        in separate passes because tracemalloc slows every allocation.
+        """
+        migration = self.migration
+        self.reset_migration()
+        memory = (lambda: tracemalloc.get_traced_memory()[0]) if measure_memory else (lambda: 0)
+        result = {name: [] for name in ['plp_seconds', 'plp_memory', 'seconds', 'memory', 'rows', 'matched', 'output_bytes']}
+
+        retained = []  # a normal run keeps every parsed and patched row until it saves
+
+        header = self.plp.header
+        for raw in self.plp.groups:
+            memory_before = memory()
+            started = time.perf_counter()
+            for values in self.parse_group(raw):
+                cleaned_row = {column: value.strip() for column, value in zip(header, values)}
+                retained.append(cleaned_row)
+                migration.map_plp_row(cleaned_row)
+            result['plp_seconds'].append(time.perf_counter() - started)
+            result['plp_memory'].append(memory() - memory_before)
+
+        schema = RowSchema(self.export.header, migration.field_mapping.missing_targets(self.export.header),
+                           migration.field_mapping.target_columns)
+        for raw in self.export.groups:
+            memory_before = memory()
+            updated_before = migration.stats['categories_updated']
+            started = time.perf_counter()
+
+            rows = [schema.make_row(values) for values in self.parse_group(raw) if values]
+            buffer = io.StringIO()
+            for patched in migration.iter_patched_groups(rows):
+                csv.writer(buffer).writerows(row.as_list() for row in patched)
+                retained.append((rows, patched))
+            output_bytes = len(buffer.getvalue().encode('utf-8'))
+            buffer = None
+
+            result['seconds'].append(time.perf_counter() - started)
+            result['memory'].append(memory() - memory_before)
+            result['rows'].append(len(rows))
+            result['output_bytes'].append(output_bytes)
+            result['matched'].append(migration.stats['categories_updated'] - updated_before)
+        return result
+
+    def estimate(self):
+        """Measure the sample and scale every quantity to the whole files."""
+        plp_count = len(self.plp.groups)
+        export_count = len(self.export.groups)
+        self.estimates['plp_rows'] = self.count_estimate(self.plp, self.plp.total_groups, [1] * plp_count)
+        total_plp_rows = self.estimates['plp_rows'][0]
+        self.sample_stats['plp_fraction'] = min(1.0, plp_count / total_plp_rows) if total_plp_rows else 1.0
+
+        timing = self.measure(measure_memory=False)
+        tracemalloc.start()
+        try:
+            memory = self.measure(measure_memory=True)
+        finally:
+            tracemalloc.stop()
+
+        self.sample_stats['matched_in_sample'] = sum(1 for value in timing['matched'] if value)
+        self.sample_stats['largest_group_memory'] = max(memory['memory'], default=0)
+        self.estimates['plp_seconds'] = self.ratio_estimate(self.plp, timing['plp_seconds'])
+        self.estimates['content_map_memory'] = self.ratio_estimate(self.plp, memory['plp_memory'])
+        self.estimates['collections'] = self.count_estimate(self.export, self.export.total_groups, [1] * export_count)
+        self.estimates['rows'] = self.count_estimate(self.export, self.export.total_rows, timing['rows'])
+        self.estimates['collection_match_rate'] = self.collection_match_rate(timing['matched'])
+        self.estimates['export_seconds'] = self.ratio_estimate(self.export, timing['seconds'])
+        self.estimates['output_bytes'] = self.ratio_estimate(self.export, timing['output_bytes'])
+        self.estimates['export_memory'] = self.ratio_estimate(self.export, memory['memory'])
+
+    def collection_match_rate(self, matched):
+        """Share of collections with PLP content, with a Wilson score interval; returns percentages."""
+        sizes = self.export.sizes
+        sample_count = len(matched)
+        if not sample_count:
+            return 0.0, 0.0, 0.0
+        if self.export.full_scan:
+            rate = sum(matched) / sample_count
+        else:
+            # Undo the size-proportional selection of probed groups
+            rate = sum(value / size for value, size in zip(matched, sizes)) / sum(1 / size for size in sizes)
+
+        plp_fraction = self.sample_stats['plp_fraction']
+        if self.export.full_scan and sample_count == self.export.total_groups and plp_fraction == 1:
+            low = high = rate
+        else:
+            z_squared = Z_95 ** 2
+            denominator = 1 + z_squared / sample_count
+            center = (rate + z_squared / (2 * sample_count)) / denominator
+            half_width = Z_95 * math.sqrt(rate * (1 - rate) / sample_count
+                                          + z_squared / (4 * sample_count ** 2)) / denominator
+            low, high = max(0.0, center - half_width), min(1.0, center + half_width)
+
+        # A sampled PLP file only holds a fraction of the handles; scale the matches up
+        return tuple(min(1.0, value / plp_fraction) * 100 for value in (rate, low, high))
+
+    def combine(self):
+        """Derive totals that depend on both files."""
+        collections = self.estimates['collections'][0]
+        matched = tuple(collections * rate / 100 for rate in self.estimates['collection_match_rate'])
+        self.estimates['matched'] = matched
+        self.estimates['no_match'] = (collections - matched[0], collections - matched[2], collections - matched[1])
+        self.estimates['runtime'] = tuple(
+            plp + export for plp, export in zip(self.estimates['plp_seconds'], self.estimates['export_seconds']))
+        header_bytes = self.export.header_bytes
+        self.estimates['output_bytes'] = tuple(value + header_bytes for value in self.estimates['output_bytes'])
+        self.estimates['peak_memory'] = tuple(
+            plp + export for plp, export in zip(self.estimates['content_map_memory'], self.estimates['export_memory']))
+        self.estimates['stream_peak_memory'] = tuple(
+            plp + self.sample_stats['largest_group_memory'] for plp in self.estimates['content_map_memory'])
+
+    def format_bytes(self, value):
+        """Human-readable byte count."""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if value < 1024 or unit == 'GB':
+                return f"{value:.1f} {unit}" if unit != 'B' else f"{value:.0f} B"
+            value /= 1024
+
+    def format_seconds(self, value):
+        """Human-readable duration."""
+        if value < 60:
+            return f"{value:.1f}s"
+        if value < 3600:
+            return f"{value / 60:.1f} min"
+        return f"{value / 3600:.1f} h"
+
+    def print_estimate(self, elapsed):
+        """Print the extrapolated totals with their confidence intervals."""
+        def line(label, name, formatter):
+            estimate, low, high = self.estimates[name]
+            if low == high:
+                print(f"{label:<24} {formatter(estimate)}")
+            else:
+                print(f"{label:<24} {formatter(estimate)}  (95% CI {formatter(low)} – {formatter(high)})")
+
+        count = lambda value: f"{value:,.0f}"
+        percent = lambda value: f"{value:.1f}%"
+
+        print("=" * 80)
+        print("MIGRATION ESTIMATE")
+        print("=" * 80)
+        for sampled in [self.plp, self.export]:
+            method = 'full scan' if sampled.full_scan else 'byte-offset probes'
+            print(f"{sampled.path}: {self.format_bytes(sampled.file_bytes)}, "
+                  f"{len(sampled.groups):,} groups sampled ({method})")
+        print()
+        line("PLP entries", 'plp_rows', count)
+        line("Collections", 'collections', count)
+        line("Export rows", 'rows', count)
+        line("Collections updated", 'matched', count)
+        line("No match found", 'no_match', count)
+        line("Collection match rate", 'collection_match_rate', percent)
+        print("   (collections with PLP content ÷ collections; the migration's \"Match rate\" is PLP handles matched ÷ PLP handles)")
+        print()
+        line("Runtime", 'runtime', self.format_seconds)
+        line("Peak memory", 'peak_memory', self.format_bytes)
+        line("Peak memory (--stream)", 'stream_peak_memory', self.format_bytes)
+        line("Output size", 'output_bytes', self.format_bytes)
+        if self.sample_stats['plp_fraction'] < 1:
+            print()
+            print(f"⚠️  Only {self.sample_stats['plp_fraction'] * 100:.1f}% of the PLP file was sampled; "
+                  f"matches ({self.sample_stats['matched_in_sample']} in the sample) are scaled up accordingly")
+        print()
+        print(f"Estimated in {elapsed:.1f}s")
+        print("=" * 80)
+
+    def run(self):
+        """Sample both files, run the migration on the sample and print the estimate."""
+        logger.info("Estimating the migration from a sample...")
+        started = time.perf_counter()
+        level = self.migration_logger.level
+        self.migration_logger.setLevel(logging.WARNING)
+        try:
+            self.plp = self.sample_file(self.migration.plp_content_file, [], 'URL',
+                                        lambda value: value.startswith(('http://', 'https://', '/')))
+            self.export = self.sample_file(self.migration.shopify_categories_file, ['ID', 'Handle'], 'ID',
+                                           lambda value: value.isdigit())
+            self.estimate()
+            self.combine()
+        except Exception as e:
+            logger.error(f"Estimate failed: {e}")
+            raise
+        finally:
+            self.migration_logger.setLevel(level)
+        self.print_estimate(time.perf_counter() - started)
+        return self.estimates
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Declarative Field Mapping for the PLP Content Migration
+
+Describes which PLP columns feed which Matrixify export columns, and how, as a
+JSON (or YAML, when PyYAML is installed) spec:
+
+    {
+      "fields": [
+        {"target": "Title", "source": "Title"},
+        {"target": "Body HTML", "transform": "body_html", "when": "Description",
+         "source": ["Title", "Sub-heading", "Description", "Content under product listing"]},
+        {"target": "Metafield: title_tag [string]", "source": "Title", "max_length": 70}
+      ]
+    }
+
+- source     PLP column, or list of columns for body_html
+- transform  text (default), single_line, strip_html, body_html, or a list applied in order
+- when       PLP column that must be non-empty (defaults to the first source)
+- max_length optional truncation applied last
+
+The spec is compiled once into a plan of source indices and transform
+functions. Each distinct PLP row is turned into a tuple of (target number, value)
+assignments once, where the target number indexes target_columns; every export
+schema resolves those numbers to column positions once, so patching a collection
+is a tight loop of positional assignments however many fields are mapped. Run
+this file to check a spec.
+"""
+
+import re
+import sys
+import json
+import html
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# The original hardcoded Title / Body HTML / subheading assignments
+DEFAULT_FIELD_MAPPING = {
+    'fields': [
+        {'target': 'Title', 'source': 'Title'},
+        {'target': 'Body HTML', 'transform': 'body_html', 'when': 'Description',
+         'source': ['Title', 'Sub-heading', 'Description', 'Content under product listing']},
+        {'target': 'Metafield: custom.collection_subheading [single_line_text_field]', 'source': 'Sub-heading'},
+    ]
+}
+
+BODY_HTML_SOURCES = 4
+
+
+def single_line(value):
+    """Collapse newlines and repeated whitespace (single_line_text_field metafields)."""
+    return ' '.join(value.split())
+
+
+def strip_html(value):
+    """Remove tags and decode entities (SEO descriptions)."""
+    return html.unescape(re.sub(r'<[^>]*>', ' ', value)).strip()
+
+
+TEXT_TRANSFORMS = {
+    'text': lambda value: value,
+    'single_line': single_line,
+    'strip_html': strip_html,
+}
+
+
+def load_field_mapping(mapping_file):
+    """Load a mapping spec from a JSON or YAML file."""
+    with open(mapping_file, 'r', encoding='utf-8') as file:
+        if mapping_file.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"PyYAML is required to read {mapping_file} (pip install pyyaml), or use JSON")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+class CompiledField:
+    """One mapped target column with its source indices and transform chain."""
+    __slots__ = ('target', 'source_indices', 'when_index', 'transform_names', 'transforms', 'is_body_html', 'max_length')
+
+    def __init__(self, target, source_indices, when_index, transform_names, transforms, is_body_html, max_length):
+        self.target = target
+        self.transform_names = transform_names
+        self.source_indices = source_indices
+        self.when_index = when_index
+        self.transforms = transforms
+        self.is_body_html = is_body_html
+        self.max_length = max_length
+
+
+class FieldMappingPlan:
+    def __init__(self, spec=None):
+        spec = spec or DEFAULT_FIELD_MAPPING
+        self.source_columns = []  # PLP columns the plan reads, in value-tuple order
+        self.fields = [self.compile_field(field) for field in spec.get('fields', [])]
+        if not self.fields:
+            raise ValueError("Field mapping has no fields")
+        self.target_columns = [field.target for field in self.fields]
+
+    @classmethod
+    def from_file(cls, mapping_file):
+        """Compile a plan from a JSON or YAML spec file."""
+        return cls(load_field_mapping(mapping_file))
+
+    def source_index(self, column):
+        """Return the value-tuple index of a PLP source column."""
+        if column not in self.source_columns:
+            self.source_columns.append(column)
+        return self.source_columns.index(column)
+
+    def compile_field(self, field):
+        """Compile one field spec."""
+        target = field.get('target')
+        sources = field.get('source')
+        if not target or not sources:
+            raise ValueError(f"Field mapping entry needs 'target' and 'source': {field}")
+        if isinstance(sources, str):
+            sources = [sources]
+
+        transform_names = field.get('transform', 'text')
+        if isinstance(transform_names, str):
+            transform_names = [transform_names]
+
+        is_body_html = 'body_html' in transform_names
+        if is_body_html:
+            if transform_names != ['body_html'] or len(sources) != BODY_HTML_SOURCES:
+                raise ValueError(f"'{target}': body_html takes exactly 4 sources "
+                                 f"(title, subheading, description, content under listing) and no other transforms")
+            transforms = ()
+        else:
+            if len(sources) != 1:
+                raise ValueError(f"'{target}': only body_html accepts more than one source column")
+            unknown = [name for name in transform_names if name not in TEXT_TRANSFORMS]
+            if unknown:
+                raise ValueError(f"'{target}': unknown transform(s) {unknown}; "
+                                 f"available: {sorted(TEXT_TRANSFORMS) + ['body_html']}")
+            transforms = tuple(TEXT_TRANSFORMS[name] for name in transform_names if name != 'text')
+
+        max_length = field.get('max_length')
+        if max_length is not None and (not isinstance(max_length, int) or max_length <= 0):
+            raise ValueError(f"'{target}': max_length must be a positive integer")
+
+        source_indices = tuple(self.source_index(column) for column in sources)
+        when_index = self.source_index(field.get('when', sources[0]))
+        return CompiledField(target, source_indices, when_index, tuple(transform_names), transforms, is_body_html, max_length)
+
+    def missing_targets(self, columns):
+        """Return mapped target columns that the export does not have yet."""
+        return [target for target in self.target_columns if target not in columns]
+
+    def build_patches(self, values, layout, render_body_html):
+        """Turn one PLP row's source values into (target number, value) assignments."""
+        patches = []
+        for target, field in enumerate(self.fields):
+            if not values[field.when_index]:
+                continue
+
+            if field.is_body_html:
+                value = render_body_html(*[values[index] for index in field.source_indices], layout)
+            else:
+                value = values[field.source_indices[0]]
+                for transform in field.transforms:
+                    value = transform(value)
+
+            if field.max_length and len(value) > field.max_length:
+                value = value[:field.max_length].rstrip()
+            patches.append((target, value))
+        return tuple(patches)
+
+
+def main():
+    """Main function to compile and display a field mapping spec."""
+    mapping_file = sys.argv[1] if len(sys.argv) > 1 else None
+
+    try:
+        plan = FieldMappingPlan.from_file(mapping_file) if mapping_file else FieldMappingPlan()
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid field mapping: {e}")
+        sys.exit(1)
+
+    print("=" * 80)
+    print(f"FIELD MAPPING PLAN ({mapping_file or 'built-in default'})")
+    print("=" * 80)
+    print(f"PLP source columns: {', '.join(plan.source_columns)}")
+    print()
+    for field in plan.fields:
+        sources = ', '.join(plan.source_columns[index] for index in field.source_indices)
+        transforms = ', '.join(field.transform_names)
+        print(f"• {field.target}")
+        print(f"    from: {sources}")
+        print(f"    when: {plan.source_columns[field.when_index]} is not empty")
+        print(f"    transform: {transforms}" + (f", max {field.max_length} chars" if field.max_length else ""))
+
+
+if __name__ == "__main__":
+    main()
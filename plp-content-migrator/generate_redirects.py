@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Shopify URL Redirect Generator
+
+This script streams the PLP content file, maps every Magento URL to its Shopify
+collection handle (same extraction as the migration script), and writes
+Matrixify-ready URL redirect import files, e.g.
+/designers/gucci-jewelry.html -> /collections/gucci-jewelry
+
+Handles that don't exist in the Shopify export are resolved with fuzzy matching.
+Output is deduplicated by path and split into size-bounded parts so large
+redirect sets can be imported in parallel.
+"""
+
+import csv
+import os
+import sys
+import logging
+import difflib
+from urllib.parse import urlparse
+
+from script import PLPMigrationScript
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REDIRECT_FIELDNAMES = ['Path', 'Target', 'Command']
+
+
+class RedirectGenerator:
+    def __init__(self, plp_content_file, shopify_categories_file, output_prefix,
+                 max_rows_per_file=5000, fuzzy_cutoff=0.85, url_index_file=None):
+        self.plp_content_file = plp_content_file
+        self.shopify_categories_file = shopify_categories_file
+        self.output_prefix = output_prefix
+        self.max_rows_per_file = max_rows_per_file
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        # Reuse the migration script's URL -> handle logic
+        self.migration = PLPMigrationScript(plp_content_file, shopify_categories_file, None, url_index_file)
+
+        self.shopify_handles = set()
+        self.handle_buckets = {}  # first character -> handles, keeps fuzzy search cheap
+        self.fuzzy_cache = {}
+        self.output_files = []
+
+        # Statistics
+        self.stats = {
+            'plp_urls_read': 0,
+            'exact_matches': 0,
+            'fuzzy_matches': 0,
+            'unmatched': 0,
+            'duplicates_skipped': 0,
+            'redirects_written': 0
+        }
+
+    def load_shopify_handles(self):
+        """Stream the Shopify export and keep only the set of handles."""
+        logger.info(f"Loading Shopify handles from {self.shopify_categories_file}...")
+
+        try:
+            with open(self.shopify_categories_file, 'r', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                header = [self.migration.clean_field_name(field) for field in next(reader)]
+                handle_index = header.index('Handle')
+
+                for row in reader:
+                    if len(row) > handle_index:
+                        handle = row[handle_index].strip()
+                        if handle and handle not in self.shopify_handles:
+                            self.shopify_handles.add(handle)
+                            self.handle_buckets.setdefault(handle[0], []).append(handle)
+
+            logger.info(f"Loaded {len(self.shopify_handles)} unique Shopify handles")
+
+        except Exception as e:
+            logger.error(f"Error loading Shopify handles: {e}")
+            raise
+
+    def fuzzy_resolve(self, handle):
+        """Find the closest existing Shopify handle, or None."""
+        if handle in self.fuzzy_cache:
+            return self.fuzzy_cache[handle]
+
+        candidates = self.handle_buckets.get(handle[0], [])
+        matches = difflib.get_close_matches(handle, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        resolved = matches[0] if matches else None
+        self.fuzzy_cache[handle] = resolved
+        return resolved
+
+    def resolve_target_handle(self, handle):
+        """Return the Shopify handle a PLP handle should redirect to."""
+        if not self.shopify_handles or handle in self.shopify_handles:
+            self.stats['exact_matches'] += 1
+            return handle
+
+        resolved = self.fuzzy_resolve(handle)
+        if resolved:
+            self.stats['fuzzy_matches'] += 1
+            logger.info(f"Fuzzy matched handle: '{handle}' -> '{resolved}'")
+            return resolved
+
+        self.stats['unmatched'] += 1
+        return None
+
+    def iter_redirects(self):
+        """Stream (path, target) pairs from the PLP content file."""
+        url_index = None
+        if self.migration.url_index_file:
+            from url_rewrite_index import UrlRewriteIndex
+            url_index = UrlRewriteIndex(self.migration.url_index_file)
+
+        try:
+            with open(self.plp_content_file, 'r', encoding='utf-8') as file:
+                reader = csv.DictReader(file)
+
+                for row in reader:
+                    url = ''
+                    for key, value in row.items():
+                        if self.migration.clean_field_name(key) == 'URL':
+                            url = value.strip() if value else ""
+                            break
+
+                    if not url:
+                        continue
+                    self.stats['plp_urls_read'] += 1
+
+                    handle = self.migration.resolve_handle(url, url_index)
+                    if not handle:
+                        self.stats['unmatched'] += 1
+                        continue
+
+                    target_handle = self.resolve_target_handle(handle)
+                    if not target_handle:
+                        logger.warning(f"No Shopify collection for URL: {url}")
+                        continue
+
+                    path = '/' + urlparse(url).path.lstrip('/')
+                    target = f"/collections/{target_handle}"
+                    if path != target:
+                        yield path, target
+        finally:
+            if url_index:
+                url_index.close()
+
+    def part_file_name(self, part_number):
+        """Build the output file name for a part."""
+        return f"{self.output_prefix}-{part_number:03d}.csv"
+
+    def write_redirects(self):
+        """Write deduplicated redirects into size-bounded part files."""
+        logger.info("Writing redirect import files...")
+
+        seen_paths = set()
+        file = None
+        writer = None
+        rows_in_part = 0
+
+        try:
+            for path, target in self.iter_redirects():
+                key = path.lower()
+                if key in seen_paths:
+                    self.stats['duplicates_skipped'] += 1
+                    continue
+                seen_paths.add(key)
+
+                if writer is None or rows_in_part >= self.max_rows_per_file:
+                    if file:
+                        file.close()
+                    file_name = self.part_file_name(len(self.output_files) + 1)
+                    file = open(file_name, 'w', newline='', encoding='utf-8')
+                    writer = csv.writer(file)
+                    writer.writerow(REDIRECT_FIELDNAMES)
+                    self.output_files.append(file_name)
+                    rows_in_part = 0
+
+                writer.writerow([path, target, 'MERGE'])
+                rows_in_part += 1
+                self.stats['redirects_written'] += 1
+        finally:
+            if file:
+                file.close()
+
+        logger.info(f"Wrote {self.stats['redirects_written']} redirects to {len(self.output_files)} file(s)")
+
+    def print_statistics(self):
+        """Print statistics about the redirect generation."""
+        logger.info("=" * 50)
+        logger.info("REDIRECT GENERATION STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"PLP URLs read: {self.stats['plp_urls_read']}")
+        logger.info(f"Exact handle matches: {self.stats['exact_matches']}")
+        logger.info(f"Fuzzy handle matches: {self.stats['fuzzy_matches']}")
+        logger.info(f"Unmatched URLs: {self.stats['unmatched']}")
+        logger.info(f"Duplicate paths skipped: {self.stats['duplicates_skipped']}")
+        logger.info(f"Redirects written: {self.stats['redirects_written']}")
+        for file_name in self.output_files:
+            logger.info(f"  • {file_name}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete redirect generation process."""
+        logger.info("Starting redirect generation...")
+
+        try:
+            if self.shopify_categories_file:
+                self.load_shopify_handles()
+            else:
+                logger.warning("No Shopify export given - redirecting every URL to its extracted handle")
+
+            self.write_redirects()
+            self.print_statistics()
+
+            logger.info("Redirect generation completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Redirect generation failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the redirect generator."""
+    # File paths
+    plp_content_file = 'new-plp-content.csv'
+    shopify_categories_file = 'shopify-categories-export.csv'
+    output_prefix = 'shopify-redirects'
+    url_index_file = 'url-rewrite-index.sqlite'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate Matrixify URL redirect files from PLP URLs')
+    parser.add_argument('--output-prefix', default=output_prefix, help='Prefix for the redirect part files')
+    parser.add_argument('--max-rows', type=int, default=5000, help='Maximum redirects per part file')
+    parser.add_argument('--fuzzy-cutoff', type=float, default=0.85, help='Similarity cutoff for fuzzy handle matching (0-1)')
+    parser.add_argument('--no-export', action='store_true', help='Do not check handles against the Shopify export')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(plp_content_file):
+        logger.error(f"PLP content file not found: {plp_content_file}")
+        sys.exit(1)
+
+    if args.no_export:
+        shopify_categories_file = None
+    elif not os.path.exists(shopify_categories_file):
+        logger.error(f"Shopify categories file not found: {shopify_categories_file}")
+        sys.exit(1)
+
+    if not os.path.exists(url_index_file):
+        url_index_file = None
+
+    generator = RedirectGenerator(
+        plp_content_file,
+        shopify_categories_file,
+        args.output_prefix,
+        max_rows_per_file=args.max_rows,
+        fuzzy_cutoff=args.fuzzy_cutoff,
+        url_index_file=url_index_file
+    )
+    generator.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Body HTML Well-formedness Checker
+
+Parses every generated Body HTML value in shopify-categories-updated.csv with a
+single-pass streaming tokenizer (html.parser) and checks that:
+
+- every tag is closed, in the right order, and no closing tag is stray
+- only allowed elements are used: the rich text allowlist plus the tags used by
+  the Body HTML layouts (including body-html-layouts.json when present)
+- the visible text stays within a length limit
+
+Body HTML the migration did not change (the same value as in the export the
+output came from) is existing store content that Shopify already accepted, so
+its problems are reported as warnings; only generated markup can fail the check.
+
+Collections are checked in chunks across a process pool; offending handles are
+printed and written to body-html-errors.csv with their spreadsheet row numbers.
+check_import_constraints.py uses the same checker for its Body HTML rule.
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import logging
+from collections import deque
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+
+from rich_text import ALLOWED_TAGS
+from html_templates import LAYOUTS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ERROR, WARNING = 'error', 'warning'
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+MAX_TEXT_LENGTH = 20000
+MAX_PROBLEMS = 5  # per value; the first problem usually explains the rest
+
+TAG_PATTERN = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+ERROR_FIELDNAMES = ['Row', 'ID', 'Handle', 'Severity', 'Problem', 'HTML Preview']
+CHUNK_SIZE = 1000
+
+# Per-worker settings, set once by init_worker
+worker_settings = {}
+
+
+def layout_tags(layouts):
+    """Return the element names used by a set of layout templates."""
+    return {tag.lower() for template in layouts.values() for tag in TAG_PATTERN.findall(template)}
+
+
+def allowed_tags_for(layouts_file=None):
+    """Allowed Body HTML elements: the rich text allowlist plus every layout's own tags."""
+    layouts = dict(LAYOUTS)
+    if layouts_file and os.path.exists(layouts_file):
+        with open(layouts_file, 'r', encoding='utf-8') as file:
+            layouts.update(json.load(file).get('layouts', {}))
+    return frozenset(ALLOWED_TAGS | layout_tags(layouts))
+
+
+class ExportBaseline:
+    """Tells whether a row of the migration output still holds the export's value for a column.
+    
+    The output keeps the export's row order and only leaves whole collections out,
+    so the export is read alongside the output one row at a time.
+    """
+
+    def __init__(self, export_file, column):
+        self.file = open(export_file, 'r', encoding='utf-8', newline='')
+        self.reader = csv.reader(self.file)
+        columns = [field.replace('\ufeff', '').strip().strip('"').strip("'") for field in next(self.reader, [])]
+        self.id_index = columns.index('ID') if 'ID' in columns else None
+        self.handle_index = columns.index('Handle') if 'Handle' in columns else None
+        self.value_index = columns.index(column) if column in columns else None
+        self.exhausted = self.value_index is None
+
+    def field(self, values, index):
+        return values[index].strip() if index is not None and index < len(values) else ''
+
+    def is_unchanged(self, category_id, handle, value):
+        """Advance to this output row's export row and compare the value (False once out of step)."""
+        while not self.exhausted:
+            values = next(self.reader, None)
+            if values is None:
+                self.exhausted = True
+                break
+            # Rows of collections the output left out are skipped
+            if (self.field(values, self.id_index), self.field(values, self.handle_index)) == (category_id.strip(), handle.strip()):
+                return self.field(values, self.value_index) == value.strip()
+        return False
+
+    def close(self):
+        self.file.close()
+
+
+def open_export_baseline(export_file, column='Body HTML'):
+    """Return an ExportBaseline for the export, or None (every value counts as changed) if it is missing."""
+    if not export_file or not os.path.exists(export_file):
+        logger.warning(f"Export {export_file} not found; checking all Body HTML as migration output")
+        return None
+    return ExportBaseline(export_file, column)
+
+
+class WellFormednessParser(HTMLParser):
+    """Single-pass structural check of one HTML fragment."""
+
+    def __init__(self, allowed_tags, max_text_length=MAX_TEXT_LENGTH):
+        super().__init__(convert_charrefs=True)
+        self.allowed_tags = allowed_tags
+        self.max_text_length = max_text_length
+        self.open_tags = []
+        self.problems = []
+        self.text_length = 0
+        self.closing = False
+
+    def problem(self, severity, message):
+        if len(self.problems) < MAX_PROBLEMS:
+            self.problems.append((severity, message))
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.allowed_tags:
+            self.problem(ERROR, f"<{tag}> is not an allowed element")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self.problem(ERROR, f"<{tag}/> is not a void element and must be closed with </{tag}>")
+        elif tag not in self.allowed_tags:
+            self.problem(ERROR, f"<{tag}> is not an allowed element")
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag not in self.open_tags:
+            self.problem(ERROR, f"stray </{tag}>")
+            return
+        # Anything opened after this tag was left unclosed
+        while self.open_tags[-1] != tag:
+            self.problem(ERROR, f"<{self.open_tags.pop()}> is not closed before </{tag}>")
+        self.open_tags.pop()
+
+    def handle_data(self, data):
+        # close() flushes an unterminated trailing tag as text; it is reported in check()
+        if not self.closing:
+            self.text_length += len(data)
+
+    def check(self, markup):
+        """Return a list of (severity, message) problems; empty when the markup is well-formed."""
+        self.feed(markup)
+        if self.rawdata.lstrip().startswith('<'):
+            self.problem(ERROR, f"unterminated tag at end: {self.rawdata.strip()[:40]}")
+        self.closing = True
+        self.close()
+        for tag in reversed(self.open_tags):
+            self.problem(ERROR, f"unclosed <{tag}>")
+        if self.text_length > self.max_text_length:
+            self.problem(WARNING, f"{self.text_length:,} characters of text (max {self.max_text_length:,})")
+        return self.problems
+
+
+def check_body_html(markup, allowed_tags, max_text_length=MAX_TEXT_LENGTH):
+    """Check one Body HTML value; returns a list of (severity, message) problems."""
+    return WellFormednessParser(allowed_tags, max_text_length).check(markup)
+
+
+def init_worker(allowed_tags, max_text_length):
+    """Receive the checker settings once per worker process."""
+    worker_settings.update({'allowed_tags': allowed_tags, 'max_text_length': max_text_length})
+
+
+def check_chunk(chunk, allowed_tags=None, max_text_length=None):
+    """Check a chunk of (row number, id, handle, Body HTML, unchanged from export) tuples; returns error rows."""
+    allowed_tags = allowed_tags or worker_settings['allowed_tags']
+    max_text_length = max_text_length or worker_settings['max_text_length']
+    errors = []
+    for row_number, category_id, handle, markup, unchanged in chunk:
+        for severity, message in check_body_html(markup, allowed_tags, max_text_length):
+            if unchanged:
+                severity, message = WARNING, f"{message} (unchanged from export)"
+            errors.append({
+                'Row': row_number,
+                'ID': category_id,
+                'Handle': handle,
+                'Severity': severity,
+                'Problem': message,
+                'HTML Preview': markup[:200] + "..." if len(markup) > 200 else markup
+            })
+    return errors
+
+
+class HTMLWellFormednessChecker:
+    def __init__(self, csv_file, error_file, layouts_file=None, max_workers=None,
+                 max_text_length=MAX_TEXT_LENGTH, chunk_size=CHUNK_SIZE, export_file=None):
+        self.csv_file = csv_file
+        self.error_file = error_file
+        self.export_file = export_file
+        self.allowed_tags = allowed_tags_for(layouts_file)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_text_length = max_text_length
+        self.chunk_size = chunk_size
+
+        # Statistics
+        self.stats = {
+            'html_values_checked': 0,
+            'unchanged_values': 0,
+            'errors': 0,
+            'warnings': 0
+        }
+        self.offending_handles = {}  # handle -> first problem, in file order
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def iter_chunks(self):
+        """Yield chunks of non-empty Body HTML values with their row numbers."""
+        with open(self.csv_file, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            columns = [self.clean_field_name(field) for field in next(reader, [])]
+            if 'Body HTML' not in columns:
+                raise ValueError(f"No 'Body HTML' column in {self.csv_file}")
+            html_index = columns.index('Body HTML')
+            id_index = columns.index('ID') if 'ID' in columns else None
+            handle_index = columns.index('Handle') if 'Handle' in columns else None
+
+            baseline = open_export_baseline(self.export_file)
+            try:
+                chunk = []
+                for row_number, values in enumerate(reader, 2):
+                    markup = values[html_index] if html_index < len(values) else ''
+                    category_id = values[id_index] if id_index is not None and id_index < len(values) else ''
+                    handle = values[handle_index] if handle_index is not None and handle_index < len(values) else ''
+                    unchanged = baseline.is_unchanged(category_id, handle, markup) if baseline else False
+                    if not markup:
+                        continue
+                    self.stats['unchanged_values'] += unchanged
+                    chunk.append((row_number, category_id, handle, markup, unchanged))
+                    if len(chunk) >= self.chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+            finally:
+                if baseline:
+                    baseline.close()
+
+    def iter_errors(self):
+        """Check every Body HTML value, keeping only a bounded number of chunks in flight."""
+        if self.max_workers == 1:
+            for chunk in self.iter_chunks():
+                self.stats['html_values_checked'] += len(chunk)
+                yield from check_chunk(chunk, self.allowed_tags, self.max_text_length)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                 initargs=(self.allowed_tags, self.max_text_length)) as pool:
+            in_flight = deque()
+            for chunk in self.iter_chunks():
+                self.stats['html_values_checked'] += len(chunk)
+                in_flight.append(pool.submit(check_chunk, chunk))
+                if len(in_flight) >= self.max_workers * 2:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+
+    def check(self):
+        """Check all Body HTML and stream the problems to the error file."""
+        logger.info(f"Checking Body HTML in {self.csv_file} with {self.max_workers} worker(s)...")
+
+        try:
+            with open(self.error_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=ERROR_FIELDNAMES)
+                writer.writeheader()
+                for error in self.iter_errors():
+                    self.stats['errors' if error['Severity'] == ERROR else 'warnings'] += 1
+                    self.offending_handles.setdefault(error['Handle'], error['Problem'])
+                    writer.writerow(error)
+
+            logger.info(f"Saved {self.stats['errors'] + self.stats['warnings']} problems to {self.error_file}")
+
+        except Exception as e:
+            logger.error(f"Error checking Body HTML: {e}")
+            raise
+
+    def print_summary(self, limit=20):
+        """Print the check summary and the first offending handles."""
+        print("=" * 80)
+        print("BODY HTML WELL-FORMEDNESS CHECK")
+        print("=" * 80)
+        print(f"Body HTML values checked: {self.stats['html_values_checked']:,} "
+              f"({self.stats['unchanged_values']:,} unchanged from the export, reported as warnings)")
+        print(f"Errors: {self.stats['errors']:,}")
+        print(f"Warnings: {self.stats['warnings']:,}")
+        print(f"Offending collections: {len(self.offending_handles):,}")
+        print()
+        for handle, problem in list(self.offending_handles.items())[:limit]:
+            print(f"   • {handle}: {problem}")
+        if len(self.offending_handles) > limit:
+            print(f"   ... and {len(self.offending_handles) - limit} more (see {self.error_file})")
+        if not self.offending_handles:
+            print("✅ All Body HTML is well-formed")
+        elif not self.stats['errors']:
+            print("✅ All generated Body HTML is well-formed")
+        print("=" * 80)
+
+    def run(self):
+        """Run the complete check; returns True when there are no errors."""
+        self.check()
+        self.print_summary()
+        return self.stats['errors'] == 0
+
+
+def main():
+    """Main function to run the Body HTML checker."""
+    # File paths
+    csv_file = 'shopify-categories-updated.csv'
+    error_file = 'body-html-errors.csv'
+    layouts_file = 'body-html-layouts.json'
+    export_file = 'shopify-categories-export.csv'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Check generated Body HTML for well-formed, allowed markup')
+    parser.add_argument('--input', default=csv_file, help='Matrixify CSV to check')
+    parser.add_argument('--errors', default=error_file, help='Error CSV to write')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count, 1 = no pool)')
+    parser.add_argument('--max-text-length', type=int, default=MAX_TEXT_LENGTH, help='Maximum visible text per collection')
+    parser.add_argument('--export', default=export_file, help='Export the output came from; unchanged Body HTML only warns')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        logger.error(f"CSV file not found: {args.input}")
+        logger.error("Please run the migration script first.")
+        sys.exit(1)
+
+    checker = HTMLWellFormednessChecker(args.input, args.errors, layouts_file, args.workers, args.max_text_length,
+                                        export_file=args.export)
+    try:
+        passed = checker.run()
+    except Exception:
+        sys.exit(1)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Body HTML Layout Templates
+
+Compiles named Body HTML layouts once at startup so rendering a collection is
+a single precompiled format call per row. Layout syntax:
+
+    {field}                  placeholder for title, subheading, description or content_under_listing
+    [ ... {field} ]          optional section, only rendered when that field has content
+    [ ... {field} | ... ]    the part after | is used when the field holds block-level HTML
+
+Field values go through the rich text pipeline (rich_text.py), so existing HTML
+and Markdown are sanitized rather than double-escaped. Every combination of
+empty/inline/block fields is compiled up front, so rendering never builds markup
+piece by piece. Run this file with --benchmark to compare against the original
+list-append renderer.
+"""
+
+import re
+import csv
+import sys
+import json
+import html
+import logging
+
+from rich_text import RichTextPipeline, ABSENT, INLINE, BLOCK
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FIELDS = ('title', 'subheading', 'description', 'content_under_listing')
+
+# Built-in layouts; 'default' is the original collection-description markup
+LAYOUTS = {
+    'default': (
+        '<div class="collection-description">'
+        '[<h1>{title}</h1>]'
+        '[<h2>{subheading}</h2>]'
+        '[<p>{description}</p>|{description}]'
+        '[<div class="content-under-listing">{content_under_listing}</div>]'
+        '</div>'
+    ),
+}
+
+# URL path prefix -> layout name; the longest matching prefix wins
+LAYOUT_RULES = {}
+
+SECTION_PATTERN = re.compile(r'\[([^\[\]]*)\]')
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+
+
+class BodyHTMLRenderer:
+    def __init__(self, layouts=None, layout_rules=None, pipeline=None):
+        self.pipeline = pipeline or RichTextPipeline()
+        self.layouts = dict(LAYOUTS)
+        self.layout_rules = dict(LAYOUT_RULES)
+        if layouts:
+            self.layouts.update(layouts)
+        if layout_rules:
+            self.layout_rules.update(layout_rules)
+
+        # layout name -> tuple of 81 bound format methods indexed by field kinds (base 3)
+        self.compiled = {name: self.compile_layout(name, template) for name, template in self.layouts.items()}
+        for prefix, layout_name in self.layout_rules.items():
+            if layout_name not in self.compiled:
+                raise ValueError(f"Layout rule '{prefix}' uses unknown layout '{layout_name}'")
+        self.rule_prefixes = sorted(self.layout_rules, key=len, reverse=True)
+        self.render = self.make_render()
+
+    @classmethod
+    def from_config(cls, config_file):
+        """Create a renderer with extra layouts and rules from a JSON config file."""
+        with open(config_file, 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        return cls(config.get('layouts'), config.get('rules'))
+
+    def placeholder_index(self, layout_name, field):
+        """Map a placeholder name to its positional format index."""
+        if field not in FIELDS:
+            raise ValueError(f"Layout '{layout_name}' uses unknown placeholder '{{{field}}}'")
+        return '{%d}' % FIELDS.index(field)
+
+    def compile_layout(self, layout_name, template):
+        """Compile a layout into one format string per combination of field kinds."""
+        segments = []  # (field index or None, inline text, block text)
+        position = 0
+        for match in SECTION_PATTERN.finditer(template):
+            segments.append((None, template[position:match.start()], None))
+
+            inline_text, _, block_text = match.group(1).partition('|')
+            fields = set(PLACEHOLDER_PATTERN.findall(inline_text)) | set(PLACEHOLDER_PATTERN.findall(block_text))
+            if len(fields) != 1:
+                raise ValueError(f"Layout '{layout_name}' section '[{match.group(1)}]' must use exactly one placeholder")
+            field = fields.pop()
+            if field not in FIELDS:
+                raise ValueError(f"Layout '{layout_name}' uses unknown placeholder '{{{field}}}'")
+            segments.append((FIELDS.index(field), inline_text, block_text or inline_text))
+            position = match.end()
+        segments.append((None, template[position:], None))
+
+        if any(char in text for _, text, _ in segments for char in '[]|'):
+            raise ValueError(f"Layout '{layout_name}' has unbalanced or nested [ ] sections")
+
+        variants = []
+        for combination in range(3 ** len(FIELDS)):
+            kinds = [combination // 3 ** i % 3 for i in range(len(FIELDS))]
+            parts = []
+            for field_index, inline_text, block_text in segments:
+                if field_index is None:
+                    parts.append(inline_text)
+                elif kinds[field_index] == BLOCK:
+                    parts.append(block_text)
+                elif kinds[field_index]:
+                    parts.append(inline_text)
+            format_string = PLACEHOLDER_PATTERN.sub(
+                lambda m: self.placeholder_index(layout_name, m.group(1)), ''.join(parts))
+            variants.append(format_string.format)
+        return tuple(variants)
+
+    def layout_for_url(self, url):
+        """Pick the layout for a PLP URL using the configured path prefix rules."""
+        if not self.rule_prefixes or not url:
+            return 'default'
+        path = re.sub(r'^[a-z]+://[^/]+', '', url).lstrip('/')
+        for prefix in self.rule_prefixes:
+            if path.startswith(prefix.lstrip('/')):
+                return self.layout_rules[prefix]
+        return 'default'
+
+    def make_render(self):
+        """Build the render function with the compiled layouts bound as closure locals."""
+        compiled = self.compiled
+        fragment = self.pipeline.render_fragment
+
+        def render(title, subheading, description, content_under_listing, layout='default'):
+            """Render Body HTML with one precompiled format call."""
+            title_html, title_kind = fragment(title, True)
+            subheading_html, subheading_kind = fragment(subheading, True)
+            description_html, description_kind = fragment(description)
+            content_html, content_kind = fragment(content_under_listing)
+            return compiled[layout][title_kind + 3 * subheading_kind + 9 * description_kind + 27 * content_kind](
+                title_html, subheading_html, description_html, content_html)
+
+        return render
+
+
+def legacy_create_html_content(title, subheading, description, content_under_listing):
+    """The original list-append renderer, kept as the benchmark baseline."""
+    html_parts = ['<div class="collection-description">']
+
+    if title:
+        html_parts.append(f'<h1>{html.escape(title)}</h1>')
+
+    if subheading:
+        html_parts.append(f'<h2>{html.escape(subheading)}</h2>')
+
+    if description:
+        html_parts.append(f'<p>{html.escape(description)}</p>')
+
+    if content_under_listing:
+        html_parts.append(f'<div class="content-under-listing">{html.escape(content_under_listing)}</div>')
+
+    html_parts.append('</div>')
+    return ''.join(html_parts)
+
+
+class EscapeOnlyPipeline(RichTextPipeline):
+    """Escapes every field like the legacy renderer (benchmark only: isolates layout compilation)."""
+
+    def render_fragment(self, text, inline=False):
+        return (html.escape(text), INLINE) if text else ('', ABSENT)
+
+
+def run_benchmark(plp_content_file, repeat=20):
+    """Benchmark the compiled renderer against the legacy renderer on real PLP rows.
+
+    The fragment cache is disabled so it doesn't hide the per-row cost, and
+    only plain-text rows are used: the legacy renderer escapes HTML and Markdown
+    fields, so its output for those rows is intentionally different.
+    """
+    import timeit
+    from rich_text import detect_format
+
+    with open(plp_content_file, 'r', encoding='utf-8') as file:
+        rows = []
+        rich_rows = 0
+        for row in csv.DictReader(file):
+            cleaned = {key.replace('\ufeff', '').strip().strip('"').strip("'"): (value or '').strip()
+                       for key, value in row.items()}
+            fields = (cleaned.get('Title', ''), cleaned.get('Sub-heading', ''),
+                      cleaned.get('Description', ''), cleaned.get('Content under product listing', ''))
+            if any(field and detect_format(field) != 'text' for field in fields):
+                rich_rows += 1
+                continue
+            rows.append(fields)
+
+    compiled = BodyHTMLRenderer(pipeline=EscapeOnlyPipeline())
+    renderer = BodyHTMLRenderer(pipeline=RichTextPipeline(max_cache_entries=0))
+    mismatches = sum(1 for row in rows if renderer.render(*row) != legacy_create_html_content(*row))
+
+    def best_time(render):
+        return min(timeit.repeat(lambda: [render(*row) for row in rows], number=repeat, repeat=3))
+
+    legacy_time = best_time(legacy_create_html_content)
+    compiled_time = best_time(compiled.render)
+    pipeline_time = best_time(renderer.render)
+    renders = max(len(rows) * repeat, 1)
+
+    print("=" * 60)
+    print("BODY HTML RENDERER BENCHMARK (fragment cache off)")
+    print("=" * 60)
+    print(f"Plain-text rows: {len(rows)} x {repeat} repeats")
+    if rich_rows:
+        print(f"Skipped HTML/Markdown rows: {rich_rows} (legacy renderer escapes them)")
+    print(f"Legacy renderer:   {legacy_time / renders * 1e6:.2f} µs/row")
+    print(f"Compiled layout:   {compiled_time / renders * 1e6:.2f} µs/row "
+          f"({legacy_time / compiled_time:.2f}x, same escaping as legacy)")
+    print(f"Compiled layout + rich text pipeline: {pipeline_time / renders * 1e6:.2f} µs/row "
+          f"({legacy_time / pipeline_time:.2f}x, format detection on every field)")
+    print(f"Output mismatches: {mismatches}")
+    print("=" * 60)
+    return mismatches == 0
+
+
+def main():
+    """Main function to check layouts or benchmark the renderer."""
+    plp_content_file = 'new-plp-content.csv'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Compile Body HTML layouts and benchmark the renderer')
+    parser.add_argument('--config', help='JSON file with extra "layouts" and "rules"')
+    parser.add_argument('--benchmark', action='store_true', help='Benchmark against the legacy renderer')
+
+    args = parser.parse_args()
+
+    try:
+        renderer = BodyHTMLRenderer.from_config(args.config) if args.config else BodyHTMLRenderer()
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid layout configuration: {e}")
+        sys.exit(1)
+
+    logger.info(f"Compiled layouts: {', '.join(sorted(renderer.compiled))}")
+
+    if args.benchmark and not run_benchmark(plp_content_file):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
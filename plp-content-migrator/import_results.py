@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Matrixify Import Results Processor
+
+After an import Matrixify offers a results file: the imported sheet with an
+"Import Result" (OK / Failed / ...) and "Import Comment" column per row. This
+script streams that file, groups the failures by error class, and writes a
+retry file containing only the failed collections, taken from
+shopify-categories-updated.csv with all of their rows. Re-upload the retry
+file instead of the whole export.
+
+Only the failed IDs and handles are indexed (a hash set), and both files are
+read once as a stream, so the join stays fast for any export size.
+"""
+
+import os
+import re
+import csv
+import sys
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+OK_RESULTS = {'ok', 'success', 'successful', 'imported', 'created', 'updated', 'deleted', 'skipped'}
+WARNING_RESULTS = {'warning', 'warnings', 'ok with warnings'}
+
+# Turn error comments into classes: specific values become placeholders
+ERROR_CLASS_PATTERNS = [
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'"[^"]*"|\'[^\']*\'|“[^”]*”'), '<value>'),
+    (re.compile(r'\b\d+(\.\d+)?\b'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+class ImportResultsProcessor:
+    def __init__(self, results_file, updated_file, retry_file):
+        self.results_file = results_file
+        self.updated_file = updated_file
+        self.retry_file = retry_file
+
+        self.failed_ids = set()
+        self.failed_handles = set()
+        self.failed_collections = set()  # (ID, handle) of every failed row
+        self.error_classes = {}  # error class -> {'count', 'handles'}
+
+        # Statistics
+        self.stats = {
+            'result_rows': 0,
+            'ok_rows': 0,
+            'warning_rows': 0,
+            'failed_rows': 0,
+            'failed_collections': 0,
+            'retry_rows': 0,
+            'retry_collections': 0,
+            'failed_not_found': 0
+        }
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def error_class(self, comment):
+        """Reduce an import comment to its error class."""
+        error_class = comment or 'Failed without a comment'
+        for pattern, placeholder in ERROR_CLASS_PATTERNS:
+            error_class = pattern.sub(placeholder, error_class)
+        return error_class.strip()[:120]
+
+    def read_results(self):
+        """Stream the results file and index the failed collections."""
+        logger.info(f"Reading import results from {self.results_file}...")
+
+        try:
+            with open(self.results_file, 'r', encoding='utf-8', newline='') as file:
+                reader = csv.reader(file)
+                columns = [self.clean_field_name(field) for field in next(reader, [])]
+                if 'Import Result' not in columns:
+                    raise ValueError(f"No 'Import Result' column in {self.results_file}; is it a Matrixify results file?")
+                result_index = columns.index('Import Result')
+                comment_index = columns.index('Import Comment') if 'Import Comment' in columns else None
+                id_index = columns.index('ID') if 'ID' in columns else None
+                handle_index = columns.index('Handle') if 'Handle' in columns else None
+
+                for values in reader:
+                    self.stats['result_rows'] += 1
+                    result = values[result_index].strip().lower() if result_index < len(values) else ''
+                    if not result or result in OK_RESULTS:
+                        self.stats['ok_rows'] += 1
+                        continue
+                    if result in WARNING_RESULTS:
+                        self.stats['warning_rows'] += 1
+                        continue
+
+                    self.stats['failed_rows'] += 1
+                    category_id = values[id_index].strip() if id_index is not None and id_index < len(values) else ''
+                    handle = values[handle_index].strip() if handle_index is not None and handle_index < len(values) else ''
+                    if category_id:
+                        self.failed_ids.add(category_id)
+                    if handle:
+                        self.failed_handles.add(handle)
+                    self.failed_collections.add((category_id, handle))
+
+                    comment = values[comment_index].strip() if comment_index is not None and comment_index < len(values) else ''
+                    error_class = self.error_classes.setdefault(self.error_class(comment), {'count': 0, 'handles': []})
+                    error_class['count'] += 1
+                    if len(error_class['handles']) < 5 and handle not in error_class['handles']:
+                        error_class['handles'].append(handle or category_id)
+
+            self.stats['failed_collections'] = len(self.failed_collections)
+            logger.info(f"Found {self.stats['failed_rows']} failed rows in {self.stats['result_rows']} results")
+
+        except Exception as e:
+            logger.error(f"Error reading import results: {e}")
+            raise
+
+    def write_retry_file(self):
+        """Copy every row of the failed collections from the migration output into the retry file."""
+        logger.info(f"Writing retry file {self.retry_file}...")
+
+        matched_ids = set()
+        matched_handles = set()
+        try:
+            with open(self.updated_file, 'r', encoding='utf-8', newline='') as source, \
+                    open(self.retry_file, 'w', newline='', encoding='utf-8') as target:
+                reader = csv.reader(source)
+                writer = csv.writer(target)
+                header = next(reader, [])
+                writer.writerow(header)
+                columns = [self.clean_field_name(field) for field in header]
+                id_index = columns.index('ID') if 'ID' in columns else None
+                handle_index = columns.index('Handle') if 'Handle' in columns else None
+
+                previous_key = None
+                for values in reader:
+                    category_id = values[id_index] if id_index is not None and id_index < len(values) else ''
+                    handle = values[handle_index] if handle_index is not None and handle_index < len(values) else ''
+                    if category_id in self.failed_ids or handle in self.failed_handles:
+                        writer.writerow(values)
+                        self.stats['retry_rows'] += 1
+                        if (category_id, handle) != previous_key:
+                            self.stats['retry_collections'] += 1
+                        matched_ids.add(category_id)
+                        matched_handles.add(handle)
+                    previous_key = (category_id, handle)
+
+            self.stats['failed_not_found'] = sum(
+                1 for category_id, handle in self.failed_collections
+                if category_id not in matched_ids and handle not in matched_handles)
+            logger.info(f"Wrote {self.stats['retry_rows']} rows for {self.stats['retry_collections']} collections")
+
+        except Exception as e:
+            logger.error(f"Error writing retry file: {e}")
+            raise
+
+    def print_summary(self, limit=20):
+        """Print the failures grouped by error class."""
+        print("=" * 80)
+        print("MATRIXIFY IMPORT RESULTS")
+        print("=" * 80)
+        print(f"Result rows: {self.stats['result_rows']:,}")
+        print(f"OK: {self.stats['ok_rows']:,}")
+        print(f"Warnings: {self.stats['warning_rows']:,}")
+        print(f"Failed: {self.stats['failed_rows']:,} rows in {self.stats['failed_collections']:,} collections")
+        print()
+
+        if not self.error_classes:
+            print("🟢 Every row imported; nothing to retry")
+            print("=" * 80)
+            return
+
+        print("🔴 FAILURES BY ERROR CLASS")
+        print("-" * 80)
+        ranked = sorted(self.error_classes.items(), key=lambda item: -item[1]['count'])
+        for error_class, details in ranked[:limit]:
+            print(f"{details['count']:>7,}  {error_class}")
+            print(f"         e.g. {', '.join(details['handles'])}")
+        if len(ranked) > limit:
+            print(f"... and {len(ranked) - limit} more error classes")
+        print()
+        print(f"🔁 Retry file: {self.retry_file} ({self.stats['retry_rows']:,} rows, "
+              f"{self.stats['retry_collections']:,} collections)")
+        if self.stats['failed_not_found']:
+            print(f"⚠️  {self.stats['failed_not_found']} failed collections are not in {self.updated_file}")
+        print("=" * 80)
+
+    def run(self):
+        """Process the results; returns True when nothing failed."""
+        logger.info("Processing Matrixify import results...")
+
+        try:
+            self.read_results()
+            if self.error_classes:
+                self.write_retry_file()
+            self.print_summary()
+
+        except Exception as e:
+            logger.error(f"Import results processing failed: {e}")
+            raise
+
+        return not self.error_classes
+
+
+def main():
+    """Main function to process import results."""
+    # File paths
+    updated_file = 'shopify-categories-updated.csv'
+    retry_file = 'shopify-categories-retry.csv'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Summarize Matrixify import failures and build a retry file')
+    parser.add_argument('results', help='Matrixify import results CSV')
+    parser.add_argument('--updated', default=updated_file, help='Migration output that was imported')
+    parser.add_argument('--retry', default=retry_file, help='Retry CSV to write')
+
+    args = parser.parse_args()
+
+    missing_files = [filename for filename in [args.results, args.updated] if not os.path.exists(filename)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    processor = ImportResultsProcessor(args.results, args.updated, args.retry)
+    try:
+        passed = processor.run()
+    except Exception:
+        sys.exit(1)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Memory Benchmark for the PLP Migration Rows
+
+Generates a synthetic Matrixify collections export (1,000,000 rows by default,
+30+ columns, multi-row groups) and a PLP file covering part of its handles,
+then measures a normal (non-stream) migration with tracemalloc:
+
+- dict rows: the previous representation, reproduced here as the baseline.
+  Every row is a dict of cleaned column names, every row is copied again with
+  dict() before patching, and the content map holds one dict per handle.
+- compact rows: what PLPMigrationScript does now (see compact_rows.py). Every
+  row shares one RowSchema and holds a value tuple, only patched top rows are
+  copied, and the content map holds named tuples.
+
+    python3 memory_benchmark.py --rows 1000000
+
+Each variant runs in its own process so one does not inherit the other's heap.
+"""
+
+import os
+import csv
+import time
+import random
+import logging
+import tempfile
+import tracemalloc
+import multiprocessing
+
+from script import PLPMigrationScript
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    'ID', 'Handle', 'Command', 'Title', 'Body HTML', 'Sort Order', 'Template Suffix', 'Updated At',
+    'Published', 'Published At', 'Published Scope', 'Image Src', 'Image Width', 'Image Height',
+    'Image Alt Text', 'Row #', 'Top Row', 'Must Match', 'Rule: Product Column', 'Rule: Relation',
+    'Rule: Condition', 'Products Count', 'Metafield: title_tag [string]',
+    'Metafield: description_tag [string]', 'Metafield: custom.collection_subheading [single_line_text_field]',
+    'Metafield: custom.seo_keywords [string]', 'Metafield: custom.banner [file_reference]',
+    'Metafield: custom.sort_note [single_line_text_field]', 'Metafield: custom.legacy_id [number_integer]',
+    'Metafield: custom.category_path [single_line_text_field]', 'Metafield: custom.featured [boolean]',
+    'Metafield: custom.region [single_line_text_field]'
+]
+PLP_COLUMNS = ['URL', 'Title', 'Sub-heading', 'Description', 'Content under product listing']
+WORDS = ['diamond', 'gold', 'ring', 'bracelet', 'pearl', 'watch', 'bridal', 'band', 'silver', 'platinum',
+         'necklace', 'earrings', 'pendant', 'vintage', 'estate', 'designer', 'sapphire', 'emerald']
+
+
+def generate_files(directory, row_count, plp_share=0.4, seed=7):
+    """Write a synthetic export with about `row_count` rows and a PLP file for part of its handles."""
+    rng = random.Random(seed)
+    export_file = os.path.join(directory, 'benchmark-export.csv')
+    plp_file = os.path.join(directory, 'benchmark-plp.csv')
+
+    rows_written = 0
+    collection = 0
+    with open(export_file, 'w', newline='', encoding='utf-8') as export, \
+            open(plp_file, 'w', newline='', encoding='utf-8') as plp:
+        export_writer = csv.writer(export)
+        plp_writer = csv.writer(plp)
+        export_writer.writerow(EXPORT_COLUMNS)
+        plp_writer.writerow(PLP_COLUMNS)
+        while rows_written < row_count:
+            collection += 1
+            words = rng.sample(WORDS, 3)
+            handle = f"{'-'.join(words)}-{collection}"
+            title = ' '.join(word.capitalize() for word in words)
+            for position in range(rng.choice([1, 2, 2, 3, 4])):
+                is_top = position == 0
+                export_writer.writerow([
+                    str(100000 + collection), handle, 'MERGE',
+                    title if is_top else '',
+                    f"<p>{title} at J.R. Dunn Jewelers.</p>" if is_top else '',
+                    'best-selling' if is_top else '', '', '2024-05-01 10:00:00 -0400' if is_top else '',
+                    'TRUE' if is_top else '', '2019-01-15 09:30:00 -0500' if is_top else '', 'global' if is_top else '',
+                    f"https://cdn.shopify.com/s/files/1/collections/{handle}.jpg" if is_top else '',
+                    '1200' if is_top else '', '800' if is_top else '', title if is_top else '',
+                    str(position + 1), 'TRUE' if is_top else '', 'all', 'Tag', 'Equals', words[position % 3],
+                    str(rng.randint(0, 400)) if is_top else '',
+                    f"{title} | J.R. Dunn" if is_top else '', f"Shop {title.lower()}." if is_top else '',
+                    '', ', '.join(words) if is_top else '', '', '', str(collection) if is_top else '',
+                    f"Jewelry > {title}" if is_top else '', 'FALSE' if is_top else '', 'US' if is_top else ''
+                ])
+                rows_written += 1
+            if rng.random() < plp_share:
+                plp_writer.writerow([
+                    f"https://www.jrdunn.com/{handle}.html", title, f"Explore {title.lower()}",
+                    f"Discover our {title.lower()} collection, hand-picked by our buyers.",
+                    f"Every {words[0]} piece is inspected in our Florida showroom."
+                ])
+    return plp_file, export_file, rows_written
+
+
+def run_dict_rows(migration):
+    """Previous representation: dict rows, a dict copy of every row, dict content entries."""
+    content_map = {}
+    with open(migration.plp_content_file, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            cleaned_row = {migration.clean_field_name(key): value.strip() if value else "" for key, value in row.items()}
+            handle = migration.extract_handle_from_url(cleaned_row.get('URL', ''))
+            if handle:
+                row_text = {column: cleaned_row.get(column, '') for column in migration.content_columns}
+                content_map[handle] = {
+                    'title': row_text['Title'],
+                    'subheading': row_text['Sub-heading'],
+                    'description': row_text['Description'],
+                    'content_under_listing': row_text['Content under product listing'],
+                    'layout': migration.renderer.layout_for_url(cleaned_row.get('URL', '')),
+                    'values': tuple(row_text[column] for column in migration.field_mapping.source_columns)
+                }
+
+    categories = []
+    with open(migration.shopify_categories_file, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            categories.append({migration.clean_field_name(key): value.strip() if value else ""
+                               for key, value in row.items()})
+
+    updated_categories = []
+    for handle, original_rows in migration.iter_collection_groups(categories):
+        rows = [dict(row) for row in original_rows]
+        content = content_map.get(handle)
+        if content is not None:
+            category = migration.find_top_row(rows)
+            patches = migration.field_mapping.build_patches(content['values'], content['layout'],
+                                                            migration.create_html_content)
+            for target, value in patches:
+                category[migration.field_mapping.target_columns[target]] = value
+        updated_categories.extend(rows)
+    return content_map, categories, updated_categories
+
+
+def run_compact_rows(migration):
+    """Current representation: PLPMigrationScript as script.py runs it (without saving)."""
+    migration.load_plp_content()
+    migration.load_shopify_categories()
+    migration.update_shopify_categories()
+    return migration.content_map, migration.shopify_categories, migration.updated_categories
+
+
+VARIANTS = {
+    'dict rows': run_dict_rows,
+    'compact rows': run_compact_rows,
+}
+
+
+def measure_variant(name, plp_file, export_file):
+    """Run one variant under tracemalloc (in a child process); returns (peak bytes, retained bytes, seconds)."""
+    logging.getLogger(PLPMigrationScript.__module__).setLevel(logging.WARNING)
+    migration = PLPMigrationScript(plp_file, export_file, None)
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = VARIANTS[name](migration)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, retained, elapsed
+
+
+def format_megabytes(value):
+    return f"{value / (1024 * 1024):,.1f} MB"
+
+
+def main():
+    """Main function to run the memory benchmark."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Compare migration memory for dict rows and compact rows')
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows in the synthetic export')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS),
+                        help='Variants to measure')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='plp-memory-') as directory:
+        logger.info(f"Generating a synthetic export with {args.rows:,} rows...")
+        plp_file, export_file, rows_written = generate_files(directory, args.rows)
+        logger.info(f"Export: {format_megabytes(os.path.getsize(export_file))}, PLP: {format_megabytes(os.path.getsize(plp_file))}")
+
+        context = multiprocessing.get_context('spawn')
+        for name in args.variants:
+            logger.info(f"Measuring {name}...")
+            with context.Pool(1) as pool:
+                results[name] = pool.apply(measure_variant, (name, plp_file, export_file))
+
+    print("=" * 80)
+    print(f"MIGRATION MEMORY ({rows_written:,} export rows, tracemalloc)")
+    print("=" * 80)
+    print(f"{'Variant':<16}{'Peak':>16}{'Retained':>16}{'Seconds':>12}")
+    for name, (peak, retained, elapsed) in results.items():
+        print(f"{name:<16}{format_megabytes(peak):>16}{format_megabytes(retained):>16}{elapsed:>12.1f}")
+    if len(results) == len(VARIANTS):
+        baseline = results['dict rows'][0]
+        compact = results['compact rows'][0]
+        print()
+        print(f"Peak memory reduced {baseline / compact:.1f}x")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
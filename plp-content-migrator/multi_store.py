@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Multi-Store PLP Content Migration
+
+Parses and indexes the PLP content once, then migrates several Shopify store
+exports (staging, production, regional storefronts, ...) concurrently in a
+process pool. Each store gets its own output file; a combined summary is printed
+and saved. Total time is roughly that of the slowest store rather than the sum.
+
+Stores are listed in stores.json:
+
+    {
+      "stores": [
+        {"name": "production", "export": "exports/production.csv",
+         "output": "output/production-updated.csv", "base_url": "https://jrdunn.myshopify.com"}
+      ]
+    }
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from script import PLPMigrationScript
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDNAMES = [
+    'Store', 'Export File', 'Output File', 'Base URL', 'Rows', 'Collections',
+    'Collections Updated', 'No Match', 'Match Rate', 'Seconds', 'Status'
+]
+
+# Statistics from parsing the PLP file; every store reports them as if it had parsed the file itself
+PLP_LOAD_STATS = ['plp_entries_loaded', 'handles_from_url_index', 'plp_text_fields', 'plp_text_duplicates']
+
+# Per-worker state, set once by init_worker
+worker_state = {}
+
+
+def init_worker(content_map, plp_stats, plp_content_file, layouts_file, field_mapping_file):
+    """Receive the parsed PLP content and its load statistics once per worker process."""
+    worker_state.update({
+        'content_map': content_map,
+        'plp_stats': plp_stats,
+        'plp_content_file': plp_content_file,
+        'layouts_file': layouts_file,
+        'field_mapping_file': field_mapping_file,
+    })
+    # Per-handle migration logging from several processes would interleave
+    logging.getLogger(PLPMigrationScript.__module__).setLevel(logging.WARNING)
+
+
+def migrate_store(store):
+    """Migrate one store export with the shared PLP content (runs in a worker process)."""
+    migration, seconds = run_store_migration(store)
+    return migration.stats, seconds
+
+
+def run_store_migration(store):
+    """Stream one export through a migration built from the worker's PLP content; returns (migration, seconds)."""
+    started = time.perf_counter()
+    migration = PLPMigrationScript(
+        worker_state['plp_content_file'],
+        store['export'],
+        store['output'],
+        layouts_file=worker_state['layouts_file'],
+        field_mapping_file=worker_state['field_mapping_file'],
+        rollback_file=store.get('rollback')
+    )
+    migration.content_map = worker_state['content_map']
+    migration.stats.update(worker_state['plp_stats'])
+    with migration.rollback_pass():
+        migration.stream_migration()
+    return migration, time.perf_counter() - started
+
+
+class MultiStoreMigration:
+    def __init__(self, plp_content_file, stores, summary_file, max_workers=None, url_index_file=None,
+                 layouts_file=None, field_mapping_file=None):
+        self.plp_content_file = plp_content_file
+        self.stores = stores
+        self.summary_file = summary_file
+        self.max_workers = max_workers or min(len(stores), os.cpu_count() or 1)
+        self.url_index_file = url_index_file
+        self.layouts_file = layouts_file
+        self.field_mapping_file = field_mapping_file
+
+        self.content_map = {}
+        self.plp_stats = {}  # PLP_LOAD_STATS from the one parse
+        self.results = []
+
+    @staticmethod
+    def load_stores(config_file):
+        """Load and check the store list from a JSON config file."""
+        with open(config_file, 'r', encoding='utf-8') as file:
+            stores = json.load(file).get('stores', [])
+
+        names = set()
+        for store in stores:
+            missing = [key for key in ('name', 'export', 'output') if not store.get(key)]
+            if missing:
+                raise ValueError(f"Store entry {store} is missing {', '.join(missing)}")
+            if store['name'] in names:
+                raise ValueError(f"Duplicate store name: {store['name']}")
+            names.add(store['name'])
+        if not stores:
+            raise ValueError(f"No stores listed in {config_file}")
+        return stores
+
+    def load_plp_content(self):
+        """Parse and index the PLP content once for all stores."""
+        migration = PLPMigrationScript(self.plp_content_file, None, None, self.url_index_file,
+                                       self.layouts_file, self.field_mapping_file)
+        migration_logger = logging.getLogger(PLPMigrationScript.__module__)
+        level = migration_logger.level
+        migration_logger.setLevel(logging.WARNING)
+        try:
+            migration.load_plp_content()
+        finally:
+            migration_logger.setLevel(level)
+        self.content_map = migration.content_map
+        self.plp_stats = {key: migration.stats[key] for key in PLP_LOAD_STATS}
+        logger.info(f"Indexed {len(self.content_map)} PLP handles once for {len(self.stores)} stores")
+
+    def migrate_stores(self):
+        """Run every store export through the migration concurrently."""
+        logger.info(f"Migrating {len(self.stores)} stores with {self.max_workers} worker processes...")
+
+        for store in self.stores:
+            for path in (store['output'], store.get('rollback')):
+                output_dir = os.path.dirname(path or '')
+                if output_dir:
+                    os.makedirs(output_dir, exist_ok=True)
+
+        initargs = (self.content_map, self.plp_stats, self.plp_content_file,
+                    self.layouts_file, self.field_mapping_file)
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker, initargs=initargs) as pool:
+            futures = {pool.submit(migrate_store, store): store for store in self.stores}
+            for future in as_completed(futures):
+                store = futures[future]
+                try:
+                    stats, seconds = future.result()
+                    logger.info(f"✅ {store['name']}: {stats['categories_updated']} collections updated in {seconds:.1f}s")
+                    self.results.append((store, stats, seconds, 'OK'))
+                except Exception as e:
+                    logger.error(f"❌ {store['name']}: migration failed: {e}")
+                    self.results.append((store, None, 0.0, f"FAILED: {e}"))
+
+        # Report in config order, not completion order
+        order = {store['name']: position for position, store in enumerate(self.stores)}
+        self.results.sort(key=lambda result: order[result[0]['name']])
+
+    def summary_rows(self):
+        """Build one summary row per store."""
+        rows = []
+        for store, stats, seconds, status in self.results:
+            stats = stats or {}
+            updated = stats.get('categories_updated', 0)
+            matched = stats.get('handles_matched', 0)
+            rows.append({
+                'Store': store['name'],
+                'Export File': store['export'],
+                'Output File': store['output'],
+                'Base URL': store.get('base_url', ''),
+                'Rows': stats.get('shopify_categories_loaded', 0),
+                'Collections': stats.get('collections_loaded', 0),
+                'Collections Updated': updated,
+                'No Match': stats.get('no_match_found', 0),
+                'Match Rate': f"{matched / len(self.content_map) * 100:.1f}%" if self.content_map else "N/A",
+                'Seconds': f"{seconds:.1f}",
+                'Status': status
+            })
+        return rows
+
+    def print_summary(self, total_seconds):
+        """Print the combined summary for all stores."""
+        rows = self.summary_rows()
+        print("=" * 80)
+        print("MULTI-STORE MIGRATION SUMMARY")
+        print("=" * 80)
+        print(f"PLP handles: {len(self.content_map):,}")
+        print(f"Stores: {len(rows)}")
+        print()
+        for row in rows:
+            print(f"• {row['Store']}: {row['Status']}")
+            print(f"     Output: {row['Output File']}")
+            print(f"     Collections updated: {row['Collections Updated']:,} of {row['Collections']:,} "
+                  f"({row['Match Rate']} of PLP handles), {row['Seconds']}s")
+        print()
+        slowest = max((float(row['Seconds']) for row in rows), default=0.0)
+        print(f"Total wall time: {total_seconds:.1f}s (slowest store {slowest:.1f}s, "
+              f"sum of stores {sum(float(row['Seconds']) for row in rows):.1f}s)")
+        print("=" * 80)
+
+    def save_summary(self):
+        """Save the combined summary to CSV."""
+        with open(self.summary_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(self.summary_rows())
+        logger.info(f"Saved multi-store summary to {self.summary_file}")
+
+    def run(self):
+        """Run the complete multi-store migration."""
+        logger.info("Starting multi-store PLP content migration...")
+        started = time.perf_counter()
+
+        try:
+            self.load_plp_content()
+            self.migrate_stores()
+            self.print_summary(time.perf_counter() - started)
+            self.save_summary()
+
+            failed = [store['name'] for store, _, _, status in self.results if status != 'OK']
+            if failed:
+                raise RuntimeError(f"{len(failed)} store(s) failed: {', '.join(failed)}")
+
+            logger.info("Multi-store migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Multi-store migration failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the multi-store migration."""
+    # File paths
+    plp_content_file = 'new-plp-content.csv'
+    stores_file = 'stores.json'
+    summary_file = 'multi-store-summary.csv'
+    url_index_file = 'url-rewrite-index.sqlite'
+    layouts_file = 'body-html-layouts.json'
+    field_mapping_files = ['field-mapping.json', 'field-mapping.yaml', 'field-mapping.yml']
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Migrate one PLP content file into several Shopify store exports')
+    parser.add_argument('--stores', default=stores_file, help='JSON file listing the store exports')
+    parser.add_argument('--summary', default=summary_file, help='Combined summary CSV')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per store, up to CPU count)')
+
+    args = parser.parse_args()
+
+    try:
+        stores = MultiStoreMigration.load_stores(args.stores)
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid stores file: {e}")
+        sys.exit(1)
+
+    missing_files = [path for path in [plp_content_file] + [store['export'] for store in stores]
+                     if not os.path.exists(path)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    migration = MultiStoreMigration(
+        plp_content_file,
+        stores,
+        args.summary,
+        max_workers=args.workers,
+        url_index_file=url_index_file if os.path.exists(url_index_file) else None,
+        layouts_file=layouts_file if os.path.exists(layouts_file) else None,
+        field_mapping_file=next((name for name in field_mapping_files if os.path.exists(name)), None)
+    )
+    try:
+        migration.run()
+    except Exception:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+PLP Content Diff
+
+Compares two versions of the PLP content file, keyed by the handle each URL
+resolves to (same resolution as the migration script):
+
+    python3 plp_diff.py old-plp-content.csv new-plp-content.csv
+
+Every handle is classified as added, removed or modified, with the fields
+that changed. The affected handles are written to plp-changed-handles.txt,
+which the migration takes as a filter:
+
+    python3 script.py --only-handles plp-changed-handles.txt
+
+so the re-migration and the Matrixify upload only touch changed collections.
+
+A removed handle has no new PLP content to migrate, so re-running it would
+leave its migrated content in Shopify. Instead, its rows are copied from the
+rollback file of the earlier migration into plp-removed-restore.csv, which
+puts back the collection's original export values when uploaded.
+
+Both files are read once as a stream. The old file is kept as a small digest
+per field, not as text, so memory stays low for any file size.
+"""
+
+import os
+import csv
+import sys
+import hashlib
+import logging
+
+from script import PLPMigrationScript
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ADDED, REMOVED, MODIFIED = 'added', 'removed', 'modified'
+DIFF_FIELDNAMES = ['Handle', 'Change', 'Fields']
+
+
+def field_digest(value):
+    """Small fixed-size digest of one field value."""
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+
+
+EMPTY_DIGEST = field_digest('')
+
+
+class PLPContentDiff:
+    def __init__(self, old_file, new_file, diff_file=None, handles_file=None, url_index_file=None,
+                 rollback_file=None, restore_file=None):
+        self.old_file = old_file
+        self.new_file = new_file
+        self.diff_file = diff_file
+        self.handles_file = handles_file
+        self.url_index_file = url_index_file
+        self.rollback_file = rollback_file  # rollback written when the old PLP content was migrated
+        self.restore_file = restore_file
+
+        # Reuse the migration script's URL -> handle logic
+        self.migration = PLPMigrationScript(old_file, None, None, url_index_file)
+
+        self.old_columns = []
+        self.old_rows = {}  # handle -> tuple of field digests in old column order
+        self.changes = []  # (handle, change, changed fields)
+        self.field_counts = {}  # field -> modified handles
+
+        # Statistics
+        self.stats = {
+            'old_rows': 0,
+            'new_rows': 0,
+            'rows_without_handle': 0,
+            'unchanged': 0,
+            ADDED: 0,
+            REMOVED: 0,
+            MODIFIED: 0,
+            'removed_restored': 0,
+            'removed_without_rollback': 0
+        }
+
+    def iter_handle_rows(self, filename, stats_key):
+        """Stream (handle, columns, values) from a PLP file; later rows of a handle win, as in the migration."""
+        url_index = None
+        if self.url_index_file:
+            from url_rewrite_index import UrlRewriteIndex
+            url_index = UrlRewriteIndex(self.url_index_file)
+
+        try:
+            with open(filename, 'r', encoding='utf-8', newline='') as file:
+                reader = csv.reader(file)
+                columns = [self.migration.clean_field_name(field) for field in next(reader, [])]
+                url_index_column = columns.index('URL') if 'URL' in columns else None
+                if url_index_column is None:
+                    raise ValueError(f"No 'URL' column in {filename}")
+
+                for values in reader:
+                    self.stats[stats_key] += 1
+                    values = [value.strip() for value in values[:len(columns)]]
+                    values += [''] * (len(columns) - len(values))
+                    handle = self.migration.resolve_handle(values[url_index_column], url_index)
+                    if not handle:
+                        self.stats['rows_without_handle'] += 1
+                        continue
+                    yield handle, columns, values
+        finally:
+            if url_index:
+                url_index.close()
+
+    def load_old(self):
+        """Digest every field of the old file, keyed by handle."""
+        logger.info(f"Reading {self.old_file}...")
+        for handle, columns, values in self.iter_handle_rows(self.old_file, 'old_rows'):
+            self.old_columns = columns
+            self.old_rows[handle] = tuple(field_digest(value) for value in values)
+        logger.info(f"Indexed {len(self.old_rows)} handles from {self.stats['old_rows']} rows")
+
+    def compare(self):
+        """Stream the new file against the old digests and classify every handle."""
+        logger.info(f"Comparing with {self.new_file}...")
+
+        # Last row of each handle wins, so keep only the latest new row per handle
+        new_rows = {}
+        for handle, columns, values in self.iter_handle_rows(self.new_file, 'new_rows'):
+            new_rows[handle] = (columns, tuple(field_digest(value) for value in values))
+
+        for handle, (columns, digests) in new_rows.items():
+            old_digests = self.old_rows.pop(handle, None)
+            if old_digests is None:
+                self.changes.append((handle, ADDED, []))
+                self.stats[ADDED] += 1
+                continue
+            changed = self.changed_digests(old_digests, columns, digests)
+            if changed:
+                self.changes.append((handle, MODIFIED, changed))
+                self.stats[MODIFIED] += 1
+                for column in changed:
+                    self.field_counts[column] = self.field_counts.get(column, 0) + 1
+            else:
+                self.stats['unchanged'] += 1
+
+        # Whatever is left in the old index is gone from the new file
+        for handle in self.old_rows:
+            self.changes.append((handle, REMOVED, []))
+            self.stats[REMOVED] += 1
+
+    def changed_digests(self, old_digests, columns, digests):
+        """Names of the fields whose digests differ between the old and new row."""
+        old_positions = {column: index for index, column in enumerate(self.old_columns)}
+        changed = []
+        for column, digest in zip(columns, digests):
+            index = old_positions.get(column)
+            if digest != (old_digests[index] if index is not None else EMPTY_DIGEST):
+                changed.append(column)
+        for column, index in old_positions.items():
+            if column not in columns and old_digests[index] != EMPTY_DIGEST:
+                changed.append(column)
+        return changed
+
+    def affected_handles(self):
+        """Handles the migration should re-run."""
+        return [handle for handle, change, _ in self.changes if change in (ADDED, MODIFIED)]
+
+    def save_restore(self):
+        """Copy the rollback rows of removed handles into the restore file."""
+        removed = {handle for handle, change, _ in self.changes if change == REMOVED}
+        if not removed or not self.rollback_file or not self.restore_file:
+            return
+
+        restored = set()
+        with open(self.rollback_file, 'r', encoding='utf-8', newline='') as source, \
+                open(self.restore_file, 'w', newline='', encoding='utf-8') as target:
+            reader = csv.DictReader(source)
+            writer = csv.DictWriter(target, fieldnames=reader.fieldnames or [])
+            writer.writeheader()
+            for row in reader:
+                if row.get('Handle') in removed:
+                    writer.writerow(row)
+                    restored.add(row['Handle'])
+
+        self.stats['removed_restored'] = len(restored)
+        self.stats['removed_without_rollback'] = len(removed - restored)
+        logger.info(f"Saved rollback rows of {len(restored)} removed handles to {self.restore_file}")
+        if removed - restored:
+            logger.warning(f"{len(removed - restored)} removed handles have no row in {self.rollback_file}; "
+                           f"their Shopify content is left as it is")
+
+    def save(self):
+        """Write the diff report and the handle filter."""
+        if self.diff_file:
+            with open(self.diff_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(DIFF_FIELDNAMES)
+                for handle, change, fields in self.changes:
+                    writer.writerow([handle, change, '; '.join(fields)])
+            logger.info(f"Saved {len(self.changes)} changes to {self.diff_file}")
+
+        if self.handles_file:
+            handles = self.affected_handles()
+            with open(self.handles_file, 'w', encoding='utf-8') as file:
+                for handle in handles:
+                    file.write(handle + '\n')
+            logger.info(f"Saved {len(handles)} affected handles to {self.handles_file}")
+
+        self.save_restore()
+
+    def print_summary(self, limit=10):
+        """Print the diff summary."""
+        print("=" * 80)
+        print("PLP CONTENT DIFF")
+        print("=" * 80)
+        print(f"Old file: {self.old_file} ({self.stats['old_rows']:,} rows)")
+        print(f"New file: {self.new_file} ({self.stats['new_rows']:,} rows)")
+        print()
+        print(f"➕ Added: {self.stats[ADDED]:,}")
+        print(f"➖ Removed: {self.stats[REMOVED]:,}")
+        print(f"✏️  Modified: {self.stats[MODIFIED]:,}")
+        print(f"   Unchanged: {self.stats['unchanged']:,}")
+        if self.stats['rows_without_handle']:
+            print(f"   Rows without a handle: {self.stats['rows_without_handle']:,}")
+        for column, count in sorted(self.field_counts.items(), key=lambda item: -item[1]):
+            print(f"   • {column}: {count:,} handles")
+        print()
+        for handle, change, fields in self.changes[:limit]:
+            print(f"   {change:<9} {handle}" + (f" ({', '.join(fields)})" if fields else ""))
+        if len(self.changes) > limit:
+            print(f"   ... and {len(self.changes) - limit} more" + (f" (see {self.diff_file})" if self.diff_file else ""))
+        if self.handles_file:
+            print()
+            print(f"🔁 Re-migrate only these: python3 script.py --only-handles {self.handles_file}")
+        if self.stats['removed_restored']:
+            print(f"↩️  Restore {self.stats['removed_restored']:,} removed collections: upload {self.restore_file}")
+        if self.stats[REMOVED] and not self.stats['removed_restored']:
+            print(f"⚠️  Removed collections keep their migrated content (no rollback rows found for them)")
+        print("=" * 80)
+
+    def run(self):
+        """Run the complete diff."""
+        try:
+            self.load_old()
+            self.compare()
+            self.save()
+            self.print_summary()
+        except Exception as e:
+            logger.error(f"PLP diff failed: {e}")
+            raise
+
+
+def main():
+    """Main function to diff two PLP content files."""
+    # File paths
+    diff_file = 'plp-diff.csv'
+    handles_file = 'plp-changed-handles.txt'
+    rollback_file = 'shopify-categories-rollback.csv'
+    restore_file = 'plp-removed-restore.csv'
+    url_index_file = 'url-rewrite-index.sqlite'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Diff two PLP content files by handle')
+    parser.add_argument('old', help='Previous PLP content CSV')
+    parser.add_argument('new', help='Revised PLP content CSV')
+    parser.add_argument('--output', default=diff_file, help='CSV with one row per changed handle')
+    parser.add_argument('--handles', default=handles_file, help='Affected handles, one per line (for --only-handles)')
+    parser.add_argument('--rollback', default=rollback_file,
+                        help='Rollback CSV from migrating the old PLP content (used when it exists)')
+    parser.add_argument('--restore', default=restore_file, help='CSV restoring the collections of removed handles')
+
+    args = parser.parse_args()
+
+    missing_files = [filename for filename in [args.old, args.new] if not os.path.exists(filename)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    if not os.path.exists(url_index_file):
+        url_index_file = None
+    rollback_file = args.rollback if os.path.exists(args.rollback) else None
+
+    diff = PLPContentDiff(args.old, args.new, args.output, args.handles, url_index_file,
+                          rollback_file=rollback_file, restore_file=args.restore)
+    diff.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+PLP Migration Command Line
+
+One entry point for the migration tools:
+
+    python3 plp_migrate.py migrate        # script.py
+    python3 plp_migrate.py validate       # validate_results.py
+    python3 plp_migrate.py analyze        # analyze_migration_coverage.py
+    python3 plp_migrate.py urls           # show_collections_urls.py
+    python3 plp_migrate.py updated-urls   # show_updated_collections.py
+    python3 plp_migrate.py quick-test     # quick_test.py
+    python3 plp_migrate.py import-results # import_results.py
+    python3 plp_migrate.py diff OLD       # plp_diff.py
+    python3 plp_migrate.py pipeline       # all of the above in one process
+
+File paths and the store URL are shared options (--plp, --export, --output,
+--base-url) instead of per-script constants. Each subcommand imports its tool
+only when it runs, so `--help` and single commands start quickly. The pipeline
+runs every step in one process on a shared DataContext: the PLP file and the
+export are parsed once, and the migrated rows are handed to the checks in
+memory instead of being re-read from disk by five separate interpreters.
+"""
+
+import os
+import csv
+import sys
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = {
+    'plp': 'new-plp-content.csv',
+    'export': 'shopify-categories-export.csv',
+    'output': 'shopify-categories-updated.csv',
+    'rollback': 'shopify-categories-rollback.csv',
+    'url_index': 'url-rewrite-index.sqlite',
+    'layouts': 'body-html-layouts.json',
+    'field_mapping': ['field-mapping.json', 'field-mapping.yaml', 'field-mapping.yml'],
+    'validation_report': 'validation_report.csv',
+    'analysis_report': 'enhanced_migration_report.txt',
+    'urls': 'collections_urls.txt',
+    'updated_urls': 'updated_collections_urls.txt',
+    'retry': 'shopify-categories-retry.csv',
+    'plp_diff': 'plp-diff.csv',
+    'changed_handles': 'plp-changed-handles.txt',
+    'removed_restore': 'plp-removed-restore.csv',
+}
+DEFAULT_BASE_URL = 'https://zj2y7h-80.myshopify.com'
+
+
+class DataContext:
+    """Parsed CSV data shared by every subcommand run in the same process."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rows = {}  # path -> cleaned rows
+        self.top_row_maps = {}  # (path, key column) -> {key: first row}
+
+    def optional_file(self, name):
+        """Return a config file path if it exists (several candidates allowed), else None."""
+        candidates = DEFAULT_PATHS[name]
+        if isinstance(candidates, str):
+            candidates = [candidates]
+        return next((path for path in candidates if os.path.exists(path)), None)
+
+    def require(self, *paths):
+        """Exit with the usual message when input files are missing."""
+        missing_files = [path for path in paths if path not in self.rows and not os.path.exists(path)]
+        if missing_files:
+            logger.error(f"Missing files: {', '.join(missing_files)}")
+            sys.exit(1)
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def load_rows(self, path):
+        """Return the cleaned rows of a CSV file, parsing it at most once."""
+        if path not in self.rows:
+            logger.info(f"Parsing {path}...")
+            with open(path, 'r', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+                self.rows[path] = [
+                    dict(zip(fieldnames, (value.strip() for value in values)))
+                    for values in reader
+                ]
+        return self.rows[path]
+
+    def remember_rows(self, path, rows):
+        """Register rows that are already in memory (e.g. the migration output) under their file path."""
+        self.rows[path] = rows
+        self.top_row_maps = {key: value for key, value in self.top_row_maps.items() if key[0] != path}
+
+    def top_rows(self, path, key_column):
+        """Map each ID or handle to the top-level row of its collection (Top Row = TRUE, else the first row)."""
+        from validate_results import keep_top_row
+
+        cache_key = (path, key_column)
+        if cache_key not in self.top_row_maps:
+            data = {}
+            for row in self.load_rows(path):
+                key = row.get(key_column, '')
+                if key and key != key_column:
+                    keep_top_row(data, key, row)
+            self.top_row_maps[cache_key] = data
+        return self.top_row_maps[cache_key]
+
+
+def run_migrate(context):
+    """Run the PLP content migration."""
+    from script import PLPMigrationScript, read_handles_file
+
+    args = context.args
+    only_handles_file = getattr(args, 'only_handles', None)
+    context.require(args.plp, args.export, *([only_handles_file] if only_handles_file else []))
+    migration = PLPMigrationScript(
+        args.plp, args.export, args.output,
+        context.optional_file('url_index'), context.optional_file('layouts'), context.optional_file('field_mapping'),
+        None if args.no_rollback else args.rollback,
+        read_handles_file(only_handles_file) if only_handles_file else None
+    )
+    if getattr(args, 'estimate', False):
+        from estimate_mode import MigrationEstimator
+        MigrationEstimator(migration, sample_size=args.sample_size).run()
+        return migration
+    migration.run(stream=getattr(args, 'stream', False))
+
+    # Hand the parsed data to later steps instead of re-reading it
+    context.remember_rows(args.plp, migration.plp_content)
+    if migration.updated_categories:
+        context.remember_rows(args.export, migration.shopify_categories)
+        context.remember_rows(args.output, migration.updated_categories)
+    return migration
+
+
+def run_validate(context):
+    """Validate the migration output before import."""
+    from validate_results import ValidationScript
+
+    args = context.args
+    context.require(args.export, args.output, args.plp)
+    validation = ValidationScript(args.export, args.output, args.plp)
+    validation.original_rows = context.load_rows(args.export)
+    validation.updated_rows = context.load_rows(args.output)
+    validation.plp_content = validation.index_plp_rows(context.load_rows(args.plp))
+    return validation.validate(args.report, args.jsonl, args.html, args.top)
+
+
+def run_analyze(context):
+    """Analyze migration coverage."""
+    from analyze_migration_coverage import EnhancedMigrationAnalyzer
+
+    args = context.args
+    context.require(args.plp, args.export, args.output)
+    analyzer = EnhancedMigrationAnalyzer(args.plp, args.export, args.output, args.base_url)
+    analyzer.index_plp_rows(context.load_rows(args.plp))
+    analyzer.original_shopify_rows = context.load_rows(args.export)
+    analyzer.updated_shopify_rows = context.load_rows(args.output)
+    return analyzer.analyze(
+        text_file=DEFAULT_PATHS['analysis_report'] if args.save_report else None,
+        csv_file=args.csv,
+        jsonl_file=args.jsonl,
+        html_file=args.html,
+        top_n=args.top
+    )
+
+
+def run_urls(context):
+    """List the collection URLs of the migration output."""
+    from show_collections_urls import CollectionsURLGenerator
+
+    args = context.args
+    context.require(args.output)
+    generator = CollectionsURLGenerator(args.output, args.base_url)
+    generator.run(
+        limit=args.limit,
+        save_to_file=DEFAULT_PATHS['urls'] if args.save else None,
+        show_samples=args.samples,
+        unique_only=not args.all,
+        rows=context.load_rows(args.output)
+    )
+
+
+def run_updated_urls(context):
+    """List the URLs of collections that were actually updated."""
+    from show_updated_collections import UpdatedCollectionsURLGenerator
+
+    args = context.args
+    context.require(args.export, args.output)
+    generator = UpdatedCollectionsURLGenerator(args.export, args.output, args.base_url)
+    generator.run(
+        limit=args.limit,
+        save_to_file=DEFAULT_PATHS['updated_urls'] if args.save else None,
+        show_samples=args.samples,
+        original_data=context.top_rows(args.export, 'Handle'),
+        updated_data=context.top_rows(args.output, 'Handle')
+    )
+
+
+def run_quick_test(context):
+    """Spot-check well-known collections in the migration output."""
+    import quick_test
+
+    args = context.args
+    context.require(args.output)
+    print("🔍 Quick Test for Shopify PLP Migration")
+    print("Checking if collections were updated correctly...")
+    print()
+    quick_test.test_specific_collections(context.top_rows(args.output, 'ID'))
+    quick_test.show_manual_test_urls()
+
+
+def run_import_results(context):
+    """Summarize Matrixify import failures and write a retry file."""
+    from import_results import ImportResultsProcessor
+
+    args = context.args
+    context.require(args.results, args.output)
+    processor = ImportResultsProcessor(args.results, args.output, args.retry)
+    if not processor.run():
+        sys.exit(1)
+
+
+def run_diff(context):
+    """Diff a previous PLP content file against the current one and write the changed handles."""
+    from plp_diff import PLPContentDiff
+
+    args = context.args
+    context.require(args.old, args.plp)
+    rollback_file = args.rollback if os.path.exists(args.rollback) else None
+    diff = PLPContentDiff(args.old, args.plp, args.diff_output, args.handles, context.optional_file('url_index'),
+                          rollback_file=rollback_file, restore_file=args.restore)
+    diff.run()
+
+
+def run_pipeline(context):
+    """Run migrate, validate, analyze, updated-urls, urls and quick-test in one process."""
+    steps = [
+        ('migrate', run_migrate),
+        ('validate', run_validate),
+        ('analyze', run_analyze),
+        ('updated-urls', run_updated_urls),
+        ('urls', run_urls),
+        ('quick-test', run_quick_test),
+    ]
+    for name, step in steps:
+        logger.info(f"▶ pipeline step: {name}")
+        step(context)
+    logger.info(f"Pipeline completed; parsed {len(context.rows)} files once for {len(steps)} steps")
+
+
+COMMANDS = {
+    'migrate': run_migrate,
+    'validate': run_validate,
+    'analyze': run_analyze,
+    'urls': run_urls,
+    'updated-urls': run_updated_urls,
+    'quick-test': run_quick_test,
+    'import-results': run_import_results,
+    'diff': run_diff,
+    'pipeline': run_pipeline,
+}
+
+
+def build_parser():
+    """Build the argument parser with shared path options on every subcommand."""
+    import argparse
+
+    shared = argparse.ArgumentParser(add_help=False)
+    shared.add_argument('--plp', default=DEFAULT_PATHS['plp'], help='Magento PLP content CSV')
+    shared.add_argument('--export', default=DEFAULT_PATHS['export'], help='Shopify collections export CSV')
+    shared.add_argument('--output', default=DEFAULT_PATHS['output'], help='Migrated collections CSV')
+    shared.add_argument('--base-url', default=DEFAULT_BASE_URL, help='Store base URL (e.g. https://your-store.myshopify.com)')
+
+    report_options = argparse.ArgumentParser(add_help=False)
+    report_options.add_argument('--top', type=int, default=10, help='Records of each status to show on the console')
+    report_options.add_argument('--jsonl', help='Also save every record as JSON lines')
+    report_options.add_argument('--html', help='Also save every record as a paged HTML report')
+
+    url_options = argparse.ArgumentParser(add_help=False)
+    url_options.add_argument('--limit', type=int, help='Limit number of URLs to display')
+    url_options.add_argument('--save', action='store_true', help='Save URLs to file')
+    url_options.add_argument('--samples', action='store_true', help='Show sample URLs for testing')
+
+    parser = argparse.ArgumentParser(description='Magento → Shopify PLP content migration tools')
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    migrate = commands.add_parser('migrate', parents=[shared], help='Migrate PLP content into the export')
+    migrate.add_argument('--stream', action='store_true', help='Patch and write the export group by group with bounded memory')
+    migrate.add_argument('--rollback', default=DEFAULT_PATHS['rollback'], help='Rollback CSV restoring changed collections')
+    migrate.add_argument('--no-rollback', action='store_true', help='Do not write a rollback file')
+    migrate.add_argument('--only-handles', help='Only migrate the collections listed in this file (see diff)')
+    migrate.add_argument('--estimate', action='store_true', help='Estimate runtime, memory and collection match rate from a sample; writes nothing')
+    migrate.add_argument('--sample-size', type=int, default=2000, help='Collections and PLP rows sampled by --estimate')
+
+    validate = commands.add_parser('validate', parents=[shared, report_options], help='Show what will change before import')
+    validate.add_argument('--report', default=DEFAULT_PATHS['validation_report'], help='CSV report of every change')
+
+    analyze = commands.add_parser('analyze', parents=[shared, report_options], help='Coverage analysis')
+    analyze.add_argument('--save-report', action='store_true', help='Save detailed text report')
+    analyze.add_argument('--csv', help='Save every record to a CSV file')
+
+    urls = commands.add_parser('urls', parents=[shared, url_options], help='All collection URLs')
+    urls.add_argument('--all', action='store_true', help='Show all entries (including duplicates)')
+
+    commands.add_parser('updated-urls', parents=[shared, url_options], help='URLs of updated collections')
+    commands.add_parser('quick-test', parents=[shared], help='Spot-check well-known collections')
+
+    import_results = commands.add_parser('import-results', parents=[shared], help='Summarize import failures and build a retry file')
+    import_results.add_argument('results', help='Matrixify import results CSV')
+    import_results.add_argument('--retry', default=DEFAULT_PATHS['retry'], help='Retry CSV to write')
+
+    diff = commands.add_parser('diff', parents=[shared], help='Find the collections changed between two PLP files')
+    diff.add_argument('old', help='Previous PLP content CSV (compared against --plp)')
+    diff.add_argument('--diff-output', default=DEFAULT_PATHS['plp_diff'], help='CSV with one row per changed handle')
+    diff.add_argument('--handles', default=DEFAULT_PATHS['changed_handles'], help='Affected handles for migrate --only-handles')
+    diff.add_argument('--rollback', default=DEFAULT_PATHS['rollback'],
+                      help='Rollback CSV from migrating the old PLP content (used when it exists)')
+    diff.add_argument('--restore', default=DEFAULT_PATHS['removed_restore'], help='CSV restoring the collections of removed handles')
+
+    pipeline = commands.add_parser('pipeline', parents=[shared, report_options],
+                                   help='Run every step in one process, parsing each file once')
+    pipeline.add_argument('--report', default=DEFAULT_PATHS['validation_report'], help='CSV report of every change')
+    pipeline.add_argument('--save-report', action='store_true', help='Save detailed text analysis report')
+    pipeline.add_argument('--csv', help='Save every analysis record to a CSV file')
+    pipeline.add_argument('--limit', type=int, default=10, help='URLs to display per listing')
+    pipeline.add_argument('--save', action='store_true', help='Save URL lists to files')
+    pipeline.add_argument('--samples', action='store_true', help='Show sample URLs for testing')
+    pipeline.add_argument('--all', action='store_true', help='List every export row, not just unique handles')
+    pipeline.add_argument('--rollback', default=DEFAULT_PATHS['rollback'], help='Rollback CSV restoring changed collections')
+    pipeline.add_argument('--no-rollback', action='store_true', help='Do not write a rollback file')
+    pipeline.set_defaults(stream=False)
+
+    return parser
+
+
+def main():
+    """Main function to dispatch a subcommand."""
+    args = build_parser().parse_args()
+    context = DataContext(args)
+    try:
+        COMMANDS[args.command](context)
+    except Exception as e:
+        logger.error(f"{args.command} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
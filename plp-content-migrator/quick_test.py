@@ -8,6 +8,8 @@ This script helps quickly verify that specific collections were updated correctl
 import csv
 import sys
 
+from validate_results import keep_top_row
+
 def load_updated_categories(filename):
     """Load updated categories and return as dictionary."""
     categories = {}
@@ -24,8 +26,9 @@ def load_updated_categories(filename):
                     cleaned_row[clean_key] = value.strip() if value else ""
                 
                 category_id = cleaned_row.get('ID', '')
+                # Keep the top-level row of multi-row Matrixify collections
                 if category_id:
-                    categories[category_id] = cleaned_row
+                    keep_top_row(categories, category_id, cleaned_row)
         
         return categories
         
@@ -33,8 +36,8 @@ def load_updated_categories(filename):
         print(f"Error loading {filename}: {e}")
         return {}
 
-def test_specific_collections():
-    """Test specific collections that should have been updated."""
+def test_specific_collections(categories=None):
+    """Test specific collections that should have been updated (optionally from already loaded ID -> row data)."""
     
     # Collections that were successfully matched (from migration logs)
     test_collections = [
@@ -51,7 +54,8 @@ def test_specific_collections():
     ]
     
     # Load updated categories
-    categories = load_updated_categories('shopify-categories-updated.csv')
+    if categories is None:
+        categories = load_updated_categories('shopify-categories-updated.csv')
     
     if not categories:
         print("❌ Could not load updated categories file")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Streaming Report Sinks
+
+The analysis and validation scripts produce their reports as a generator of
+change records (plain dicts with a 'status' key). Each sink consumes the records
+one at a time and writes them straight out, so report size never depends on
+memory:
+
+- SummarySink     aggregates per status plus the first N records of each (console view)
+- PagedTextSink   the readable multi-line text report, split into numbered pages
+- CSVSink         one row per record
+- JSONLinesSink   one JSON object per record
+- HTMLTableSink   static HTML table with client-side paging and a status filter
+
+write_report() fans one record stream out to any number of sinks in one pass.
+"""
+
+import csv
+import json
+import html
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SummarySink:
+    """Counts records per status and keeps only the first top_n records of each status."""
+
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+        self.counts = {}
+        self.samples = {}
+        self.total = 0
+
+    def write(self, record):
+        status = record.get('status', '')
+        self.total += 1
+        self.counts[status] = self.counts.get(status, 0) + 1
+        samples = self.samples.setdefault(status, [])
+        if len(samples) < self.top_n:
+            samples.append(record)
+
+    def count(self, status):
+        return self.counts.get(status, 0)
+
+    def sample(self, status):
+        return self.samples.get(status, [])
+
+    def close(self):
+        pass
+
+
+class PagedTextSink:
+    """Multi-line text report with a page header every page_size records."""
+
+    def __init__(self, output_file, format_record, title, page_size=500):
+        self.output_file = output_file
+        self.format_record = format_record  # record -> list of lines
+        self.page_size = page_size
+        self.counts = {}
+        self.total = 0
+        self.file = open(output_file, 'w', encoding='utf-8')
+        self.file.write(f"{title}\n")
+        self.file.write("=" * 80 + "\n")
+
+    def write(self, record):
+        if self.total % self.page_size == 0:
+            page = self.total // self.page_size + 1
+            self.file.write(f"\n--- Page {page} (records {self.total + 1}-{self.total + self.page_size}) ---\n\n")
+        self.total += 1
+        status = record.get('status', '')
+        self.counts[status] = self.counts.get(status, 0) + 1
+        self.file.write(f"{self.total:5d}. " + '\n'.join(self.format_record(record)) + "\n\n")
+
+    def close(self):
+        self.file.write("=" * 80 + "\n")
+        self.file.write(f"Records: {self.total:,}\n")
+        for status, count in self.counts.items():
+            self.file.write(f"  {status}: {count:,}\n")
+        self.file.close()
+        logger.info(f"Saved text report ({self.total} records) to {self.output_file}")
+
+
+class CSVSink:
+    """One CSV row per record."""
+
+    def __init__(self, output_file, fieldnames, format_record=None):
+        self.output_file = output_file
+        self.format_record = format_record or (lambda record: record)
+        self.total = 0
+        self.file = open(output_file, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(self.format_record(record))
+        self.total += 1
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Saved CSV report ({self.total} rows) to {self.output_file}")
+
+
+class JSONLinesSink:
+    """One JSON object per line."""
+
+    def __init__(self, output_file, format_record=None):
+        self.output_file = output_file
+        self.format_record = format_record or (lambda record: record)
+        self.total = 0
+        self.file = open(output_file, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(self.format_record(record), ensure_ascii=False) + '\n')
+        self.total += 1
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Saved JSON-lines report ({self.total} records) to {self.output_file}")
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, Segoe UI, Helvetica, Arial, sans-serif; margin: 2rem; }}
+table {{ border-collapse: collapse; width: 100%; font-size: 0.85rem; }}
+th, td {{ border: 1px solid #ddd; padding: 0.35rem 0.5rem; text-align: left; vertical-align: top; }}
+th {{ background: #f4f4f4; position: sticky; top: 0; }}
+tr[data-status="updated"] td:first-child {{ color: #1a7f37; }}
+.controls {{ margin: 1rem 0; display: flex; gap: 0.75rem; align-items: center; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<div class="controls">
+<label>Status <select id="status"><option value="">All</option></select></label>
+<button id="prev">&larr; Prev</button><span id="page"></span><button id="next">Next &rarr;</button>
+</div>
+<table>
+<thead><tr>{header}</tr></thead>
+<tbody id="rows">
+"""
+
+HTML_TAIL = """</tbody>
+</table>
+<script>
+(function () {{
+  var pageSize = {page_size};
+  var rows = Array.prototype.slice.call(document.querySelectorAll('#rows tr'));
+  var select = document.getElementById('status');
+  var page = 0, visible = rows;
+  var statuses = {{}};
+  rows.forEach(function (row) {{ statuses[row.dataset.status] = (statuses[row.dataset.status] || 0) + 1; }});
+  Object.keys(statuses).forEach(function (status) {{
+    var option = document.createElement('option');
+    option.value = status;
+    option.textContent = status + ' (' + statuses[status] + ')';
+    select.appendChild(option);
+  }});
+  function render() {{
+    var pages = Math.max(1, Math.ceil(visible.length / pageSize));
+    page = Math.min(Math.max(page, 0), pages - 1);
+    rows.forEach(function (row) {{ row.hidden = true; }});
+    visible.slice(page * pageSize, (page + 1) * pageSize).forEach(function (row) {{ row.hidden = false; }});
+    document.getElementById('page').textContent = 'Page ' + (page + 1) + ' of ' + pages + ' (' + visible.length + ' rows)';
+  }}
+  select.onchange = function () {{
+    visible = rows.filter(function (row) {{ return !select.value || row.dataset.status === select.value; }});
+    page = 0;
+    render();
+  }};
+  document.getElementById('prev').onclick = function () {{ page -= 1; render(); }};
+  document.getElementById('next').onclick = function () {{ page += 1; render(); }};
+  render();
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+class HTMLTableSink:
+    """Static HTML report; rows are streamed into the table and paged in the browser."""
+
+    def __init__(self, output_file, fieldnames, format_record=None, title='Migration Report', page_size=50):
+        self.output_file = output_file
+        self.fieldnames = fieldnames
+        self.format_record = format_record or (lambda record: record)
+        self.page_size = page_size
+        self.total = 0
+        self.file = open(output_file, 'w', encoding='utf-8')
+        header = ''.join(f'<th>{html.escape(name)}</th>' for name in fieldnames)
+        self.file.write(HTML_HEAD.format(title=html.escape(title), header=header))
+
+    def write(self, record):
+        row = self.format_record(record)
+        cells = ''.join(f"<td>{html.escape(str(row.get(name, '')))}</td>" for name in self.fieldnames)
+        self.file.write(f'<tr data-status="{html.escape(record.get("status", ""))}">{cells}</tr>\n')
+        self.total += 1
+
+    def close(self):
+        self.file.write(HTML_TAIL.format(page_size=self.page_size))
+        self.file.close()
+        logger.info(f"Saved HTML report ({self.total} rows) to {self.output_file}")
+
+
+def write_report(records, sinks):
+    """Stream every record into every sink in a single pass; returns the record count."""
+    total = 0
+    try:
+        for record in records:
+            for sink in sinks:
+                sink.write(record)
+            total += 1
+    finally:
+        for sink in sinks:
+            sink.close()
+    return total
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Rich Text Pipeline for PLP Content
+
+Magento PLP fields can hold plain text, Markdown or HTML (with entities). Escaping
+everything double-escapes existing markup into visible `&lt;p&gt;` text, so each
+field is classified first:
+
+- plain text is escaped exactly as before
+- Markdown is converted to HTML
+- HTML is run through an allowlist sanitizer built on a single-pass tokenizer
+
+Converted fragments are cached by content (dict keyed on the text, i.e. its
+string hash) because the same boilerplate paragraphs repeat across hundreds of
+collections.
+"""
+
+import re
+import html
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# Fragment kinds; BLOCK fragments must not be wrapped in <p> by a layout
+ABSENT, INLINE, BLOCK = 0, 1, 2
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'div', 'em', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'i', 'li', 'ol', 'p', 'small', 'span', 'strong', 'sub', 'sup', 'u', 'ul'
+}
+BLOCK_TAGS = {'blockquote', 'div', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p', 'ul'}
+VOID_TAGS = {'br', 'hr'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'template'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title', 'target', 'rel'},
+}
+GLOBAL_ATTRIBUTES = {'class'}
+SAFE_URL = re.compile(r'^(https?:|mailto:|tel:|/|#)', re.IGNORECASE)
+
+HTML_PATTERN = re.compile(r'</?[a-zA-Z][a-zA-Z0-9]*(\s[^<>]*)?/?>|&(#\d+|#x[0-9a-fA-F]+|[a-zA-Z]+\d*);')
+# __bold__ only at word boundaries and not around a bare identifier (snake_case, __dunder__)
+UNDERSCORE_STRONG = r'(?<!\w)__(?!\w+__(?!\w))(\S(?:.*?\S)?)__(?!\w)'
+MARKDOWN_PATTERN = re.compile(
+    r'^#{1,6} \S|^\s*[-*+] \S.*\n\s*[-*+] \S|^\s*1\. \S|\*\*\S.*?\*\*|' + UNDERSCORE_STRONG +
+    r'|\[[^\]\n]+\]\((https?://|/)[^)\s]+\)',
+    re.MULTILINE)
+
+
+def detect_format(text):
+    """Classify a PLP field as 'html', 'markdown' or 'text'."""
+    if '<' in text or '&' in text:
+        if HTML_PATTERN.search(text):
+            return 'html'
+    if MARKDOWN_PATTERN.search(text):
+        return 'markdown'
+    return 'text'
+
+
+class AllowlistSanitizer(HTMLParser):
+    """Single-pass sanitizer that keeps only allowlisted tags and attributes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.open_tags = []
+        self.drop_depth = 0
+        self.has_block = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set()) | GLOBAL_ATTRIBUTES
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name == 'href' and not SAFE_URL.match(value.strip()):
+                continue
+            parts.append(f'{name}="{html.escape(value)}"')
+
+        self.output.append(f"<{' '.join(parts)}>")
+        if tag in BLOCK_TAGS:
+            self.has_block = True
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # A self-closing <iframe/> has no content to drop and no end tag to come
+        if tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        # Close any tags left open inside this one
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.drop_depth:
+            self.output.append(html.escape(data, quote=False))
+
+    def sanitize(self, text):
+        """Return (sanitized HTML, contains block elements)."""
+        self.feed(text)
+        self.close()
+        while self.open_tags:
+            self.output.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.output).strip(), self.has_block
+
+
+class RichTextPipeline:
+    def __init__(self, max_cache_entries=50000):
+        self.max_cache_entries = max_cache_entries  # 0 disables the fragment cache
+        self.inline_cache = {}  # text -> (fragment, kind) for headings
+        self.block_cache = {}  # text -> (fragment, kind) for body fields
+
+        # Statistics
+        self.stats = {
+            'fragment_cache_hits': 0,
+            'fragment_cache_misses': 0,
+            'text_fields': 0,
+            'markdown_fields': 0,
+            'html_fields': 0
+        }
+
+    def markdown_inline(self, text):
+        """Convert inline Markdown (bold, italics, links) in already escaped text."""
+        text = re.sub(r'\*\*(\S.*?)\*\*|' + UNDERSCORE_STRONG, lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', text)
+        text = re.sub(r'(?<![\w*])\*(\S[^*\n]*?)\*(?![\w*])', r'<em>\1</em>', text)
+
+        def link(match):
+            label, url = match.group(1), match.group(2)
+            if not SAFE_URL.match(html.unescape(url)):
+                return label
+            return f'<a href="{url}">{label}</a>'
+
+        return re.sub(r'\[([^\]\n]+)\]\(([^)\s]+)\)', link, text)
+
+    def markdown_to_html(self, text):
+        """Convert the Markdown subset used in PLP content to HTML."""
+        blocks = []
+        for block in re.split(r'\n\s*\n', text.strip()):
+            lines = [line.strip() for line in block.splitlines() if line.strip()]
+            if not lines:
+                continue
+
+            heading = re.match(r'^(#{1,6}) (.*)$', lines[0])
+            if heading and len(lines) == 1:
+                level = min(max(len(heading.group(1)), 2), 6)
+                blocks.append(f'<h{level}>{self.markdown_inline(html.escape(heading.group(2)))}</h{level}>')
+            elif all(re.match(r'^[-*+] ', line) for line in lines):
+                items = ''.join(f'<li>{self.markdown_inline(html.escape(line[2:]))}</li>' for line in lines)
+                blocks.append(f'<ul>{items}</ul>')
+            elif all(re.match(r'^\d+\. ', line) for line in lines):
+                items = ''.join(f"<li>{self.markdown_inline(html.escape(line.split('. ', 1)[1]))}</li>" for line in lines)
+                blocks.append(f'<ol>{items}</ol>')
+            else:
+                paragraph = '<br>'.join(self.markdown_inline(html.escape(line)) for line in lines)
+                blocks.append(f'<p>{paragraph}</p>')
+        return ''.join(blocks)
+
+    def convert(self, text, inline):
+        """Classify, convert and sanitize one field (uncached)."""
+        text_format = detect_format(text)
+        self.stats[f'{text_format}_fields'] += 1
+
+        if text_format == 'text':
+            return html.escape(text), INLINE
+
+        if text_format == 'markdown':
+            if inline:
+                return self.markdown_inline(html.escape(text)), INLINE
+            text = self.markdown_to_html(text)
+
+        if inline:
+            # Headings and metafield-like fields keep their text only
+            return html.escape(html.unescape(re.sub(r'<[^>]*>', '', text)).strip()), INLINE
+
+        fragment, has_block = AllowlistSanitizer().sanitize(text)
+        return fragment, BLOCK if has_block else INLINE
+
+    def render_fragment(self, text, inline=False):
+        """Return (HTML fragment, kind) for a PLP field, using the fragment cache."""
+        if not text:
+            return '', ABSENT
+
+        if not self.max_cache_entries:
+            return self.convert(text, inline)
+
+        cache = self.inline_cache if inline else self.block_cache
+        cached = cache.get(text)
+        if cached is not None:
+            self.stats['fragment_cache_hits'] += 1
+            return cached
+
+        self.stats['fragment_cache_misses'] += 1
+        result = self.convert(text, inline)
+
+        if len(cache) >= self.max_cache_entries:
+            # Drop the oldest entry; dicts keep insertion order
+            del cache[next(iter(cache))]
+        cache[text] = result
+        return result
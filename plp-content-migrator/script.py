@@ -5,37 +5,80 @@ Magento to Shopify PLP Content Migration Script
 This script migrates Product Listing Page (PLP) content from Magento to Shopify
 by matching URLs from the PLP content file to Shopify categories and updating
 the category metadata with new content.
+
+Alongside the update file it writes a rollback file in the same pass: one
+MERGE row per changed collection with its original values for every mapped
+column the export has, so an import can be undone with a small upload.
 """
 
 import csv
 import re
 import sys
+import itertools
+from contextlib import contextmanager
 from urllib.parse import urlparse
 import logging
-import html
+
+from url_rewrite_index import UrlRewriteIndex
+from html_templates import BodyHTMLRenderer
+from field_mapping import FieldMappingPlan
+from compact_rows import PLPContent, RowSchema
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+ROLLBACK_KEY_COLUMNS = ['ID', 'Handle', 'Command']
+
 class PLPMigrationScript:
-    def __init__(self, plp_content_file, shopify_categories_file, output_file):
+    def __init__(self, plp_content_file, shopify_categories_file, output_file, url_index_file=None,
+                 layouts_file=None, field_mapping_file=None, rollback_file=None, only_handles=None):
         self.plp_content_file = plp_content_file
         self.shopify_categories_file = shopify_categories_file
         self.output_file = output_file
+        self.url_index_file = url_index_file
+        self.rollback_file = rollback_file
+        self.rollback_output = None
+        self.rollback_writer = None
+        
+        # When set, only these collections are patched and written (see plp_diff.py)
+        self.only_handles = set(only_handles) if only_handles is not None else None
+        
+        # Body HTML layouts are compiled once here and reused for every row
+        self.renderer = BodyHTMLRenderer.from_config(layouts_file) if layouts_file else BodyHTMLRenderer()
+        
+        # Source column -> transform -> target column plan, compiled once
+        self.field_mapping = FieldMappingPlan.from_file(field_mapping_file) if field_mapping_file else FieldMappingPlan()
+        self.content_columns = list(dict.fromkeys(
+            ['Title', 'Sub-heading', 'Description', 'Content under product listing'] + self.field_mapping.source_columns))
         
         # Store the content mappings
         self.plp_content = []
         self.shopify_categories = []
         self.updated_categories = []
         self.content_map = {}  # Map handle to content data
+        self.interned_text = {}  # Shared copy of every distinct PLP text value
+        self.html_cache = {}  # (title, subheading, description, content, layout) -> Body HTML
+        self.patch_cache = {}  # (mapped source values, layout) -> (target number, value) assignments
+        self.matched_handles = set()  # PLP handles that patched at least one collection
+        self.omitted_groups = []  # positions (in export order) of collection groups left out of the output
         
         # Statistics
         self.stats = {
             'plp_entries_loaded': 0,
             'shopify_categories_loaded': 0,
+            'collections_loaded': 0,
             'categories_updated': 0,
-            'no_match_found': 0
+            'handles_matched': 0,
+            'no_match_found': 0,
+            'handles_from_url_index': 0,
+            'plp_text_fields': 0,
+            'plp_text_duplicates': 0,
+            'patch_cache_hits': 0,
+            'patch_cache_misses': 0,
+            'rollback_collections': 0,
+            'collections_skipped': 0,
+            'collections_omitted': 0
         }
 
     def extract_handle_from_url(self, url):
@@ -61,6 +104,15 @@ class PLPMigrationScript:
             logger.warning(f"Error parsing URL {url}: {e}")
             return None
 
+    def resolve_handle(self, url, url_index=None):
+        """Resolve a PLP URL to a handle, preferring the Magento url_rewrite index when available."""
+        if url_index:
+            handle = url_index.resolve_url(url)
+            if handle:
+                self.stats['handles_from_url_index'] += 1
+                return handle
+        return self.extract_handle_from_url(url)
+
     def clean_field_name(self, field_name):
         """Clean field name by removing quotes, BOM, and extra whitespace."""
         if not field_name:
@@ -69,29 +121,34 @@ class PLPMigrationScript:
         cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
         return cleaned
 
-    def create_html_content(self, title, subheading, description, content_under_listing):
+    def intern_text(self, value):
+        """Return the shared copy of a PLP text value so repeated blocks are stored once."""
+        if not value:
+            return ""
+        self.stats['plp_text_fields'] += 1
+        shared = self.interned_text.setdefault(value, value)
+        if shared is not value:
+            self.stats['plp_text_duplicates'] += 1
+        return shared
+
+    def create_html_content(self, title, subheading, description, content_under_listing, layout='default'):
         """Create properly formatted HTML content for the Body HTML field."""
-        html_parts = ['<div class="collection-description">']
-        
-        if title:
-            html_parts.append(f'<h1>{html.escape(title)}</h1>')
-        
-        if subheading:
-            html_parts.append(f'<h2>{html.escape(subheading)}</h2>')
-        
-        if description:
-            html_parts.append(f'<p>{html.escape(description)}</p>')
-        
-        if content_under_listing:
-            html_parts.append(f'<div class="content-under-listing">{html.escape(content_under_listing)}</div>')
-        
-        html_parts.append('</div>')
-        return ''.join(html_parts)
+        key = (title, subheading, description, content_under_listing, layout)
+        body_html = self.html_cache.get(key)
+        if body_html is None:
+            body_html = self.renderer.render(title, subheading, description, content_under_listing, layout)
+            self.html_cache[key] = body_html
+        return body_html
 
     def load_plp_content(self):
         """Load the new PLP content from CSV file and create handle mapping."""
         logger.info("Loading PLP content from CSV...")
         
+        url_index = None
+        if self.url_index_file:
+            logger.info(f"Resolving URLs through url_rewrite index {self.url_index_file}")
+            url_index = UrlRewriteIndex(self.url_index_file)
+        
         try:
             with open(self.plp_content_file, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
@@ -112,110 +169,258 @@ class PLPMigrationScript:
                     plp_entries.append(cleaned_row)
                     
                     # Extract handle and create mapping
-                    url = cleaned_row.get('URL', '')
-                    handle = self.extract_handle_from_url(url)
-                    
-                    if handle:
-                        self.content_map[handle] = {
-                            'title': cleaned_row.get('Title', ''),
-                            'subheading': cleaned_row.get('Sub-heading', ''),
-                            'description': cleaned_row.get('Description', ''),
-                            'content_under_listing': cleaned_row.get('Content under product listing', '')
-                        }
-                        logger.info(f"Mapped handle: '{handle}' -> Title: '{cleaned_row.get('Title', '')}'")
+                    self.map_plp_row(cleaned_row, url_index)
                 
                 self.plp_content = plp_entries
                 self.stats['plp_entries_loaded'] = len(self.plp_content)
                 logger.info(f"Loaded {len(self.plp_content)} PLP content entries")
                 logger.info(f"Created content map with {len(self.content_map)} entries")
+                logger.info(f"Interned {len(self.interned_text)} distinct text blocks "
+                            f"({self.stats['plp_text_duplicates']} repeated fields share storage)")
                 
         except Exception as e:
             logger.error(f"Error loading PLP content: {e}")
             raise
+        finally:
+            if url_index:
+                url_index.close()
+
+    def map_plp_row(self, cleaned_row, url_index=None):
+        """Add one cleaned PLP row to the content map; returns its handle (or None)."""
+        url = cleaned_row.get('URL', '')
+        handle = self.resolve_handle(url, url_index)
+        
+        if handle:
+            row_text = {column: self.intern_text(cleaned_row.get(column, '')) for column in self.content_columns}
+            self.content_map[handle] = PLPContent(
+                title=row_text['Title'],
+                subheading=row_text['Sub-heading'],
+                description=row_text['Description'],
+                content_under_listing=row_text['Content under product listing'],
+                layout=self.renderer.layout_for_url(url),
+                values=tuple(row_text[column] for column in self.field_mapping.source_columns)
+            )
+            logger.info(f"Mapped handle: '{handle}' -> Title: '{cleaned_row.get('Title', '')}'")
+        return handle
+
+    def iter_shopify_categories(self):
+        """Stream cleaned Shopify category rows from the CSV file."""
+        with open(self.shopify_categories_file, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            schema = self.category_schema(next(reader, []))
+            
+            for values in reader:
+                # Blank lines are skipped, as csv.DictReader does
+                if values:
+                    yield schema.make_row(values)
+
+    def category_schema(self, header):
+        """Build the row schema shared by every row of an export, from its raw header."""
+        # Clean up field names
+        fieldnames = [self.clean_field_name(field) for field in header]
+        logger.info(f"Shopify CSV field names: {fieldnames[:5]}...")  # Debug
+        
+        # Mapped target columns the export doesn't have yet are appended
+        extra_columns = self.field_mapping.missing_targets(fieldnames)
+        if extra_columns:
+            logger.info(f"Adding mapped columns to output: {extra_columns}")
+        return RowSchema(fieldnames, extra_columns, self.field_mapping.target_columns)
 
     def load_shopify_categories(self):
         """Load Shopify categories from CSV file."""
         logger.info("Loading Shopify categories from CSV...")
         
         try:
-            with open(self.shopify_categories_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                # Clean up field names
-                fieldnames = [self.clean_field_name(field) for field in reader.fieldnames]
-                logger.info(f"Shopify CSV field names: {fieldnames[:5]}...")  # Debug
-                
-                categories = []
-                for row in reader:
-                    # Clean up the row data and field names
-                    cleaned_row = {}
-                    for key, value in row.items():
-                        # Clean the key
-                        clean_key = self.clean_field_name(key)
-                        cleaned_row[clean_key] = value.strip() if value else ""
-                    categories.append(cleaned_row)
-                
-                self.shopify_categories = categories
-                self.stats['shopify_categories_loaded'] = len(self.shopify_categories)
-                logger.info(f"Loaded {len(self.shopify_categories)} Shopify categories")
-                
-                # Debug: Check first category keys
-                if categories:
-                    logger.info(f"First category keys: {list(categories[0].keys())[:5]}")
+            categories = list(self.iter_shopify_categories())
+            
+            self.shopify_categories = categories
+            self.stats['shopify_categories_loaded'] = len(self.shopify_categories)
+            logger.info(f"Loaded {len(self.shopify_categories)} Shopify categories")
+            
+            # Debug: Check first category keys
+            if categories:
+                logger.info(f"First category keys: {list(categories[0].keys())[:5]}")
                 
         except Exception as e:
             logger.error(f"Error loading Shopify categories: {e}")
             raise
 
-    def update_shopify_categories(self):
-        """Update Shopify categories with new PLP content using direct handle mapping."""
-        logger.info("Updating Shopify categories with PLP content...")
+    def iter_collection_groups(self, categories):
+        """Group consecutive rows of the same collection.
         
-        # Create a copy of shopify categories
-        self.updated_categories = [dict(category) for category in self.shopify_categories]
+        Matrixify exports one collection as several rows (one per rule or image)
+        sharing the same ID and Handle.
+        """
+        for key, rows in itertools.groupby(categories, key=lambda row: (row.get('ID', ''), row.get('Handle', ''))):
+            yield key[1], list(rows)
+
+    def find_top_row(self, rows):
+        """Return the top-level row of a collection group."""
+        for row in rows:
+            if row.get('Top Row', '').upper() == 'TRUE':
+                return row
+        return rows[0]
+
+    def get_patches(self, content):
+        """Return the compiled (target number, value) assignments for one PLP entry."""
+        key = (content.values, content.layout)
+        patches = self.patch_cache.get(key)
+        if patches is None:
+            self.stats['patch_cache_misses'] += 1
+            patches = self.field_mapping.build_patches(content.values, content.layout, self.create_html_content)
+            self.patch_cache[key] = patches
+        else:
+            self.stats['patch_cache_hits'] += 1
+        return patches
+
+    def patch_collection(self, handle, rows):
+        """Patch the top-level row of one collection group; returns True if it was updated."""
+        content = self.content_map.get(handle)
+        if content is None:
+            return False
         
-        updated_count = 0
-        no_match_count = 0
+        logger.info(f"Updating handle: '{handle}'")
         
-        # Process each category
-        for i, category in enumerate(self.updated_categories):
-            if i == 0:  # Skip header if it exists
+        # Copy-on-write: only the patched top row gets its own copy, the other rows stay shared
+        top_row = self.find_top_row(rows)
+        position = next(index for index, row in enumerate(rows) if row is top_row)
+        category = rows[position] = top_row.copy()
+        
+        # Apply the field mapping plan (Title, Body HTML, subheading metafield by default) by column position
+        category.assign(category.schema.target_positions, self.get_patches(content))
+        
+        return True
+
+    def open_rollback(self):
+        """Start the rollback file; rows are added while collections are patched."""
+        if not self.rollback_file:
+            return
+        self.stats['rollback_collections'] = 0
+        self.rollback_output = open(self.rollback_file, 'w', newline='', encoding='utf-8')
+        self.rollback_writer = csv.DictWriter(self.rollback_output, fieldnames=self.rollback_fieldnames())
+        self.rollback_writer.writeheader()
+
+    @contextmanager
+    def rollback_pass(self):
+        """Keep the rollback file open for one patch pass and always finish it."""
+        self.open_rollback()
+        try:
+            yield
+        finally:
+            self.close_rollback()
+
+    def rollback_fieldnames(self):
+        """Columns of the rollback file (reads only the export's header line)."""
+        with open(self.shopify_categories_file, 'r', encoding='utf-8', newline='') as file:
+            fieldnames = [self.clean_field_name(field) for field in next(csv.reader(file), [])]
+        added_columns = self.field_mapping.missing_targets(fieldnames)
+        return ROLLBACK_KEY_COLUMNS + [column for column in self.field_mapping.target_columns
+                                       if column not in added_columns]
+
+    def close_rollback(self):
+        """Finish the rollback file."""
+        if self.rollback_output:
+            self.rollback_output.close()
+            logger.info(f"Saved rollback for {self.stats['rollback_collections']} collections to {self.rollback_file}")
+        self.rollback_output = None
+        self.rollback_writer = None
+
+    def rollback_row(self, original_rows, rows):
+        """Return the rollback row (original mapped values) of a patched collection, or None if nothing changed."""
+        original = self.find_top_row(original_rows)
+        patched = self.find_top_row(rows)
+        # Columns the mapping appended had no value in the export; a blank would clear the live metafield
+        columns = [column for column in self.field_mapping.target_columns
+                   if column not in patched.schema.added_columns]
+        if all(original.get(column, '') == patched.get(column, '') for column in columns):
+            return None
+        
+        # Unchanged mapped columns keep their value, so restoring them is a no-op
+        rollback_row = {'ID': patched.get('ID', ''), 'Handle': patched.get('Handle', ''), 'Command': 'MERGE'}
+        for column in columns:
+            rollback_row[column] = original.get(column, '')
+        return rollback_row
+
+    def record_rollback(self, original_rows, rows):
+        """Write the original mapped values of a patched collection if any of them changed."""
+        rollback_row = self.rollback_row(original_rows, rows)
+        if rollback_row is None:
+            return
+        self.rollback_writer.writerow(rollback_row)
+        self.stats['rollback_collections'] += 1
+
+    def iter_patched_groups(self, categories):
+        """Patch and yield each collection group, counting collections rather than rows."""
+        self.omitted_groups = []
+        for position, (handle, original_rows) in enumerate(self.iter_collection_groups(categories)):
+            self.stats['collections_loaded'] += 1
+            if self.only_handles is not None and handle not in self.only_handles:
+                self.stats['collections_skipped'] += 1
+                self.omitted_groups.append(position)
                 continue
-                
-            handle = category.get('Handle', '')
-            
-            if handle in self.content_map:
-                content = self.content_map[handle]
-                
-                logger.info(f"Updating handle: '{handle}'")
-                
-                # Update Title (column 3 in CSV, 0-indexed)
-                if content['title']:
-                    category['Title'] = content['title']
-                
-                # Update Body HTML (column 4) with formatted description
-                if content['description']:
-                    body_html = self.create_html_content(
-                        content['title'],
-                        content['subheading'], 
-                        content['description'],
-                        content['content_under_listing']
-                    )
-                    category['Body HTML'] = body_html
-                
-                # Update collection subheading metafield (column 25)
-                if content['subheading']:
-                    category['Metafield: custom.collection_subheading [single_line_text_field]'] = content['subheading']
-                
-                updated_count += 1
+            rows = list(original_rows)
+            if self.patch_collection(handle, rows):
+                self.stats['categories_updated'] += 1
+                # One handle can be exported under several collection IDs
+                if handle not in self.matched_handles:
+                    self.matched_handles.add(handle)
+                    self.stats['handles_matched'] += 1
+                if self.rollback_writer:
+                    self.record_rollback(original_rows, rows)
             else:
-                no_match_count += 1
+                self.stats['no_match_found'] += 1
+                # Blank cells in columns the mapping added would clear existing metafields on a Matrixify MERGE
+                if rows[0].schema.added_columns:
+                    self.stats['collections_omitted'] += 1
+                    self.omitted_groups.append(position)
+                    continue
+            yield rows
+
+    def update_shopify_categories(self):
+        """Update Shopify categories with new PLP content using direct handle mapping."""
+        logger.info("Updating Shopify categories with PLP content...")
+        
+        self.stats['collections_loaded'] = 0
+        self.stats['categories_updated'] = 0
+        self.stats['handles_matched'] = 0
+        self.stats['no_match_found'] = 0
+        self.stats['collections_skipped'] = 0
+        self.stats['collections_omitted'] = 0
+        self.matched_handles = set()
         
-        self.stats['categories_updated'] = updated_count
-        self.stats['no_match_found'] = no_match_count
+        self.updated_categories = []
+        for rows in self.iter_patched_groups(self.shopify_categories):
+            self.updated_categories.extend(rows)
+        
+        logger.info(f"Updated {self.stats['categories_updated']} collections with new content")
+        logger.info(f"No match found for {self.stats['no_match_found']} collections")
+
+    def stream_migration(self):
+        """Read, patch and write the export one collection group at a time (bounded memory)."""
+        logger.info(f"Streaming updated categories to {self.output_file}...")
         
-        logger.info(f"Updated {updated_count} categories with new content")
-        logger.info(f"No match found for {no_match_count} categories")
+        def count_loaded(categories):
+            # Rows of groups left out of the output were still loaded
+            for row in categories:
+                self.stats['shopify_categories_loaded'] += 1
+                yield row
+
+        try:
+            rows_written = 0
+            with open(self.output_file, 'w', newline='', encoding='utf-8') as file:
+                writer = None
+                for rows in self.iter_patched_groups(count_loaded(self.iter_shopify_categories())):
+                    if writer is None:
+                        writer = csv.writer(file)
+                        writer.writerow(rows[0].keys())
+                    writer.writerows(row.as_list() for row in rows)
+                    rows_written += len(rows)
+            
+            logger.info(f"Successfully streamed {rows_written} updated categories")
+            
+        except Exception as e:
+            logger.error(f"Error streaming updated categories: {e}")
+            raise
 
     def save_updated_categories(self):
         """Save the updated Shopify categories to output file."""
@@ -229,9 +434,9 @@ class PLPMigrationScript:
             fieldnames = self.updated_categories[0].keys()
             
             with open(self.output_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.updated_categories)
+                writer = csv.writer(file)
+                writer.writerow(fieldnames)
+                writer.writerows(row.as_list() for row in self.updated_categories)
             
             logger.info(f"Successfully saved {len(self.updated_categories)} updated categories")
             
@@ -245,31 +450,66 @@ class PLPMigrationScript:
         logger.info("MIGRATION STATISTICS")
         logger.info("=" * 50)
         logger.info(f"PLP entries loaded: {self.stats['plp_entries_loaded']}")
-        logger.info(f"Shopify categories loaded: {self.stats['shopify_categories_loaded']}")
-        logger.info(f"Categories updated: {self.stats['categories_updated']}")
-        logger.info(f"No match found: {self.stats['no_match_found']}")
-        if self.stats['plp_entries_loaded'] > 0:
-            match_rate = (self.stats['categories_updated'] / len(self.content_map) * 100)
-            logger.info(f"Match rate: {match_rate:.1f}%")
+        logger.info(f"Shopify categories loaded: {self.stats['shopify_categories_loaded']} rows, "
+                    f"{self.stats['collections_loaded']} collections")
+        logger.info(f"Collections updated: {self.stats['categories_updated']}")
+        logger.info(f"No match found: {self.stats['no_match_found']} collections")
+        if self.only_handles is not None:
+            logger.info(f"Skipped by handle filter: {self.stats['collections_skipped']} collections "
+                        f"({len(self.only_handles)} handles in filter)")
+        if self.stats['collections_omitted']:
+            logger.info(f"Left out of the output: {self.stats['collections_omitted']} unmatched collections "
+                        f"(the field mapping adds columns the export lacks; blank cells would clear them on import)")
+        if self.url_index_file:
+            logger.info(f"Handles resolved via url_rewrite index: {self.stats['handles_from_url_index']}")
+        if self.rollback_file:
+            logger.info(f"Collections in rollback file: {self.stats['rollback_collections']}")
+        logger.info(f"Repeated PLP text fields: {self.stats['plp_text_duplicates']} of {self.stats['plp_text_fields']}")
+        # Body HTML is only rendered on a patch cache miss, so reuse shows up here
+        patch_lookups = self.stats['patch_cache_hits'] + self.stats['patch_cache_misses']
+        if patch_lookups:
+            logger.info(f"Patch cache (mapped values + Body HTML): {self.stats['patch_cache_hits']} hits / "
+                        f"{patch_lookups} patched collections "
+                        f"({self.stats['patch_cache_hits'] / patch_lookups * 100:.1f}% hit rate)")
+        rich_text_stats = self.renderer.pipeline.stats
+        fragment_lookups = rich_text_stats['fragment_cache_hits'] + rich_text_stats['fragment_cache_misses']
+        if fragment_lookups:
+            logger.info(f"Text fragment cache: {rich_text_stats['fragment_cache_hits']} hits / {fragment_lookups} lookups "
+                        f"({rich_text_stats['fragment_cache_hits'] / fragment_lookups * 100:.1f}% hit rate)")
+        if rich_text_stats['markdown_fields'] or rich_text_stats['html_fields']:
+            logger.info(f"Rich text fields: {rich_text_stats['text_fields']} plain, "
+                        f"{rich_text_stats['markdown_fields']} Markdown, {rich_text_stats['html_fields']} HTML")
+        if self.stats['plp_entries_loaded'] > 0 and self.only_handles is None:
+            # Distinct handles, so a handle exported under several IDs is counted once
+            match_rate = (self.stats['handles_matched'] / len(self.content_map) * 100)
+            logger.info(f"Match rate: {match_rate:.1f}% ({self.stats['handles_matched']} of {len(self.content_map)} PLP handles)")
         logger.info("=" * 50)
 
-    def run(self):
+    def run(self, stream=False):
         """Run the complete migration process."""
         logger.info("Starting PLP content migration from Magento to Shopify...")
         
         try:
             # Load data
             self.load_plp_content()
-            self.load_shopify_categories()
             
-            # Process and update
-            self.update_shopify_categories()
+            # The rollback file is filled during the patch pass; the export is not read again
+            with self.rollback_pass():
+                if stream:
+                    # Patch and write group by group without holding the export in memory
+                    self.stream_migration()
+                else:
+                    self.load_shopify_categories()
+                    
+                    # Process and update
+                    self.update_shopify_categories()
             
             # Print statistics
             self.print_statistics()
             
-            # Save results
-            self.save_updated_categories()
+            if not stream:
+                # Save results
+                self.save_updated_categories()
             
             logger.info("Migration completed successfully!")
             
@@ -277,12 +517,21 @@ class PLPMigrationScript:
             logger.error(f"Migration failed: {e}")
             raise
 
+def read_handles_file(filename):
+    """Read a handle filter file (one handle per line, as written by plp_diff.py)."""
+    with open(filename, 'r', encoding='utf-8') as file:
+        return {line.strip() for line in file if line.strip() and not line.startswith('#')}
+
 def main():
     """Main function to run the migration script."""
     # File paths
     plp_content_file = 'new-plp-content.csv'
     shopify_categories_file = 'shopify-categories-export.csv'
     output_file = 'shopify-categories-updated.csv'
+    rollback_file = 'shopify-categories-rollback.csv'
+    url_index_file = 'url-rewrite-index.sqlite'
+    layouts_file = 'body-html-layouts.json'
+    field_mapping_files = ['field-mapping.json', 'field-mapping.yaml', 'field-mapping.yml']
     
     # Check if input files exist
     import os
@@ -294,9 +543,49 @@ def main():
         logger.error(f"Shopify categories file not found: {shopify_categories_file}")
         sys.exit(1)
     
+    # Use the url_rewrite index when one has been built (see url_rewrite_index.py)
+    if not os.path.exists(url_index_file):
+        url_index_file = None
+    
+    # Use custom Body HTML layouts when configured (see html_templates.py)
+    if not os.path.exists(layouts_file):
+        layouts_file = None
+    
+    # Use a custom field mapping when configured (see field_mapping.py)
+    field_mapping_file = next((name for name in field_mapping_files if os.path.exists(name)), None)
+    
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Migrate Magento PLP content into a Matrixify collections export')
+    parser.add_argument('--stream', action='store_true', help='Patch and write the export group by group with bounded memory')
+    parser.add_argument('--watch', action='store_true', help='Keep running and re-migrate changed PLP rows on every save')
+    parser.add_argument('--rollback', default=rollback_file, help='Rollback CSV restoring the original values of changed collections')
+    parser.add_argument('--no-rollback', action='store_true', help='Do not write a rollback file')
+    parser.add_argument('--only-handles', help='Only migrate the collections listed in this file (see plp_diff.py)')
+    parser.add_argument('--estimate', action='store_true', help='Estimate runtime, memory and collection match rate from a sample; writes nothing')
+    parser.add_argument('--sample-size', type=int, default=2000, help='Collections and PLP rows sampled by --estimate')
+    
+    args = parser.parse_args()
+    
+    only_handles = None
+    if args.only_handles:
+        if not os.path.exists(args.only_handles):
+            logger.error(f"Handle filter file not found: {args.only_handles}")
+            sys.exit(1)
+        only_handles = read_handles_file(args.only_handles)
+    
     # Run migration
-    migration = PLPMigrationScript(plp_content_file, shopify_categories_file, output_file)
-    migration.run()
+    migration = PLPMigrationScript(plp_content_file, shopify_categories_file, output_file, url_index_file,
+                                   layouts_file, field_mapping_file, None if args.no_rollback else args.rollback,
+                                   only_handles)
+    if args.estimate:
+        from estimate_mode import MigrationEstimator
+        MigrationEstimator(migration, sample_size=args.sample_size).run()
+    elif args.watch:
+        from watch_mode import MigrationWatcher
+        MigrationWatcher(migration).run()
+    else:
+        migration.run(stream=args.stream)
 
 if __name__ == "__main__":
     main()
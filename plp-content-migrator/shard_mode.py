@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Hash-Sharded PLP Content Migration
+
+Splits a Matrixify collections export into N shard files by a stable hash of
+the collection Handle (multi-row collection groups always stay together),
+migrates every shard independently, and merges the shard outputs back into
+one file in the original row order. The merged output is identical to a
+normal script.py run.
+
+On one machine, worker processes stand in for hosts:
+
+    python3 shard_mode.py run --shards 8 --workers 4
+
+Across several hosts, split once, migrate each shard where it is copied to
+(every host needs new-plp-content.csv and builds the full content map), then
+copy the results back and merge:
+
+    python3 shard_mode.py split --shards 8
+    python3 shard_mode.py work --shard 3          # on host 3
+    python3 shard_mode.py merge
+
+The shard directory (default shards/) holds:
+
+- manifest.json: export file, shard count, group and row counts
+- groups.csv: the shard and row count of every collection group, in export order
+- shard-NNN.csv: the shard's part of the export
+- shard-NNN-updated.csv, shard-NNN-stats.json (and shard-NNN-rollback.csv): worker results;
+  the stats file lists the shard's collection groups that were left out of
+  its output (unmatched groups when the field mapping appends columns)
+
+The reducer only reads groups.csv and the shard outputs as streams, so it
+never holds the export in memory.
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import zlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from script import PLPMigrationScript
+from multi_store import PLP_LOAD_STATS, init_worker, run_store_migration, worker_state
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+GROUPS_FILE = 'groups.csv'
+
+# Summed over shards (a handle always lands in one shard, so matched handles add up too)
+ADDITIVE_STATS = [
+    'shopify_categories_loaded', 'collections_loaded', 'categories_updated', 'handles_matched', 'no_match_found',
+    'collections_skipped', 'collections_omitted', 'patch_cache_hits', 'patch_cache_misses', 'rollback_collections'
+]
+
+
+def shard_for_handle(handle, shard_count):
+    """Shard number of a handle; crc32 is the same on every host and Python version (unlike hash())."""
+    return zlib.crc32(handle.encode('utf-8')) % shard_count
+
+
+def shard_file(work_dir, shard, suffix=''):
+    """Path of one shard's file in the shard directory."""
+    return os.path.join(work_dir, f"shard-{shard:03d}{suffix}")
+
+
+def save_shard_stats(work_dir, shard, stats, plp_handles, seconds, omitted_groups):
+    """Write a worker's statistics and the groups missing from its output next to the output, for the reducer."""
+    with open(shard_file(work_dir, shard, '-stats.json'), 'w', encoding='utf-8') as file:
+        json.dump({'shard': shard, 'stats': stats, 'plp_handles': plp_handles, 'seconds': seconds,
+                   'omitted_groups': omitted_groups}, file, indent=2)
+
+
+def migrate_local_shard(work_dir, shard, rollback):
+    """Migrate one shard with the shared PLP content (runs in a worker process)."""
+    store = {
+        'export': shard_file(work_dir, shard, '.csv'),
+        'output': shard_file(work_dir, shard, '-updated.csv'),
+        'rollback': shard_file(work_dir, shard, '-rollback.csv') if rollback else None
+    }
+    migration, seconds = run_store_migration(store)
+    save_shard_stats(work_dir, shard, migration.stats, len(worker_state['content_map']), seconds,
+                     migration.omitted_groups)
+    return migration.stats, seconds
+
+
+def migrate_host_shard(plp_content_file, work_dir, shard, rollback=True, url_index_file=None,
+                       layouts_file=None, field_mapping_file=None):
+    """Migrate one shard on this host, loading the full PLP content here."""
+    started = time.perf_counter()
+    migration = PLPMigrationScript(
+        plp_content_file,
+        shard_file(work_dir, shard, '.csv'),
+        shard_file(work_dir, shard, '-updated.csv'),
+        url_index_file,
+        layouts_file,
+        field_mapping_file,
+        shard_file(work_dir, shard, '-rollback.csv') if rollback else None
+    )
+    migration.run(stream=True)
+    save_shard_stats(work_dir, shard, migration.stats, len(migration.content_map), time.perf_counter() - started,
+                     migration.omitted_groups)
+    return migration.stats
+
+
+class ShardedMigration:
+    def __init__(self, plp_content_file, shopify_categories_file, output_file, shard_count=4, work_dir='shards',
+                 max_workers=None, url_index_file=None, layouts_file=None, field_mapping_file=None,
+                 rollback_file=None):
+        self.plp_content_file = plp_content_file
+        self.shopify_categories_file = shopify_categories_file
+        self.output_file = output_file
+        self.shard_count = shard_count
+        self.work_dir = work_dir
+        self.max_workers = max_workers or min(shard_count, os.cpu_count() or 1)
+        self.url_index_file = url_index_file
+        self.layouts_file = layouts_file
+        self.field_mapping_file = field_mapping_file
+        self.rollback_file = rollback_file
+
+        self.content_map = {}
+        self.plp_stats = {}
+        self.shard_results = []  # (shard, stats, plp handles, seconds), in shard order
+        self.omitted_groups = {}  # shard -> positions of its groups that are not in its output
+        self.stats = {}  # merged statistics
+
+    def load_manifest(self):
+        """Read the manifest written by split(); the shard count comes from it."""
+        with open(os.path.join(self.work_dir, MANIFEST_FILE), 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        self.shard_count = manifest['shards']
+        return manifest
+
+    def split(self):
+        """Partition the export into shard files by Handle hash, recording every group's shard in order."""
+        logger.info(f"Splitting {self.shopify_categories_file} into {self.shard_count} shards in {self.work_dir}/...")
+        os.makedirs(self.work_dir, exist_ok=True)
+        migration = PLPMigrationScript(None, self.shopify_categories_file, None)
+
+        shard_files = []
+        try:
+            # newline='' keeps quoted line breaks as they are; workers read the shards like the original export
+            with open(self.shopify_categories_file, 'r', encoding='utf-8', newline='') as file, \
+                    open(os.path.join(self.work_dir, GROUPS_FILE), 'w', newline='', encoding='utf-8') as groups_file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+                fieldnames = [migration.clean_field_name(field) for field in header]
+                # Duplicate columns keep their last value, as in the migration
+                id_column = len(fieldnames) - 1 - fieldnames[::-1].index('ID') if 'ID' in fieldnames else None
+                handle_column = len(fieldnames) - 1 - fieldnames[::-1].index('Handle') if 'Handle' in fieldnames else None
+
+                shard_files = [open(shard_file(self.work_dir, shard, '.csv'), 'w', newline='', encoding='utf-8')
+                               for shard in range(self.shard_count)]
+                writers = [csv.writer(shard_output) for shard_output in shard_files]
+                for writer in writers:
+                    writer.writerow(header)
+                groups_writer = csv.writer(groups_file)
+                groups_writer.writerow(['Shard', 'Rows'])
+
+                def cell(values, column):
+                    return values[column].strip() if column is not None and column < len(values) else ''
+
+                last_keys = [None] * self.shard_count
+                key = None
+                shard = None
+                group_rows = 0
+                groups = 0
+                rows = 0
+                for values in reader:
+                    # Blank lines are skipped, as in the migration
+                    if not values:
+                        continue
+                    row_key = (cell(values, id_column), cell(values, handle_column))
+                    if row_key != key:
+                        if group_rows:
+                            groups_writer.writerow([shard, group_rows])
+                            last_keys[shard] = key
+                        key = row_key
+                        shard = shard_for_handle(key[1], self.shard_count)
+                        # A shard would merge the two separate groups into one collection
+                        if last_keys[shard] == key:
+                            raise ValueError(f"Collection {key[0]} ('{key[1]}') appears in two separate places in the "
+                                             f"export; sharding would merge them")
+                        groups += 1
+                        group_rows = 0
+                    writers[shard].writerow(values)
+                    group_rows += 1
+                    rows += 1
+                if group_rows:
+                    groups_writer.writerow([shard, group_rows])
+        except Exception as e:
+            logger.error(f"Error splitting export: {e}")
+            raise
+        finally:
+            for shard_output in shard_files:
+                shard_output.close()
+
+        manifest = {'export': self.shopify_categories_file, 'shards': self.shard_count, 'groups': groups, 'rows': rows}
+        with open(os.path.join(self.work_dir, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        logger.info(f"Split {rows} rows ({groups} collections) into {self.shard_count} shards")
+        return manifest
+
+    def load_plp_content(self):
+        """Parse and index the PLP content once for all local workers."""
+        migration = PLPMigrationScript(self.plp_content_file, None, None, self.url_index_file,
+                                       self.layouts_file, self.field_mapping_file)
+        migration_logger = logging.getLogger(PLPMigrationScript.__module__)
+        level = migration_logger.level
+        migration_logger.setLevel(logging.WARNING)
+        try:
+            migration.load_plp_content()
+        finally:
+            migration_logger.setLevel(level)
+        self.content_map = migration.content_map
+        self.plp_stats = {key: migration.stats[key] for key in PLP_LOAD_STATS}
+        logger.info(f"Indexed {len(self.content_map)} PLP handles once for {self.shard_count} shards")
+
+    def migrate_shards(self):
+        """Migrate every shard in a local process pool, each process standing in for a host."""
+        logger.info(f"Migrating {self.shard_count} shards with {self.max_workers} worker processes...")
+
+        initargs = (self.content_map, self.plp_stats, self.plp_content_file,
+                    self.layouts_file, self.field_mapping_file)
+        failed = []
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker, initargs=initargs) as pool:
+            futures = {pool.submit(migrate_local_shard, self.work_dir, shard, bool(self.rollback_file)): shard
+                       for shard in range(self.shard_count)}
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    stats, seconds = future.result()
+                    logger.info(f"✅ shard {shard}: {stats['categories_updated']} collections updated in {seconds:.1f}s")
+                except Exception as e:
+                    logger.error(f"❌ shard {shard}: migration failed: {e}")
+                    failed.append(shard)
+        if failed:
+            raise RuntimeError(f"{len(failed)} shard(s) failed: {', '.join(map(str, sorted(failed)))}")
+
+    def load_shard_results(self):
+        """Read every shard's statistics; all shards must be done, with the same PLP content."""
+        self.shard_results = []
+        self.omitted_groups = {}
+        missing = []
+        for shard in range(self.shard_count):
+            path = shard_file(self.work_dir, shard, '-stats.json')
+            if not os.path.exists(path) or not os.path.exists(shard_file(self.work_dir, shard, '-updated.csv')):
+                missing.append(shard)
+                continue
+            with open(path, 'r', encoding='utf-8') as file:
+                result = json.load(file)
+            self.shard_results.append((shard, result['stats'], result['plp_handles'], result['seconds']))
+            self.omitted_groups[shard] = set(result.get('omitted_groups', []))
+        if missing:
+            raise FileNotFoundError(f"No results yet for shard(s) {', '.join(map(str, missing))}")
+
+        first = self.shard_results[0] if self.shard_results else None
+        for shard, stats, plp_handles, _ in self.shard_results[1:]:
+            # PLP load statistics come from the same file, so every shard must report the same values
+            if plp_handles != first[2] or any(stats.get(key) != first[1].get(key) for key in PLP_LOAD_STATS):
+                raise ValueError(f"Shard {shard} was migrated with different PLP content than shard {first[0]}")
+
+    def merge_stats(self):
+        """Sum the per-shard statistics into one set, as a single run would report them."""
+        self.stats = {key: sum(stats.get(key, 0) for _, stats, _, _ in self.shard_results) for key in ADDITIVE_STATS}
+        if self.shard_results:
+            _, stats, plp_handles, _ = self.shard_results[0]
+            self.stats.update({key: stats.get(key, 0) for key in PLP_LOAD_STATS})
+            self.stats['plp_handles'] = plp_handles
+        return self.stats
+
+    def merge_outputs(self):
+        """Interleave the shard outputs back into export order, group by group."""
+        logger.info(f"Merging {self.shard_count} shard outputs into {self.output_file}...")
+
+        shard_outputs = []
+        try:
+            shard_outputs = [open(shard_file(self.work_dir, shard, '-updated.csv'), 'r', newline='', encoding='utf-8')
+                             for shard in range(self.shard_count)]
+            readers = [csv.reader(shard_output) for shard_output in shard_outputs]
+            # A shard without collections has an empty output
+            headers = [next(reader, None) for reader in readers]
+            header = next((header for header in headers if header is not None), None)
+            if any(other is not None and other != header for other in headers):
+                raise ValueError("Shard outputs have different columns")
+
+            with open(self.output_file, 'w', newline='', encoding='utf-8') as file, \
+                    open(os.path.join(self.work_dir, GROUPS_FILE), 'r', newline='', encoding='utf-8') as groups_file:
+                writer = csv.writer(file)
+                if header is not None:
+                    writer.writerow(header)
+                groups = csv.reader(groups_file)
+                next(groups, None)
+                positions = [0] * self.shard_count  # next group position within each shard
+                rows_written = 0
+                for shard, rows in groups:
+                    shard = int(shard)
+                    position = positions[shard]
+                    positions[shard] += 1
+                    # The worker left this group out (e.g. unmatched, with columns added by the field mapping)
+                    if position in self.omitted_groups.get(shard, ()):
+                        continue
+                    reader = readers[shard]
+                    for _ in range(int(rows)):
+                        row = next(reader, None)
+                        if row is None:
+                            raise ValueError(f"Shard {shard} output ended early; was it migrated from this split?")
+                        writer.writerow(row)
+                        rows_written += 1
+
+            leftover = [shard for shard, reader in enumerate(readers) if next(reader, None) is not None]
+            if leftover:
+                raise ValueError(f"Shard(s) {', '.join(map(str, leftover))} have more rows than the split recorded")
+
+            logger.info(f"Successfully merged {rows_written} updated categories")
+
+        except Exception as e:
+            logger.error(f"Error merging shard outputs: {e}")
+            raise
+        finally:
+            for shard_output in shard_outputs:
+                shard_output.close()
+
+    def merge_rollback(self):
+        """Concatenate the shard rollback files (rows are MERGE commands by ID, so order doesn't matter)."""
+        if not self.rollback_file:
+            return
+        header = None
+        with open(self.rollback_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            for shard in range(self.shard_count):
+                path = shard_file(self.work_dir, shard, '-rollback.csv')
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'r', newline='', encoding='utf-8') as shard_rollback:
+                    reader = csv.reader(shard_rollback)
+                    shard_header = next(reader, None)
+                    if header is None and shard_header is not None:
+                        header = shard_header
+                        writer.writerow(header)
+                    writer.writerows(reader)
+        logger.info(f"Saved rollback for {self.stats.get('rollback_collections', 0)} collections to {self.rollback_file}")
+
+    def merge(self):
+        """Reduce the shard results into the output file, rollback file and merged statistics."""
+        try:
+            self.load_manifest()
+            self.load_shard_results()
+            self.merge_stats()
+            self.merge_outputs()
+            self.merge_rollback()
+            return self.stats
+
+        except Exception as e:
+            logger.error(f"Merge failed: {e}")
+            raise
+
+    def print_summary(self, total_seconds=None):
+        """Print the merged statistics and the per-shard timings."""
+        print("=" * 80)
+        print("SHARDED MIGRATION SUMMARY")
+        print("=" * 80)
+        print(f"Shards: {self.shard_count}")
+        print(f"PLP entries loaded: {self.stats.get('plp_entries_loaded', 0):,}")
+        print(f"Shopify categories loaded: {self.stats.get('shopify_categories_loaded', 0):,} rows, "
+              f"{self.stats.get('collections_loaded', 0):,} collections")
+        print(f"Collections updated: {self.stats.get('categories_updated', 0):,}")
+        print(f"No match found: {self.stats.get('no_match_found', 0):,} collections")
+        if self.stats.get('plp_handles'):
+            print(f"Match rate: {self.stats['handles_matched'] / self.stats['plp_handles'] * 100:.1f}%")
+        print()
+        for shard, stats, _, seconds in self.shard_results:
+            print(f"• shard {shard}: {stats['shopify_categories_loaded']:,} rows, "
+                  f"{stats['categories_updated']:,} of {stats['collections_loaded']:,} collections updated, {seconds:.1f}s")
+        print()
+        slowest = max((seconds for _, _, _, seconds in self.shard_results), default=0.0)
+        timing = f"Total wall time: {total_seconds:.1f}s, " if total_seconds is not None else ""
+        print(f"{timing}slowest shard {slowest:.1f}s, "
+              f"sum of shards {sum(seconds for _, _, _, seconds in self.shard_results):.1f}s")
+        print(f"Output: {self.output_file}")
+        print("=" * 80)
+
+    def run(self):
+        """Split, migrate every shard locally and merge."""
+        logger.info("Starting sharded PLP content migration...")
+        started = time.perf_counter()
+
+        try:
+            self.split()
+            self.load_plp_content()
+            self.migrate_shards()
+            self.merge()
+            self.print_summary(time.perf_counter() - started)
+            logger.info("Sharded migration completed successfully!")
+            return self.stats
+
+        except Exception as e:
+            logger.error(f"Sharded migration failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the sharded migration."""
+    # File paths
+    plp_content_file = 'new-plp-content.csv'
+    shopify_categories_file = 'shopify-categories-export.csv'
+    output_file = 'shopify-categories-updated.csv'
+    rollback_file = 'shopify-categories-rollback.csv'
+    work_dir = 'shards'
+    url_index_file = 'url-rewrite-index.sqlite'
+    layouts_file = 'body-html-layouts.json'
+    field_mapping_files = ['field-mapping.json', 'field-mapping.yaml', 'field-mapping.yml']
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Split the export into hash shards, migrate them separately and merge')
+    parser.add_argument('--dir', default=work_dir, help='Shard directory')
+    parser.add_argument('--no-rollback', action='store_true', help='Do not write rollback files')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Split, migrate every shard in local worker processes, and merge')
+    run.add_argument('--shards', type=int, default=4, help='Number of shards')
+    run.add_argument('--workers', type=int, help='Worker processes (default: one per shard, up to CPU count)')
+    split = commands.add_parser('split', help='Split the export into shard files')
+    split.add_argument('--shards', type=int, default=4, help='Number of shards')
+    work = commands.add_parser('work', help='Migrate one shard on this host')
+    work.add_argument('--shard', type=int, required=True, help='Shard number')
+    commands.add_parser('merge', help='Merge the shard outputs and statistics')
+
+    args = parser.parse_args()
+
+    if getattr(args, 'shards', 1) < 1:
+        logger.error("--shards must be at least 1")
+        sys.exit(1)
+
+    required = {'run': [plp_content_file, shopify_categories_file], 'split': [shopify_categories_file],
+                'work': [plp_content_file, shard_file(args.dir, getattr(args, 'shard', 0), '.csv')],
+                'merge': [os.path.join(args.dir, MANIFEST_FILE)]}[args.command]
+    missing_files = [path for path in required if not os.path.exists(path)]
+    if missing_files:
+        logger.error(f"Missing files: {', '.join(missing_files)}")
+        sys.exit(1)
+
+    url_index_file = url_index_file if os.path.exists(url_index_file) else None
+    layouts_file = layouts_file if os.path.exists(layouts_file) else None
+    field_mapping_file = next((name for name in field_mapping_files if os.path.exists(name)), None)
+    rollback_file = None if args.no_rollback else rollback_file
+
+    if args.command == 'work':
+        migrate_host_shard(plp_content_file, args.dir, args.shard, not args.no_rollback, url_index_file,
+                           layouts_file, field_mapping_file)
+        return
+
+    migration = ShardedMigration(
+        plp_content_file,
+        shopify_categories_file,
+        output_file,
+        shard_count=getattr(args, 'shards', 1),
+        work_dir=args.dir,
+        max_workers=getattr(args, 'workers', None),
+        url_index_file=url_index_file,
+        layouts_file=layouts_file,
+        field_mapping_file=field_mapping_file,
+        rollback_file=rollback_file
+    )
+    try:
+        if args.command == 'run':
+            migration.run()
+        elif args.command == 'split':
+            migration.split()
+        else:
+            migration.merge()
+            migration.print_summary()
+    except Exception:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,143 @@
 Show Collections URLs Script
 
 This script reads the migration results and displays the Shopify collection URLs
-for all migrated collections.
+for all migrated collections. With --sitemap, --url-list or --jsonl it instead
+streams the URL inventory straight from the CSV reader into those files in one
+pass, so very large catalogs never have to be held in memory.
 """
 
+import os
 import csv
 import sys
+import json
+import hashlib
 import logging
+from xml.sax.saxutils import escape
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Sitemap protocol limit per file; larger inventories get a sitemap index
+SITEMAP_MAX_URLS = 50000
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class HandleSet:
+    """Compact seen-set that stores a 64-bit digest of each handle instead of the string."""
+
+    def __init__(self):
+        self.digests = set()
+
+    def add(self, handle):
+        """Add a handle; return False if it was already seen."""
+        digest = int.from_bytes(hashlib.blake2b(handle.encode('utf-8'), digest_size=8).digest(), 'little')
+        if digest in self.digests:
+            return False
+        self.digests.add(digest)
+        return True
+
+    def __len__(self):
+        return len(self.digests)
+
+
+class URLListWriter:
+    """Plain text file with one URL per line (crawler / load-test input)."""
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.file = open(output_file, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, collection):
+        self.file.write(collection['url'] + '\n')
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Wrote {self.count} URLs to {self.output_file}")
+
+
+class JSONLinesWriter:
+    """JSON-lines file with one {handle, title, url} object per line."""
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.file = open(output_file, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, collection):
+        self.file.write(json.dumps(collection, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        logger.info(f"Wrote {self.count} records to {self.output_file}")
+
+
+class SitemapWriter:
+    """Streaming sitemap.xml writer that rolls over to a sitemap index past 50,000 URLs.
+
+    URLs are written to numbered part files (sitemap-1.xml, sitemap-2.xml, ...) as
+    they arrive. If everything fits in one part it is renamed to the requested file;
+    otherwise the requested file becomes a sitemap index pointing at the parts.
+    """
+
+    def __init__(self, output_file, base_url, max_urls=SITEMAP_MAX_URLS):
+        self.output_file = output_file
+        self.base_url = base_url
+        self.max_urls = max_urls
+        root, extension = os.path.splitext(output_file)
+        self.part_pattern = f"{root}-{{}}{extension or '.xml'}"
+        self.parts = []
+        self.file = None
+        self.part_count = 0
+        self.count = 0
+
+    def open_part(self):
+        """Start the next numbered part file."""
+        part_file = self.part_pattern.format(len(self.parts) + 1)
+        self.parts.append(part_file)
+        self.file = open(part_file, 'w', encoding='utf-8')
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.file.write(f'<urlset xmlns="{SITEMAP_NAMESPACE}">\n')
+        self.part_count = 0
+
+    def close_part(self):
+        """Finish the current part file."""
+        self.file.write('</urlset>\n')
+        self.file.close()
+        self.file = None
+
+    def write(self, collection):
+        if self.file is None:
+            self.open_part()
+        elif self.part_count >= self.max_urls:
+            self.close_part()
+            self.open_part()
+        self.file.write(f"  <url><loc>{escape(collection['url'])}</loc></url>\n")
+        self.part_count += 1
+        self.count += 1
+
+    def close(self):
+        if self.file is None:
+            self.open_part()
+        self.close_part()
+
+        if len(self.parts) == 1:
+            os.replace(self.parts[0], self.output_file)
+            logger.info(f"Wrote sitemap with {self.count} URLs to {self.output_file}")
+            return
+
+        with open(self.output_file, 'w', encoding='utf-8') as file:
+            file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            file.write(f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n')
+            for part_file in self.parts:
+                file.write(f"  <sitemap><loc>{escape(self.base_url + '/' + os.path.basename(part_file))}</loc></sitemap>\n")
+            file.write('</sitemapindex>\n')
+        logger.info(f"Wrote sitemap index {self.output_file} for {self.count} URLs in {len(self.parts)} parts")
+
+
 class CollectionsURLGenerator:
     def __init__(self, csv_file, base_url):
         self.csv_file = csv_file
@@ -28,50 +154,58 @@ class CollectionsURLGenerator:
         cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
         return cleaned
     
-    def load_collections(self):
-        """Load collection handles from the CSV file."""
+    def iter_collections(self, unique_only=True):
+        """Stream {handle, title, url} records from the CSV file, one per row or per unique handle."""
+        with open(self.csv_file, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+
+            # Clean up field names once instead of per row
+            fieldnames = [self.clean_field_name(field) for field in header]
+            logger.info(f"CSV field names: {fieldnames[:5]}...")
+            handle_index = fieldnames.index('Handle') if 'Handle' in fieldnames else None
+            title_index = fieldnames.index('Title') if 'Title' in fieldnames else None
+            if handle_index is None:
+                raise ValueError(f"No 'Handle' column in {self.csv_file}")
+
+            seen_handles = HandleSet()
+            for row in reader:
+                handle = row[handle_index].strip() if handle_index < len(row) else ''
+                if not handle or handle == 'Handle':  # Skip header row
+                    continue
+                if unique_only and not seen_handles.add(handle):
+                    continue
+                title = row[title_index].strip() if title_index is not None and title_index < len(row) else ''
+                yield {
+                    'handle': handle,
+                    'title': title,
+                    'url': f"{self.base_url}/collections/{handle}"
+                }
+
+    def load_collections(self, rows=None):
+        """Load collection handles from the CSV file (or from already cleaned rows)."""
         logger.info(f"Loading collections from {self.csv_file}...")
         
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                # Clean up field names
-                fieldnames = [self.clean_field_name(field) for field in reader.fieldnames]
-                logger.info(f"CSV field names: {fieldnames[:5]}...")
-                
-                collections = []
-                seen_handles = set()
-                
-                for row in reader:
-                    # Clean up the row data
-                    cleaned_row = {}
-                    for key, value in row.items():
-                        clean_key = self.clean_field_name(key)
-                        cleaned_row[clean_key] = value.strip() if value else ""
-                    
-                    handle = cleaned_row.get('Handle', '')
-                    title = cleaned_row.get('Title', '')
-                    
-                    if handle and handle != 'Handle':  # Skip header row
-                        collections.append({
-                            'handle': handle,
-                            'title': title,
-                            'url': f"{self.base_url}/collections/{handle}"
-                        })
-                        
-                        # Track unique handles
-                        if handle not in seen_handles:
-                            seen_handles.add(handle)
-                            self.unique_collections.append({
-                                'handle': handle,
-                                'title': title,
-                                'url': f"{self.base_url}/collections/{handle}"
-                            })
-                
-                self.collections = collections
-                logger.info(f"Loaded {len(self.collections)} total entries")
-                logger.info(f"Found {len(self.unique_collections)} unique collections")
+            if rows is None:
+                self.collections = list(self.iter_collections(unique_only=False))
+            else:
+                self.collections = [
+                    {'handle': row['Handle'], 'title': row.get('Title', ''),
+                     'url': f"{self.base_url}/collections/{row['Handle']}"}
+                    for row in rows if row.get('Handle') and row['Handle'] != 'Handle'
+                ]
+
+            # Track unique handles
+            seen_handles = set()
+            self.unique_collections = []
+            for collection in self.collections:
+                if collection['handle'] not in seen_handles:
+                    seen_handles.add(collection['handle'])
+                    self.unique_collections.append(collection)
+
+            logger.info(f"Loaded {len(self.collections)} total entries")
+            logger.info(f"Found {len(self.unique_collections)} unique collections")
                 
         except Exception as e:
             logger.error(f"Error loading collections: {e}")
@@ -144,13 +278,40 @@ class CollectionsURLGenerator:
         print()
         print("=" * 80)
     
-    def run(self, limit=None, save_to_file=None, show_samples=False, unique_only=True):
+    def stream_exports(self, sitemap_file=None, url_list_file=None, jsonl_file=None, unique_only=True):
+        """Stream the URL inventory into sitemap / URL list / JSON-lines files in a single pass."""
+        writers = []
+        if sitemap_file:
+            writers.append(SitemapWriter(sitemap_file, self.base_url))
+        if url_list_file:
+            writers.append(URLListWriter(url_list_file))
+        if jsonl_file:
+            writers.append(JSONLinesWriter(jsonl_file))
+
+        logger.info(f"Streaming collection URLs from {self.csv_file}...")
+        count = 0
+        try:
+            for collection in self.iter_collections(unique_only):
+                for writer in writers:
+                    writer.write(collection)
+                count += 1
+        except Exception as e:
+            logger.error(f"Error streaming URLs: {e}")
+            raise
+        finally:
+            for writer in writers:
+                writer.close()
+
+        logger.info(f"Streamed {count} {'unique collection' if unique_only else 'entry'} URLs")
+        return count
+
+    def run(self, limit=None, save_to_file=None, show_samples=False, unique_only=True, rows=None):
         """Run the complete URL generation process."""
         logger.info("Starting collections URL generation...")
         
         try:
             # Load collections
-            self.load_collections()
+            self.load_collections(rows)
             
             # Print URLs
             self.print_collections_urls(limit, unique_only)
@@ -175,12 +336,7 @@ def main():
     csv_file = 'shopify-categories-updated.csv'
     base_url = 'https://zj2y7h-80.myshopify.com'
     output_file = 'collections_urls.txt'
-    
-    # Check if input file exists
-    import os
-    if not os.path.exists(csv_file):
-        logger.error(f"CSV file not found: {csv_file}")
-        sys.exit(1)
+    sitemap_file = 'sitemap.xml'
     
     # Parse command line arguments
     import argparse
@@ -191,10 +347,30 @@ def main():
     parser.add_argument('--output', default=output_file, help='Output file name')
     parser.add_argument('--all', action='store_true', help='Show all entries (including duplicates)')
     
+    parser.add_argument('--base-url', default=base_url, help='Store base URL (e.g. https://your-store.myshopify.com)')
+    parser.add_argument('--input', default=csv_file, help='Migration results or Shopify export CSV')
+    parser.add_argument('--sitemap', nargs='?', const=sitemap_file, help=f'Stream a sitemap (default: {sitemap_file})')
+    parser.add_argument('--url-list', help='Stream a plain list of URLs, one per line')
+    parser.add_argument('--jsonl', help='Stream JSON-lines records (handle, title, url)')
+    
     args = parser.parse_args()
     
+    # Check if input file exists
+    if not os.path.exists(args.input):
+        logger.error(f"CSV file not found: {args.input}")
+        sys.exit(1)
+    
+    generator = CollectionsURLGenerator(args.input, args.base_url)
+
+    # Streaming exports skip the in-memory listing entirely
+    if args.sitemap or args.url_list or args.jsonl:
+        try:
+            generator.stream_exports(args.sitemap, args.url_list, args.jsonl, unique_only=not args.all)
+        except Exception:
+            sys.exit(1)
+        return
+
     # Run URL generation
-    generator = CollectionsURLGenerator(csv_file, base_url)
     generator.run(
         limit=args.limit,
         save_to_file=args.output if args.save else None,
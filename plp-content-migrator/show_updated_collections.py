@@ -10,6 +10,8 @@ import csv
 import sys
 import logging
 
+from validate_results import keep_top_row
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -44,8 +46,9 @@ class UpdatedCollectionsURLGenerator:
                         cleaned_row[clean_key] = value.strip() if value else ""
                     
                     handle = cleaned_row.get('Handle', '')
+                    # Keep the top-level row of multi-row Matrixify collections
                     if handle and handle != 'Handle':
-                        data[handle] = cleaned_row
+                        keep_top_row(data, handle, cleaned_row)
                 
                 logger.info(f"Loaded {len(data)} entries from {filename}")
                 return data
@@ -54,12 +57,13 @@ class UpdatedCollectionsURLGenerator:
             logger.error(f"Error loading {filename}: {e}")
             return {}
     
-    def find_updated_collections(self):
-        """Find collections that were actually updated."""
-        logger.info("Loading original and updated CSV files...")
-        
-        original_data = self.load_csv_data(self.original_csv)
-        updated_data = self.load_csv_data(self.updated_csv)
+    def find_updated_collections(self, original_data=None, updated_data=None):
+        """Find collections that were actually updated (optionally from already loaded handle -> row data)."""
+        if original_data is None or updated_data is None:
+            logger.info("Loading original and updated CSV files...")
+            
+            original_data = self.load_csv_data(self.original_csv)
+            updated_data = self.load_csv_data(self.updated_csv)
         
         logger.info("Comparing collections to find updates...")
         
@@ -172,13 +176,13 @@ class UpdatedCollectionsURLGenerator:
         print()
         print("=" * 80)
     
-    def run(self, limit=None, save_to_file=None, show_samples=False):
+    def run(self, limit=None, save_to_file=None, show_samples=False, original_data=None, updated_data=None):
         """Run the complete updated collections URL generation process."""
         logger.info("Starting updated collections URL generation...")
         
         try:
             # Find updated collections
-            self.find_updated_collections()
+            self.find_updated_collections(original_data, updated_data)
             
             # Print updated collections
             self.print_updated_collections(limit)
@@ -224,10 +228,12 @@ def main():
     parser.add_argument('--samples', action='store_true', help='Show sample URLs for testing')
     parser.add_argument('--output', default=output_file, help='Output file name')
     
+    parser.add_argument('--base-url', default=base_url, help='Store base URL (e.g. https://your-store.myshopify.com)')
+    
     args = parser.parse_args()
     
     # Run updated collections URL generation
-    generator = UpdatedCollectionsURLGenerator(original_csv, updated_csv, base_url)
+    generator = UpdatedCollectionsURLGenerator(original_csv, updated_csv, args.base_url)
     generator.run(
         limit=args.limit,
         save_to_file=args.output if args.save else None,
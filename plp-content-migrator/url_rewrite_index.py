@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Magento URL Rewrite Index Builder
+
+This script streams a Magento `url_rewrite` table dump (mysqldump SQL or CSV)
+and builds an on-disk request_path -> category_id -> Shopify handle index.
+The PLP migration script uses the index to resolve any legacy category URL
+without hand curation, while memory use stays bounded during both the build
+and the lookups. Product rewrites are indexed the same way (request_path ->
+product_id -> url_key handle) so the CMS content migration can send product
+links to /products/.
+"""
+
+import csv
+import os
+import re
+import sys
+import sqlite3
+import logging
+from urllib.parse import urlparse
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Column order of the Magento 2 `url_rewrite` table, used when the dump
+# does not carry its own CREATE TABLE or column list
+DEFAULT_COLUMNS = [
+    'url_rewrite_id', 'entity_type', 'entity_id', 'request_path', 'target_path',
+    'redirect_type', 'store_id', 'description', 'is_autogenerated', 'metadata'
+]
+
+# Single-pass tokenizer for the VALUES part of a mysqldump INSERT statement
+SQL_TOKEN = re.compile(r"'((?:[^'\\]|\\.|'')*)'|(NULL)|(-?[0-9][0-9.eE+-]*)|(\()|(\))")
+SQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+SQL_ESCAPE = re.compile(r"\\(.)|''")
+
+INSERT_PREFIX = re.compile(r"^INSERT INTO `?url_rewrite`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.IGNORECASE)
+CREATE_TABLE = re.compile(r"^CREATE TABLE `?url_rewrite`?", re.IGNORECASE)
+CREATE_COLUMN = re.compile(r"^\s*`([^`]+)`\s")
+
+BATCH_SIZE = 10000
+
+
+def normalize_request_path(url):
+    """Normalize a full URL or request path to Magento's request_path form."""
+    if not url:
+        return ""
+    path = urlparse(url).path if '://' in url else url.split('?', 1)[0]
+    return path.strip().lstrip('/')
+
+
+def handle_from_request_path(request_path):
+    """Derive the Shopify handle from a request path (same rule as the PLP migration)."""
+    segments = [seg for seg in request_path.strip('/').split('/') if seg]
+    if not segments:
+        return None
+    return re.sub(r'\.html$', '', segments[-1])
+
+
+class UrlRewriteIndex:
+    """Read-only lookup over an index built by UrlRewriteIndexBuilder."""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.connection = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+        # Indexes built before product rewrites were recorded have no product tables
+        self.has_products = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_rewrites'").fetchone() is not None
+
+    def lookup_category_id(self, request_path):
+        """Return the category ID a request path rewrites to, following one custom redirect hop."""
+        cursor = self.connection.execute(
+            "SELECT category_id FROM rewrites WHERE request_path = ?", (request_path,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+
+        cursor = self.connection.execute(
+            "SELECT r.category_id FROM aliases a JOIN rewrites r ON r.request_path = a.target_path "
+            "WHERE a.request_path = ?", (request_path,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def lookup_handle(self, category_id):
+        """Return the Shopify handle for a category ID."""
+        cursor = self.connection.execute(
+            "SELECT handle FROM categories WHERE category_id = ?", (category_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def resolve_url(self, url):
+        """Resolve a legacy Magento URL to a Shopify handle, or None if it is not indexed."""
+        request_path = normalize_request_path(url)
+        if not request_path:
+            return None
+
+        category_id = self.lookup_category_id(request_path)
+        if category_id is None:
+            return None
+        return self.lookup_handle(category_id)
+
+    def resolve_product_url(self, url):
+        """Resolve a legacy Magento product URL to its Shopify product handle, or None if it is not indexed."""
+        request_path = normalize_request_path(url)
+        if not request_path or not self.has_products:
+            return None
+
+        cursor = self.connection.execute(
+            "SELECT p.handle FROM product_rewrites r JOIN products p ON p.product_id = r.product_id "
+            "WHERE r.request_path = ?", (request_path,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """Close the underlying index file."""
+        self.connection.close()
+
+
+class UrlRewriteIndexBuilder:
+    def __init__(self, dump_file, index_file, store_id=None):
+        self.dump_file = dump_file
+        self.index_file = index_file
+        self.store_id = str(store_id) if store_id is not None else None
+
+        # Statistics
+        self.stats = {
+            'rows_read': 0,
+            'category_rewrites': 0,
+            'canonical_categories': 0,
+            'custom_redirects': 0,
+            'product_rewrites': 0,
+            'canonical_products': 0,
+            'rows_skipped': 0
+        }
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'").strip('`')
+        return cleaned
+
+    def unescape_sql_string(self, value):
+        """Undo mysqldump string escaping."""
+        if '\\' not in value and "''" not in value:
+            return value
+        return SQL_ESCAPE.sub(
+            lambda m: "'" if m.group(0) == "''" else SQL_ESCAPES.get(m.group(1), m.group(1)), value)
+
+    def iter_sql_tuples(self, values_text):
+        """Yield each row tuple from the VALUES part of an INSERT statement."""
+        row = None
+        for match in SQL_TOKEN.finditer(values_text):
+            string_value, null_value, number_value, open_paren, close_paren = match.groups()
+            if open_paren:
+                row = []
+            elif close_paren:
+                if row is not None:
+                    yield row
+                row = None
+            elif row is None:
+                continue
+            elif string_value is not None:
+                row.append(self.unescape_sql_string(string_value))
+            elif null_value:
+                row.append(None)
+            else:
+                row.append(number_value)
+
+    def iter_sql_rows(self):
+        """Stream url_rewrite rows from a mysqldump file."""
+        columns = list(DEFAULT_COLUMNS)
+        create_columns = None
+
+        with open(self.dump_file, 'r', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                if create_columns is not None:
+                    column_match = CREATE_COLUMN.match(line)
+                    if column_match:
+                        create_columns.append(column_match.group(1))
+                        continue
+                    if create_columns:
+                        columns = create_columns
+                    create_columns = None
+
+                if CREATE_TABLE.match(line):
+                    create_columns = []
+                    continue
+
+                insert_match = INSERT_PREFIX.match(line)
+                if not insert_match:
+                    continue
+
+                if insert_match.group(1):
+                    columns = [self.clean_field_name(col) for col in insert_match.group(1).split(',')]
+
+                for values in self.iter_sql_tuples(line[insert_match.end():]):
+                    yield dict(zip(columns, values))
+
+    def iter_csv_rows(self):
+        """Stream url_rewrite rows from a CSV export."""
+        with open(self.dump_file, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if not header:
+                return
+            columns = [self.clean_field_name(field) for field in header]
+            for values in reader:
+                yield dict(zip(columns, values))
+
+    def iter_rows(self):
+        """Stream rows from the dump, picking the parser from the file extension."""
+        if self.dump_file.lower().endswith('.sql'):
+            return self.iter_sql_rows()
+        return self.iter_csv_rows()
+
+    def create_schema(self, connection):
+        """Create the index tables."""
+        connection.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE rewrites (request_path TEXT PRIMARY KEY, category_id INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE categories (category_id INTEGER PRIMARY KEY, handle TEXT NOT NULL);
+            CREATE TABLE aliases (request_path TEXT PRIMARY KEY, target_path TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE product_rewrites (request_path TEXT PRIMARY KEY, product_id INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE products (product_id INTEGER PRIMARY KEY, handle TEXT NOT NULL);
+        """)
+
+    def flush(self, connection, pending):
+        """Write one batch of pending rows (table name -> rows) to the index."""
+        for table, rows in pending.items():
+            if rows:
+                connection.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?, ?)", rows)
+                rows.clear()
+
+    def build_index(self):
+        """Stream the dump into a fresh on-disk index."""
+        logger.info(f"Building URL rewrite index from {self.dump_file}...")
+
+        temp_file = self.index_file + '.tmp'
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+        connection = sqlite3.connect(temp_file)
+        try:
+            self.create_schema(connection)
+
+            pending = {table: [] for table in ('rewrites', 'categories', 'aliases', 'product_rewrites', 'products')}
+            rewrites, categories, aliases = pending['rewrites'], pending['categories'], pending['aliases']
+            product_rewrites, products = pending['product_rewrites'], pending['products']
+            for row in self.iter_rows():
+                self.stats['rows_read'] += 1
+
+                if self.store_id is not None and str(row.get('store_id', '')) != self.store_id:
+                    self.stats['rows_skipped'] += 1
+                    continue
+
+                entity_type = row.get('entity_type') or ''
+                request_path = normalize_request_path(row.get('request_path') or '')
+                if not request_path:
+                    self.stats['rows_skipped'] += 1
+                    continue
+
+                if entity_type == 'category':
+                    try:
+                        category_id = int(row.get('entity_id') or 0)
+                    except ValueError:
+                        self.stats['rows_skipped'] += 1
+                        continue
+
+                    rewrites.append((request_path, category_id))
+                    self.stats['category_rewrites'] += 1
+
+                    # Only the non-redirect rewrite is the category's canonical URL
+                    if str(row.get('redirect_type') or '0') == '0':
+                        handle = handle_from_request_path(request_path)
+                        if handle:
+                            categories.append((category_id, handle))
+                            self.stats['canonical_categories'] += 1
+                elif entity_type == 'product':
+                    try:
+                        product_id = int(row.get('entity_id') or 0)
+                    except ValueError:
+                        self.stats['rows_skipped'] += 1
+                        continue
+
+                    product_rewrites.append((request_path, product_id))
+                    self.stats['product_rewrites'] += 1
+
+                    # Every non-redirect product URL ends in the product's url_key
+                    if str(row.get('redirect_type') or '0') == '0':
+                        handle = handle_from_request_path(request_path)
+                        if handle:
+                            products.append((product_id, handle))
+                            self.stats['canonical_products'] += 1
+                elif entity_type == 'custom' and row.get('target_path'):
+                    aliases.append((request_path, normalize_request_path(row['target_path'])))
+                    self.stats['custom_redirects'] += 1
+                else:
+                    self.stats['rows_skipped'] += 1
+
+                if len(rewrites) + len(aliases) + len(product_rewrites) >= BATCH_SIZE:
+                    self.flush(connection, pending)
+
+                if self.stats['rows_read'] % 1000000 == 0:
+                    logger.info(f"Processed {self.stats['rows_read']:,} rows...")
+
+            self.flush(connection, pending)
+            connection.commit()
+        finally:
+            connection.close()
+
+        os.replace(temp_file, self.index_file)
+        logger.info(f"Saved URL rewrite index to {self.index_file}")
+
+    def print_statistics(self):
+        """Print statistics about the index build."""
+        logger.info("=" * 50)
+        logger.info("URL REWRITE INDEX STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"Rows read: {self.stats['rows_read']:,}")
+        logger.info(f"Category rewrites indexed: {self.stats['category_rewrites']:,}")
+        logger.info(f"Canonical category handles: {self.stats['canonical_categories']:,}")
+        logger.info(f"Custom redirects indexed: {self.stats['custom_redirects']:,}")
+        logger.info(f"Product rewrites indexed: {self.stats['product_rewrites']:,}")
+        logger.info(f"Canonical product handles: {self.stats['canonical_products']:,}")
+        logger.info(f"Rows skipped: {self.stats['rows_skipped']:,}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete index build."""
+        logger.info("Starting URL rewrite index build...")
+
+        try:
+            self.build_index()
+            self.print_statistics()
+            logger.info("URL rewrite index build completed successfully!")
+
+        except Exception as e:
+            logger.error(f"URL rewrite index build failed: {e}")
+            raise
+
+
+def main():
+    """Main function to build or query the URL rewrite index."""
+    # File paths
+    dump_file = 'url_rewrite.sql'
+    index_file = 'url-rewrite-index.sqlite'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Build a handle index from a Magento url_rewrite dump')
+    parser.add_argument('--dump', default=dump_file, help='url_rewrite dump (.sql or .csv)')
+    parser.add_argument('--index', default=index_file, help='Index file to write or query')
+    parser.add_argument('--store-id', help='Only index rewrites for this store ID')
+    parser.add_argument('--lookup', nargs='+', help='Resolve URLs against an existing index')
+
+    args = parser.parse_args()
+
+    if args.lookup:
+        if not os.path.exists(args.index):
+            logger.error(f"Index file not found: {args.index}")
+            sys.exit(1)
+        index = UrlRewriteIndex(args.index)
+        for url in args.lookup:
+            handle = index.resolve_url(url)
+            if not handle:
+                product_handle = index.resolve_product_url(url)
+                handle = f"product {product_handle}" if product_handle else None
+            print(f"{url} -> {handle or 'NOT FOUND'}")
+        index.close()
+        return
+
+    if not os.path.exists(args.dump):
+        logger.error(f"url_rewrite dump not found: {args.dump}")
+        sys.exit(1)
+
+    builder = UrlRewriteIndexBuilder(args.dump, args.index, store_id=args.store_id)
+    builder.run()
+
+
+if __name__ == "__main__":
+    main()
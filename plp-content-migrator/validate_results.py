@@ -3,30 +3,87 @@
 Shopify PLP Migration Validation Script
 
 This script helps validate that the PLP content migration was successful
-by comparing the original and updated CSV files.
+by comparing the original and updated CSV files. Both files are in export
+order, so they are streamed side by side one collection at a time.
+
+Changes are streamed to report sinks (report_sinks.py): the console shows the
+totals and a sample, validation_report.csv gets every change, and --jsonl and
+--html add JSON-lines and paged HTML copies.
 """
 
 import csv
 import sys
 import logging
 import re
+from itertools import groupby
 from urllib.parse import urlparse
 
+from report_sinks import SummarySink, CSVSink, JSONLinesSink, HTMLTableSink, write_report
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+REPORT_FIELDNAMES = [
+    'Category ID', 'Handle', 'Original Title', 'Updated Title',
+    'Has HTML Content', 'Has Subheading', 'Changes', 'HTML Preview'
+]
+
+def is_top_row(row):
+    """True for the row Matrixify marks as the collection's top-level row."""
+    return row.get('Top Row', '').upper() == 'TRUE'
+
+
+def keep_top_row(data, key, row):
+    """Keep one row per collection, chosen like PLPMigrationScript.find_top_row (first Top Row = TRUE, else first row)."""
+    existing = data.get(key)
+    if existing is None or (is_top_row(row) and not is_top_row(existing)):
+        data[key] = row
+
+
+def iter_top_rows(rows):
+    """Yield ((ID, Handle), top row) for each group of consecutive rows of one collection."""
+    for key, group in groupby(rows, key=lambda row: (row.get('ID', ''), row.get('Handle', ''))):
+        top = {}
+        keep_top_row(top, key, next(group))
+        for row in group:
+            keep_top_row(top, key, row)
+        yield key, top[key]
+
+
+def iter_collection_pairs(original_rows, updated_rows):
+    """Pair each export collection's top row with its updated top row (None if the output left it out).
+    
+    The migration writes collections in export order and only ever leaves some
+    out, so both files are walked once, side by side, one collection at a time.
+    """
+    updated_groups = iter_top_rows(updated_rows)
+    pending = next(updated_groups, None)
+    for key, original_row in iter_top_rows(original_rows):
+        if pending is not None and pending[0] == key:
+            yield original_row, pending[1]
+            pending = next(updated_groups, None)
+        else:
+            yield original_row, None
+    
+    if pending is not None:
+        raise ValueError(f"Collection {pending[0][1] or pending[0][0]} in the updated file is not in the "
+                         f"export or not in export order; compare the output with the export it came from")
+
+
 class ValidationScript:
     def __init__(self, original_file, updated_file, plp_content_file):
         self.original_file = original_file
         self.updated_file = updated_file
         self.plp_content_file = plp_content_file
         
-        self.original_categories = {}
-        self.updated_categories = {}
+        # Cleaned Shopify rows already in memory; None streams them from the files
+        self.original_rows = None
+        self.updated_rows = None
+        self.total_categories = 0
         self.plp_content = {}
-        self.changes = []
         self.content_map = {}  # Map handle to PLP content
+        self.matched_handles = set()  # PLP handles with at least one updated collection
 
     def clean_field_name(self, field_name):
         """Clean field name by removing quotes, BOM, and extra whitespace."""
@@ -58,121 +115,140 @@ class ValidationScript:
             logger.warning(f"Error parsing URL {url}: {e}")
             return None
 
-    def load_csv_file(self, filename, is_plp=False):
-        """Load CSV file and return as dictionary."""
-        data = {}
-        
+    def load_plp_file(self, filename):
+        """Load the PLP content CSV keyed by URL and create the handle mapping."""
         try:
             with open(filename, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 
-                if is_plp:
-                    # For PLP content, use URL as key and create handle mapping
-                    for row in reader:
-                        cleaned_row = {}
-                        for key, value in row.items():
-                            clean_key = self.clean_field_name(key)
-                            cleaned_row[clean_key] = value.strip() if value else ""
-                        
-                        url = cleaned_row.get('URL', '')
-                        if url:
-                            data[url] = cleaned_row
-                            
-                            # Create handle mapping
-                            handle = self.extract_handle_from_url(url)
-                            if handle:
-                                self.content_map[handle] = cleaned_row
-                else:
-                    # For Shopify categories, use ID as key
-                    for row in reader:
-                        cleaned_row = {}
-                        for key, value in row.items():
-                            clean_key = self.clean_field_name(key)
-                            cleaned_row[clean_key] = value.strip() if value else ""
-                        
-                        category_id = cleaned_row.get('ID', '')
-                        if category_id:
-                            data[category_id] = cleaned_row
+                rows = []
+                for row in reader:
+                    cleaned_row = {}
+                    for key, value in row.items():
+                        clean_key = self.clean_field_name(key)
+                        cleaned_row[clean_key] = value.strip() if value else ""
+                    rows.append(cleaned_row)
+                data = self.index_plp_rows(rows)
                 
                 logger.info(f"Loaded {len(data)} entries from {filename}")
-                if is_plp:
-                    logger.info(f"Created {len(self.content_map)} handle mappings")
+                logger.info(f"Created {len(self.content_map)} handle mappings")
                 return data
                 
         except Exception as e:
             logger.error(f"Error loading {filename}: {e}")
             return {}
 
+    def iter_csv_rows(self, filename):
+        """Stream the cleaned rows of a Shopify CSV file."""
+        with open(filename, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+            for values in reader:
+                yield dict(zip(fieldnames, (value.strip() for value in values)))
+
+    def index_plp_rows(self, rows):
+        """Key cleaned PLP rows by URL and build the handle mapping."""
+        data = {}
+        for cleaned_row in rows:
+            url = cleaned_row.get('URL', '')
+            if url:
+                data[url] = cleaned_row
+                
+                # Create handle mapping
+                handle = self.extract_handle_from_url(url)
+                if handle:
+                    self.content_map[handle] = cleaned_row
+        return data
+
     def load_all_files(self):
-        """Load all CSV files."""
+        """Load the PLP content; the Shopify files are streamed by iter_changes."""
         logger.info("Loading CSV files for validation...")
         
-        self.original_categories = self.load_csv_file(self.original_file)
-        self.updated_categories = self.load_csv_file(self.updated_file)
-        self.plp_content = self.load_csv_file(self.plp_content_file, is_plp=True)
+        self.plp_content = self.load_plp_file(self.plp_content_file)
 
-    def find_changes(self):
-        """Find changes between original and updated categories."""
+    def iter_changes(self):
+        """Yield one change record per category whose key fields changed."""
         logger.info("Analyzing changes...")
         
-        changes = []
-        updated_count = 0
+        original_rows = self.original_rows if self.original_rows is not None else self.iter_csv_rows(self.original_file)
+        updated_rows = self.updated_rows if self.updated_rows is not None else self.iter_csv_rows(self.updated_file)
         
-        for category_id, updated_category in self.updated_categories.items():
-            original_category = self.original_categories.get(category_id)
-            
-            if not original_category:
+        # Both files are in export order, so only one collection of each is held at a time
+        self.total_categories = 0
+        for original_category, updated_category in iter_collection_pairs(original_rows, updated_rows):
+            category_id = updated_category.get('ID', '') if updated_category else ''
+            if not category_id:
                 continue
+            self.total_categories += 1
             
-            # Check for changes in key fields
-            changes_found = []
-            
-            # Check Title changes
-            original_title = original_category.get('Title', '')
-            updated_title = updated_category.get('Title', '')
-            if original_title != updated_title and updated_title:
-                changes_found.append(f"Title: '{original_title}' → '{updated_title}'")
-            
-            # Check Body HTML changes
-            original_html = original_category.get('Body HTML', '')
-            updated_html = updated_category.get('Body HTML', '')
-            if original_html != updated_html and updated_html:
-                changes_found.append(f"Body HTML: Updated with new content")
-            
-            # Check subheading metafield changes
-            original_subheading = original_category.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
-            updated_subheading = updated_category.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
-            if original_subheading != updated_subheading and updated_subheading:
-                changes_found.append(f"Subheading: '{original_subheading}' → '{updated_subheading}'")
-            
-            if changes_found:
-                handle = updated_category.get('Handle', '')
-                change_info = {
-                    'category_id': category_id,
-                    'handle': handle,
-                    'original_title': original_title,
-                    'updated_title': updated_title,
-                    'has_html_content': bool(updated_html),
-                    'has_subheading': bool(updated_subheading),
-                    'changes': changes_found,
-                    'html_preview': updated_html[:200] + "..." if len(updated_html) > 200 else updated_html
-                }
-                changes.append(change_info)
-                updated_count += 1
+            change = self.compare_rows(category_id, original_category, updated_category)
+            if change:
+                if change['handle'] in self.content_map:
+                    self.matched_handles.add(change['handle'])
+                yield change
+
+    def compare_rows(self, category_id, original_category, updated_category):
+        """Return the change record for one collection's top rows, or None if no key field changed."""
+        # Check for changes in key fields
+        changes_found = []
+        
+        # Check Title changes
+        original_title = original_category.get('Title', '')
+        updated_title = updated_category.get('Title', '')
+        if original_title != updated_title and updated_title:
+            changes_found.append(f"Title: '{original_title}' → '{updated_title}'")
         
-        self.changes = changes
-        logger.info(f"Found {len(changes)} categories with changes")
-        return updated_count
+        # Check Body HTML changes
+        original_html = original_category.get('Body HTML', '')
+        updated_html = updated_category.get('Body HTML', '')
+        if original_html != updated_html and updated_html:
+            changes_found.append(f"Body HTML: Updated with new content")
+        
+        # Check subheading metafield changes
+        original_subheading = original_category.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
+        updated_subheading = updated_category.get('Metafield: custom.collection_subheading [single_line_text_field]', '')
+        if original_subheading != updated_subheading and updated_subheading:
+            changes_found.append(f"Subheading: '{original_subheading}' → '{updated_subheading}'")
+        
+        if not changes_found:
+            return None
+        
+        handle = updated_category.get('Handle', '')
+        return {
+            'status': 'updated',
+            'category_id': category_id,
+            'handle': handle,
+            'original_title': original_title,
+            'updated_title': updated_title,
+            'has_html_content': bool(updated_html),
+            'has_subheading': bool(updated_subheading),
+            'changes': changes_found,
+            'html_preview': updated_html[:200] + "..." if len(updated_html) > 200 else updated_html
+        }
+
+    def format_row(self, change):
+        """Flatten one change record into a validation report row."""
+        return {
+            'Category ID': change['category_id'],
+            'Handle': change['handle'],
+            'Original Title': change['original_title'],
+            'Updated Title': change['updated_title'],
+            'Has HTML Content': 'Yes' if change['has_html_content'] else 'No',
+            'Has Subheading': 'Yes' if change['has_subheading'] else 'No',
+            'Changes': '; '.join(change['changes']),
+            'HTML Preview': change['html_preview']
+        }
 
-    def print_validation_report(self):
+    def print_validation_report(self, summary):
         """Print a comprehensive validation report."""
         print("=" * 80)
         print("SHOPIFY PLP MIGRATION VALIDATION REPORT")
         print("=" * 80)
         
         # Summary statistics
-        total_categories = len(self.updated_categories)
-        updated_categories = len(self.changes)
+        total_categories = self.total_categories
+        updated_categories = summary.count('updated')
+        sample = summary.sample('updated')
         plp_entries = len(self.plp_content)
         handle_mappings = len(self.content_map)
         
@@ -181,15 +257,16 @@ class ValidationScript:
         print(f"   Categories updated: {updated_categories:,}")
         print(f"   PLP content entries: {plp_entries:,}")
         print(f"   Handle mappings created: {handle_mappings:,}")
-        print(f"   Match rate: {(updated_categories/len(self.content_map)*100):.1f}%" if self.content_map else "N/A")
+        # Distinct handles, as in the migration statistics
+        print(f"   Match rate: {(len(self.matched_handles)/len(self.content_map)*100):.1f}%" if self.content_map else "N/A")
         print()
         
         # Show sample changes
-        if self.changes:
-            print(f"📝 SAMPLE UPDATES (showing first 10)")
+        if sample:
+            print(f"📝 SAMPLE UPDATES (showing first {len(sample)})")
             print("-" * 80)
             
-            for i, change in enumerate(self.changes[:10]):
+            for i, change in enumerate(sample):
                 print(f"{i+1}. {change['handle']} (ID: {change['category_id']})")
                 print(f"   Title: {change['original_title']} → {change['updated_title']}")
                 print(f"   HTML Content: {'Yes' if change['has_html_content'] else 'No'}")
@@ -198,8 +275,8 @@ class ValidationScript:
                     print(f"   HTML Preview: {change['html_preview']}")
                 print()
             
-            if len(self.changes) > 10:
-                print(f"... and {len(self.changes) - 10} more updates")
+            if updated_categories > len(sample):
+                print(f"... and {updated_categories - len(sample)} more updates")
                 print()
         
         # Validation results
@@ -225,39 +302,28 @@ class ValidationScript:
             print("2. Check that shopify-categories-export.csv has matching handles")
             print("3. Review the migration script logs")
 
-    def save_changes_report(self, output_file='validation_report.csv'):
-        """Save detailed changes report to CSV."""
-        if not self.changes:
-            logger.warning("No changes to report")
-            return
+    def build_sinks(self, report_file='validation_report.csv', jsonl_file=None, html_file=None, top_n=10):
+        """Create the summary sink plus the CSV report and any extra report sinks."""
+        summary = SummarySink(top_n)
+        sinks = [summary, CSVSink(report_file, REPORT_FIELDNAMES, self.format_row)]
+        if jsonl_file:
+            sinks.append(JSONLinesSink(jsonl_file, self.format_row))
+        if html_file:
+            sinks.append(HTMLTableSink(html_file, REPORT_FIELDNAMES, self.format_row, "PLP Migration Validation Report"))
+        return summary, sinks
+
+    def validate(self, report_file='validation_report.csv', jsonl_file=None, html_file=None, top_n=10):
+        """Compare the loaded files and report the changes."""
+        # Stream the changes into the console summary and report files
+        summary, sinks = self.build_sinks(report_file, jsonl_file, html_file, top_n)
+        write_report(self.iter_changes(), sinks)
+        logger.info(f"Found {summary.count('updated')} categories with changes")
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as file:
-                fieldnames = [
-                    'Category ID', 'Handle', 'Original Title', 'Updated Title',
-                    'Has HTML Content', 'Has Subheading', 'Changes', 'HTML Preview'
-                ]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for change in self.changes:
-                    writer.writerow({
-                        'Category ID': change['category_id'],
-                        'Handle': change['handle'],
-                        'Original Title': change['original_title'],
-                        'Updated Title': change['updated_title'],
-                        'Has HTML Content': 'Yes' if change['has_html_content'] else 'No',
-                        'Has Subheading': 'Yes' if change['has_subheading'] else 'No',
-                        'Changes': '; '.join(change['changes']),
-                        'HTML Preview': change['html_preview']
-                    })
-            
-            logger.info(f"Saved detailed report to {output_file}")
-            
-        except Exception as e:
-            logger.error(f"Error saving report: {e}")
+        # Print report
+        self.print_validation_report(summary)
+        return summary
 
-    def run(self):
+    def run(self, report_file='validation_report.csv', jsonl_file=None, html_file=None, top_n=10):
         """Run the complete validation process."""
         logger.info("Starting validation process...")
         
@@ -265,15 +331,7 @@ class ValidationScript:
             # Load all files
             self.load_all_files()
             
-            # Find changes
-            updated_count = self.find_changes()
-            
-            # Print report
-            self.print_validation_report()
-            
-            # Save detailed report
-            if self.changes:
-                self.save_changes_report()
+            self.validate(report_file, jsonl_file, html_file, top_n)
             
             logger.info("Validation completed successfully!")
             
@@ -287,6 +345,7 @@ def main():
     original_file = 'shopify-categories-export.csv'
     updated_file = 'shopify-categories-updated.csv'
     plp_content_file = 'new-plp-content.csv'
+    report_file = 'validation_report.csv'
     
     # Check if files exist
     import os
@@ -300,9 +359,19 @@ def main():
         logger.error("Please run the migration script first.")
         sys.exit(1)
     
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Validate the PLP migration results before import')
+    parser.add_argument('--report', default=report_file, help='CSV report of every change')
+    parser.add_argument('--jsonl', help='Also save the changes as JSON lines')
+    parser.add_argument('--html', help='Also save the changes as a paged HTML report')
+    parser.add_argument('--top', type=int, default=10, help='Changes to show on the console')
+    
+    args = parser.parse_args()
+    
     # Run validation
     validation = ValidationScript(original_file, updated_file, plp_content_file)
-    validation.run()
+    validation.run(args.report, args.jsonl, args.html, args.top)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
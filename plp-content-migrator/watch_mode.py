@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for the PLP Content Migration
+
+Keeps the parsed Shopify export, the collection groups and the handle index warm
+in memory and polls the PLP content and export files. When the PLP file is saved,
+only the collections whose PLP rows changed are re-patched, and the output file
+and validation report (and the rollback file, when the migration writes one)
+are refreshed in well under a second. The migration's --only-handles filter
+applies here too.
+
+Started with `python3 script.py --watch`.
+"""
+
+import os
+import csv
+import time
+import logging
+
+from validate_results import ValidationScript, REPORT_FIELDNAMES
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationWatcher:
+    def __init__(self, migration, report_file='validation_report.csv', poll_interval=0.5):
+        self.migration = migration
+        self.report_file = report_file
+        self.poll_interval = poll_interval
+
+        # Warm state
+        self.groups = []  # (handle, original rows) in export order
+        self.patched_groups = []  # patched copy of each group
+        self.group_positions = {}  # handle -> positions in self.groups
+        self.report_entries = {}  # group position -> validation report row
+        self.rollback_rows = {}  # group position -> rollback row
+        self.file_mtimes = {}
+
+        # Same change detection and report rows as validate_results.py
+        self.validation = ValidationScript(None, None, None)
+
+        # The migration logs every mapped handle; keep reloads quiet
+        self.migration_logger = logging.getLogger(type(migration).__module__)
+
+    def file_mtime(self, path):
+        """Return a file's modification time, or None if it is missing."""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def has_changed(self, path):
+        """Return True once a watched file has a new, settled modification time."""
+        mtime = self.file_mtime(path)
+        if mtime is None or mtime == self.file_mtimes.get(path):
+            return False
+        # Wait one more poll if the editor is still writing
+        time.sleep(self.poll_interval / 5)
+        if self.file_mtime(path) != mtime:
+            return False
+        self.file_mtimes[path] = mtime
+        return True
+
+    def load_content_map(self):
+        """Parse the PLP file into a fresh content map (the previous map is kept on failure)."""
+        previous = self.migration.content_map
+        self.migration.content_map = {}
+        self.migration.stats['plp_text_fields'] = 0
+        self.migration.stats['plp_text_duplicates'] = 0
+        # Entries for text that is no longer in the PLP file would pile up on every save
+        self.migration.interned_text.clear()
+        self.migration.html_cache.clear()
+        self.migration.patch_cache.clear()
+
+        level = self.migration_logger.level
+        self.migration_logger.setLevel(logging.WARNING)
+        try:
+            self.migration.load_plp_content()
+        except Exception:
+            self.migration.content_map = previous
+            raise
+        finally:
+            self.migration_logger.setLevel(level)
+        return self.migration.content_map
+
+    def load_export(self):
+        """Parse the Shopify export and index its collection groups by handle."""
+        self.groups = list(self.migration.iter_collection_groups(self.migration.iter_shopify_categories()))
+        self.group_positions = {}
+        for position, (handle, _) in enumerate(self.groups):
+            self.group_positions.setdefault(handle, []).append(position)
+        self.patched_groups = [None] * len(self.groups)
+        self.report_entries = {}
+        self.rollback_rows = {}
+        logger.info(f"Indexed {len(self.groups)} collections from {self.migration.shopify_categories_file}")
+
+    def patch_group(self, position):
+        """Re-patch one collection group from its original rows and refresh its report and rollback entries."""
+        handle, original_rows = self.groups[position]
+        self.report_entries.pop(position, None)
+        self.rollback_rows.pop(position, None)
+
+        # Collections outside --only-handles are left out of the output, as in a normal run
+        only_handles = self.migration.only_handles
+        if only_handles is not None and handle not in only_handles:
+            self.patched_groups[position] = None
+            return
+
+        rows = list(original_rows)  # patch_collection copies the top row it changes
+        updated = self.migration.patch_collection(handle, rows)
+        # Unmatched collections are left out when the mapping adds columns, as in a normal run
+        self.patched_groups[position] = rows if updated or not rows[0].schema.added_columns else None
+        if not updated:
+            return
+
+        original = self.migration.find_top_row(original_rows)
+        patched = self.migration.find_top_row(rows)
+        change = self.validation.compare_rows(patched.get('ID', ''), original, patched)
+        if change:
+            self.report_entries[position] = self.validation.format_row(change)
+        if self.migration.rollback_file:
+            rollback_row = self.migration.rollback_row(original_rows, rows)
+            if rollback_row:
+                self.rollback_rows[position] = rollback_row
+
+    def replace_file(self, path, write):
+        """Write a file through a temporary copy so readers never see it half-written."""
+        temp_file = path + '.tmp'
+        with open(temp_file, 'w', newline='', encoding='utf-8') as file:
+            write(file)
+        os.replace(temp_file, path)
+
+    def write_outputs(self):
+        """Write the output file and validation report from the warm in-memory state."""
+        def write_output(file):
+            writer = None
+            for rows in self.patched_groups:
+                if rows is None:
+                    continue
+                if writer is None:
+                    writer = csv.writer(file)
+                    writer.writerow(rows[0].keys())
+                writer.writerows(row.as_list() for row in rows)
+
+        def write_entries(fieldnames, entries):
+            def write(file):
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                for position in sorted(entries):
+                    writer.writerow(entries[position])
+            return write
+
+        self.replace_file(self.migration.output_file, write_output)
+        self.replace_file(self.report_file, write_entries(REPORT_FIELDNAMES, self.report_entries))
+        if self.migration.rollback_file:
+            self.replace_file(self.migration.rollback_file,
+                              write_entries(self.migration.rollback_fieldnames(), self.rollback_rows))
+
+    def full_run(self):
+        """Load everything and patch every collection."""
+        started = time.perf_counter()
+        self.load_content_map()
+        self.load_export()
+        for position in range(len(self.groups)):
+            self.patch_group(position)
+        self.write_outputs()
+        logger.info(f"Full run: {len(self.report_entries)} collections updated "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def incremental_run(self):
+        """Re-parse the PLP file and re-patch only collections whose PLP rows changed."""
+        started = time.perf_counter()
+        previous = self.migration.content_map
+        current = self.load_content_map()
+
+        changed_handles = {handle for handle in previous.keys() | current.keys()
+                           if previous.get(handle) != current.get(handle)}
+        if not changed_handles:
+            logger.info("PLP file saved, no content changes")
+            return
+
+        positions = [position for handle in changed_handles for position in self.group_positions.get(handle, [])]
+        for position in positions:
+            self.patch_group(position)
+        self.write_outputs()
+
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"{len(changed_handles)} PLP row(s) changed, {len(positions)} collection(s) re-patched in {elapsed:.0f} ms")
+        for handle in sorted(changed_handles):
+            if handle not in self.group_positions:
+                status = "no matching Shopify collection"
+            elif handle not in current:
+                status = "removed from PLP file (restored to export values)"
+            else:
+                status = f"updated → '{current[handle].title}'"
+            logger.info(f"  • {handle}: {status}")
+
+    def run(self):
+        """Run an initial migration, then re-run incrementally on every change until interrupted."""
+        plp_file = self.migration.plp_content_file
+        export_file = self.migration.shopify_categories_file
+
+        self.file_mtimes = {plp_file: self.file_mtime(plp_file), export_file: self.file_mtime(export_file)}
+        self.full_run()
+        logger.info(f"Watching {plp_file} and {export_file} (Ctrl+C to stop)...")
+
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                try:
+                    if self.has_changed(export_file):
+                        logger.info(f"{export_file} changed, reloading export...")
+                        self.full_run()
+                    elif self.has_changed(plp_file):
+                        self.incremental_run()
+                except Exception as e:
+                    # Typically a half-written file; the next save triggers another run
+                    logger.warning(f"Skipping this change: {e}")
+        except KeyboardInterrupt:
+            logger.info("Watch mode stopped")
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Magento to Shopify Product Migration Script
+
+This script migrates the Magento product catalog to Shopify by streaming a
+Magento product export (System > Data Transfer > Export > Products) and
+writing Matrixify product import files.
+
+It follows the same load -> patch -> write approach as the PLP content
+migration (plp-content-migrator/script.py), one product at a time:
+
+- simple products that are not visible individually are held until the
+  configurable product that lists them in configurable_variations arrives,
+  then written as that product's variant rows
+- every other simple product becomes a single-variant product; visible ones
+  are held for the next few products in case a configurable product that
+  lists them follows, and are then written as its variant rows instead
+- only products still waiting for their parent or children are kept in
+  memory, so 500k+ SKU exports run in a single pass with flat memory
+- output is split into shopify-products-001.csv, -002.csv, ... by size,
+  never splitting one product's rows across files
+"""
+
+import csv
+import re
+import sys
+import logging
+from collections import OrderedDict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PRODUCT_FIELDNAMES = [
+    'Handle', 'Command', 'Title', 'Body HTML', 'Vendor', 'Type', 'Tags', 'Status', 'Published', 'Top Row',
+    'Option1 Name', 'Option1 Value', 'Option2 Name', 'Option2 Value', 'Option3 Name', 'Option3 Value',
+    'Variant Command', 'Variant SKU', 'Variant Price', 'Variant Compare At Price', 'Variant Inventory Qty',
+    'Variant Weight', 'Variant Weight Unit', 'Variant Image', 'Image Src',
+    'Metafield: title_tag [string]', 'Metafield: description_tag [string]'
+]
+
+MAX_OPTIONS = 3  # Shopify allows three options per product
+NOT_VISIBLE = 'Not Visible Individually'
+
+
+class ProductMigrationScript:
+    def __init__(self, magento_products_file, output_prefix, max_file_bytes=15 * 1024 * 1024,
+                 max_pending=50000, media_url='https://jrdunn.com/media/catalog/product', weight_unit='lb',
+                 simple_lookback=100):
+        self.magento_products_file = magento_products_file
+        self.output_prefix = output_prefix
+        self.max_file_bytes = max_file_bytes
+        self.max_pending = max_pending
+        self.simple_lookback = simple_lookback
+        self.media_url = media_url.rstrip('/')
+        self.weight_unit = weight_unit
+
+        # Products waiting for the rest of their family, oldest first
+        self.pending_children = OrderedDict()  # child SKU -> row (parent not seen yet)
+        self.recent_simples = OrderedDict()  # visible simple SKU -> row, in case its parent follows
+        self.waiting_parents = OrderedDict()  # parent SKU -> {'row', 'variations', 'children'}
+        self.child_owner = {}  # child SKU -> parent SKU still waiting for it
+        self.output_files = []
+
+        # Statistics
+        self.stats = {
+            'rows_read': 0,
+            'store_view_rows_skipped': 0,
+            'configurable_products': 0,
+            'configurables_without_variations': 0,
+            'simple_products': 0,
+            'variants_written': 0,
+            'variants_without_child_row': 0,
+            'visible_children_as_variants': 0,
+            'orphan_children': 0,
+            'options_truncated': 0,
+            'products_written': 0,
+            'rows_written': 0,
+            'max_pending': 0
+        }
+
+    def clean_field_name(self, field_name):
+        """Clean field name by removing quotes, BOM, and extra whitespace."""
+        if not field_name:
+            return ""
+        # Remove BOM, quotes, and whitespace
+        cleaned = field_name.replace('\ufeff', '').strip().strip('"').strip("'")
+        return cleaned
+
+    def iter_magento_products(self):
+        """Stream cleaned default-scope product rows from the Magento export."""
+        with open(self.magento_products_file, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+
+            # Clean up field names
+            fieldnames = [self.clean_field_name(field) for field in next(reader, [])]
+            logger.info(f"Magento CSV field names: {fieldnames[:5]}...")
+            for column in ('sku', 'product_type'):
+                if column not in fieldnames:
+                    raise ValueError(f"No '{column}' column in {self.magento_products_file}")
+
+            for values in reader:
+                self.stats['rows_read'] += 1
+                row = dict(zip(fieldnames, (value.strip() for value in values)))
+                # Store view rows only carry translations of the default row
+                if row.get('store_view_code'):
+                    self.stats['store_view_rows_skipped'] += 1
+                    continue
+                yield row
+
+    def parse_pairs(self, value, separator=','):
+        """Parse Magento 'code=value,code=value' attribute lists."""
+        pairs = {}
+        for pair in value.split(separator):
+            code, equals, pair_value = pair.partition('=')
+            if equals:
+                pairs[code.strip()] = pair_value.strip()
+        return pairs
+
+    def parse_variations(self, row):
+        """Return [(child SKU, {attribute code: value})] from configurable_variations."""
+        variations = []
+        for variation in row.get('configurable_variations', '').split('|'):
+            attributes = self.parse_pairs(variation)
+            sku = attributes.pop('sku', '')
+            if sku:
+                variations.append((sku, attributes))
+        return variations
+
+    def make_handle(self, row):
+        """Use the Magento url_key as handle, falling back to the name or SKU."""
+        handle = row.get('url_key', '') or row.get('name', '') or row['sku']
+        return re.sub(r'[^a-z0-9]+', '-', handle.lower()).strip('-')
+
+    def make_tags(self, categories):
+        """Turn Magento category paths into tags (the last segment of each path)."""
+        tags = (path.rsplit('/', 1)[-1].strip() for path in categories.split(',') if path.strip())
+        return ', '.join(dict.fromkeys(tag for tag in tags if tag))
+
+    def image_url(self, path):
+        """Build the absolute URL of a Magento media path."""
+        if not path or path == 'no_selection':
+            return ''
+        if path.startswith('http'):
+            return path
+        return f"{self.media_url}/{path.lstrip('/')}"
+
+    def format_quantity(self, value):
+        """Magento exports quantities as decimals ('12.0000'); Shopify expects integers."""
+        try:
+            return str(int(float(value)))
+        except ValueError:
+            return ''
+
+    def product_fields(self, row):
+        """Product-level columns written on the first row of a product."""
+        attributes = self.parse_pairs(row.get('additional_attributes', ''))
+        online = row.get('product_online', '1') == '1'
+        return {
+            'Handle': self.make_handle(row),
+            'Command': 'MERGE',
+            'Title': row.get('name', ''),
+            'Body HTML': row.get('description', '') or row.get('short_description', ''),
+            'Vendor': attributes.get('brand', '') or attributes.get('manufacturer', ''),
+            'Type': row.get('attribute_set_code', ''),
+            'Tags': self.make_tags(row.get('categories', '')),
+            'Status': 'Active' if online else 'Draft',
+            'Published': 'TRUE' if online and row.get('visibility', '') != NOT_VISIBLE else 'FALSE',
+            'Top Row': 'TRUE',
+            'Image Src': self.image_url(row.get('base_image', '')),
+            'Metafield: title_tag [string]': row.get('meta_title', ''),
+            'Metafield: description_tag [string]': row.get('meta_description', '')
+        }
+
+    def variant_fields(self, row, fallback=None):
+        """Variant columns from a simple product row (fallback: the parent's row)."""
+        source = row or fallback
+        price = source.get('price', '')
+        special_price = source.get('special_price', '')
+        compare_at_price = ''
+        try:
+            if special_price and float(special_price) < float(price):
+                price, compare_at_price = special_price, price
+        except ValueError:
+            pass
+        return {
+            'Variant Command': 'MERGE',
+            'Variant Price': price,
+            'Variant Compare At Price': compare_at_price,
+            'Variant Inventory Qty': self.format_quantity(row.get('qty', '')) if row else '',
+            'Variant Weight': source.get('weight', ''),
+            'Variant Weight Unit': self.weight_unit if source.get('weight', '') else '',
+            'Variant Image': self.image_url(row.get('base_image', '')) if row else ''
+        }
+
+    def build_simple_product(self, row):
+        """Shopify rows for a product without options."""
+        product = self.product_fields(row)
+        product.update(self.variant_fields(row))
+        product.update({'Option1 Name': 'Title', 'Option1 Value': 'Default Title', 'Variant SKU': row['sku']})
+        self.stats['simple_products'] += 1
+        self.stats['variants_written'] += 1
+        return [product]
+
+    def build_configurable_product(self, parent):
+        """Shopify rows for a configurable product, one per variant."""
+        row = parent['row']
+        if not parent['variations']:
+            # No child SKUs to turn into variants; keep the product itself
+            self.stats['configurables_without_variations'] += 1
+            logger.warning(f"Configurable product {row['sku']} lists no configurable_variations; "
+                           f"writing it as a single-variant product")
+            return self.build_simple_product(row)
+
+        labels = self.parse_pairs(row.get('configurable_variation_labels', ''))
+        option_codes = list(labels)
+        for _, attributes in parent['variations']:
+            for code in attributes:
+                if code not in option_codes:
+                    option_codes.append(code)
+        if len(option_codes) > MAX_OPTIONS:
+            self.stats['options_truncated'] += 1
+            logger.warning(f"Product {row['sku']} has {len(option_codes)} options; keeping {option_codes[:MAX_OPTIONS]}")
+            option_codes = option_codes[:MAX_OPTIONS]
+
+        rows = []
+        for child_sku, attributes in parent['variations']:
+            child = parent['children'].get(child_sku)
+            if child is None:
+                self.stats['variants_without_child_row'] += 1
+            variant = self.product_fields(row) if not rows else {'Handle': self.make_handle(row), 'Command': 'MERGE'}
+            for number, code in enumerate(option_codes, 1):
+                variant[f'Option{number} Name'] = labels.get(code) or code.replace('_', ' ').title()
+                variant[f'Option{number} Value'] = attributes.get(code, '')
+            variant.update(self.variant_fields(child, row))
+            variant['Variant SKU'] = child_sku
+            rows.append(variant)
+
+        self.stats['configurable_products'] += 1
+        self.stats['variants_written'] += len(rows)
+        return rows
+
+    def release_parent(self, parent_sku):
+        """Stop waiting for a configurable product's children and build its rows."""
+        parent = self.waiting_parents.pop(parent_sku)
+        for child_sku, _ in parent['variations']:
+            if self.child_owner.get(child_sku) == parent_sku:
+                del self.child_owner[child_sku]
+        return self.build_configurable_product(parent)
+
+    def iter_products(self, rows):
+        """Group child SKUs into their configurable products in a single pass.
+
+        Yields the Shopify rows of one product at a time. Children usually sit
+        next to their parent in Magento exports; anything held longer than
+        max_pending products is written as it is. A visible child listed more
+        than simple_lookback products before its parent has already been written
+        as its own product, so the parent waits for it until max_pending or the
+        end of the file and gives that variant the parent's price.
+        """
+        for row in rows:
+            sku = row['sku']
+            if row.get('product_type') == 'configurable':
+                variations = self.parse_variations(row)
+                parent = {'row': row, 'variations': variations, 'children': {}, 'missing': set()}
+                for child_sku, _ in variations:
+                    child = self.pending_children.pop(child_sku, None)
+                    if child is None:
+                        # A visible child listed just before its parent becomes a variant too
+                        child = self.recent_simples.pop(child_sku, None)
+                        if child is not None:
+                            self.stats['visible_children_as_variants'] += 1
+                    if child is not None:
+                        parent['children'][child_sku] = child
+                    else:
+                        parent['missing'].add(child_sku)
+                if not parent['missing']:
+                    yield self.build_configurable_product(parent)
+                    continue
+                self.waiting_parents[sku] = parent
+                for child_sku in parent['missing']:
+                    self.child_owner[child_sku] = sku
+
+            elif sku in self.child_owner:
+                parent_sku = self.child_owner.pop(sku)
+                parent = self.waiting_parents[parent_sku]
+                parent['children'][sku] = row
+                parent['missing'].discard(sku)
+                if not parent['missing']:
+                    yield self.release_parent(parent_sku)
+                continue
+
+            elif row.get('visibility', '') == NOT_VISIBLE:
+                # Probably a variant whose configurable product comes later
+                self.pending_children[sku] = row
+
+            else:
+                self.recent_simples[sku] = row
+                if len(self.recent_simples) > self.simple_lookback:
+                    yield self.build_simple_product(self.recent_simples.popitem(last=False)[1])
+
+            pending = len(self.pending_children) + len(self.waiting_parents) + len(self.recent_simples)
+            self.stats['max_pending'] = max(self.stats['max_pending'], pending)
+            if len(self.pending_children) > self.max_pending:
+                _, orphan = self.pending_children.popitem(last=False)
+                self.stats['orphan_children'] += 1
+                yield self.build_simple_product(orphan)
+            if len(self.waiting_parents) > self.max_pending:
+                yield self.release_parent(next(iter(self.waiting_parents)))
+
+        # End of file: nothing else can arrive
+        while self.recent_simples:
+            yield self.build_simple_product(self.recent_simples.popitem(last=False)[1])
+        while self.waiting_parents:
+            yield self.release_parent(next(iter(self.waiting_parents)))
+        while self.pending_children:
+            _, orphan = self.pending_children.popitem(last=False)
+            self.stats['orphan_children'] += 1
+            yield self.build_simple_product(orphan)
+
+    def part_file_name(self, part_number):
+        """Build the output file name for a part."""
+        return f"{self.output_prefix}-{part_number:03d}.csv"
+
+    def stream_migration(self):
+        """Read, group and write the catalog one product at a time into size-bounded part files."""
+        logger.info(f"Streaming products from {self.magento_products_file}...")
+
+        file = None
+        writer = None
+        try:
+            for product_rows in self.iter_products(self.iter_magento_products()):
+                # Start a new part once the current one is full; a product is never split
+                if writer is None or file.tell() >= self.max_file_bytes:
+                    if file:
+                        file.close()
+                    file_name = self.part_file_name(len(self.output_files) + 1)
+                    file = open(file_name, 'w', newline='', encoding='utf-8')
+                    writer = csv.DictWriter(file, fieldnames=PRODUCT_FIELDNAMES)
+                    writer.writeheader()
+                    self.output_files.append(file_name)
+
+                writer.writerows(product_rows)
+                self.stats['products_written'] += 1
+                self.stats['rows_written'] += len(product_rows)
+
+            logger.info(f"Wrote {self.stats['products_written']} products to {len(self.output_files)} file(s)")
+
+        except Exception as e:
+            logger.error(f"Error streaming products: {e}")
+            raise
+        finally:
+            if file:
+                file.close()
+
+    def print_statistics(self):
+        """Print detailed statistics about the migration."""
+        logger.info("=" * 50)
+        logger.info("PRODUCT MIGRATION STATISTICS")
+        logger.info("=" * 50)
+        logger.info(f"Magento rows read: {self.stats['rows_read']} "
+                    f"({self.stats['store_view_rows_skipped']} store view rows skipped)")
+        logger.info(f"Configurable products: {self.stats['configurable_products']}")
+        if self.stats['configurables_without_variations']:
+            logger.info(f"Configurable products without variations (written as single-variant products): "
+                        f"{self.stats['configurables_without_variations']}")
+        logger.info(f"Simple products: {self.stats['simple_products']}")
+        logger.info(f"Variants written: {self.stats['variants_written']}")
+        if self.stats['variants_without_child_row']:
+            logger.info(f"Variants without a child row (parent price used): {self.stats['variants_without_child_row']}")
+        if self.stats['visible_children_as_variants']:
+            logger.info(f"Visible simple products listed by a later configurable product (written as its variants): "
+                        f"{self.stats['visible_children_as_variants']}")
+        if self.stats['orphan_children']:
+            logger.info(f"Hidden simple products with no configurable parent: {self.stats['orphan_children']}")
+        if self.stats['options_truncated']:
+            logger.info(f"Products with more than {MAX_OPTIONS} options: {self.stats['options_truncated']}")
+        logger.info(f"Most products held at once: {self.stats['max_pending']}")
+        logger.info(f"Rows written: {self.stats['rows_written']}")
+        for file_name in self.output_files:
+            logger.info(f"  • {file_name}")
+        logger.info("=" * 50)
+
+    def run(self):
+        """Run the complete migration process."""
+        logger.info("Starting product migration from Magento to Shopify...")
+
+        try:
+            self.stream_migration()
+            self.print_statistics()
+
+            logger.info("Migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"Migration failed: {e}")
+            raise
+
+
+def main():
+    """Main function to run the migration script."""
+    # File paths
+    magento_products_file = 'magento-products-export.csv'
+    output_prefix = 'shopify-products'
+
+    # Parse command line arguments
+    import argparse
+    parser = argparse.ArgumentParser(description='Migrate a Magento product export into Matrixify product files')
+    parser.add_argument('--input', default=magento_products_file, help='Magento product export CSV')
+    parser.add_argument('--output-prefix', default=output_prefix, help='Prefix for the product part files')
+    parser.add_argument('--max-mb', type=float, default=15, help='Maximum size of each part file in MB')
+    parser.add_argument('--max-pending', type=int, default=50000,
+                        help='Products held while waiting for their parent or children')
+    parser.add_argument('--lookback', type=int, default=100,
+                        help='Visible simple products held in case a configurable product listing them follows')
+    parser.add_argument('--media-url', default='https://jrdunn.com/media/catalog/product', help='Magento product media URL')
+    parser.add_argument('--weight-unit', default='lb', help='Unit of the Magento weight attribute (g, kg, lb, oz)')
+
+    args = parser.parse_args()
+
+    # Check if input file exists
+    import os
+    if not os.path.exists(args.input):
+        logger.error(f"Magento product export not found: {args.input}")
+        sys.exit(1)
+
+    # Run migration
+    migration = ProductMigrationScript(
+        args.input,
+        args.output_prefix,
+        max_file_bytes=int(args.max_mb * 1024 * 1024),
+        max_pending=args.max_pending,
+        media_url=args.media_url,
+        weight_unit=args.weight_unit,
+        simple_lookback=args.lookback
+    )
+    migration.run()
+
+
+if __name__ == "__main__":
+    main()